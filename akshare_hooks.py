@@ -0,0 +1,62 @@
+"""
+AkshareHooks — Interception point for every public akshare function.
+Wraps the functions on the akshare module once; registered hooks (cassette
+record/replay, call metrics) then see each call as hook(name, call, args, kwargs).
+"""
+
+import functools
+import inspect
+import threading
+
+_hooks = []
+_installed = False
+_install_lock = threading.Lock()
+_local = threading.local()
+
+
+def in_akshare_call():
+    """True while the current thread is inside a wrapped akshare function."""
+    return getattr(_local, 'depth', 0) > 0
+
+
+def _run_chain(index, name, fn, args, kwargs):
+    if index >= len(_hooks):
+        return fn(*args, **kwargs)
+    return _hooks[index](name, lambda: _run_chain(index + 1, name, fn, args, kwargs), args, kwargs)
+
+
+def _wrap(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # akshare functions call each other; only the outermost call runs the hooks
+        if in_akshare_call():
+            return fn(*args, **kwargs)
+        _local.depth = 1
+        try:
+            return _run_chain(0, name, fn, args, kwargs)
+        finally:
+            _local.depth = 0
+    wrapper.__akshare_hooked__ = True
+    return wrapper
+
+
+def install():
+    """Wrap all public akshare functions (idempotent)."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        import akshare as ak
+        for name, fn in list(vars(ak).items()):
+            if name.startswith('_') or not inspect.isfunction(fn) or getattr(fn, '__akshare_hooked__', False):
+                continue
+            setattr(ak, name, _wrap(name, fn))
+        _installed = True
+
+
+def register_hook(hook):
+    """Add hook(name, call, args, kwargs) -> result. Hooks registered first run outermost;
+    each must return call() (or a substitute result) to continue the chain."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+    install()
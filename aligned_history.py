@@ -0,0 +1,90 @@
+"""
+AlignedHistory — Stock bars paired with the index on one integer trading-day axis.
+The index frame becomes an IndexCalendar once per run (date -> position plus
+close / Index_Change arrays); each stock history is reindexed onto it once, and
+the relative factors (antigravity, beta, micro momentum) read positional tail
+slices instead of each doing its own pd.merge on string dates.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _column(df, name):
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[name].to_numpy(dtype=float)
+
+
+class IndexCalendar:
+    """Trading-day axis of an index frame (date, close, Index_Change)."""
+
+    def __init__(self, index_df):
+        self.source = index_df
+        if index_df is None or 'date' not in getattr(index_df, 'columns', ()):
+            index_df = pd.DataFrame({'date': []})
+        dates = index_df['date'].astype(str)
+        # Duplicate index dates: the first occurrence wins
+        unique = ~dates.duplicated().to_numpy()
+        self.dates = dates.to_numpy()[unique]
+        self._lookup = pd.Index(self.dates)
+        self.close = _column(index_df, 'close')[unique]
+        self.change = _column(index_df, 'Index_Change')[unique]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def positions(self, dates):
+        """Trading-day index of each date, -1 where the index has no bar."""
+        return self._lookup.get_indexer(dates).astype(np.int64)
+
+    def align(self, stock_hist):
+        return AlignedHistory(stock_hist, self)
+
+
+class AlignedHistory:
+    """One stock's bars on the calendar's trading-day axis.
+
+    day       — calendar position of each bar that has an index row (the rows an
+                inner merge on 'date' would keep, in the stock's order)
+    close / change         — the stock's close and change_pct on those days
+    idx_close / idx_change — the index's close and Index_Change on those days
+    """
+
+    def __init__(self, stock_hist, calendar):
+        self.calendar = calendar
+        pos = calendar.positions(stock_hist['date'].astype(str).to_numpy())
+        keep = pos >= 0
+        self.day = pos[keep]
+        self.close = _column(stock_hist, 'close')[keep]
+        self.change = _column(stock_hist, 'change_pct')[keep]
+        self.idx_close = calendar.close[self.day]
+        self.idx_change = calendar.change[self.day]
+
+    def __len__(self):
+        return len(self.day)
+
+    def date(self, i):
+        return self.calendar.dates[self.day[i]]
+
+
+_last_calendar = None
+
+
+def index_calendar(index_df):
+    """IndexCalendar for index_df, reused while the same frame object is passed in."""
+    global _last_calendar
+    if isinstance(index_df, IndexCalendar):
+        return index_df
+    cal = _last_calendar
+    if cal is None or cal.source is not index_df:
+        cal = IndexCalendar(index_df)
+        _last_calendar = cal
+    return cal
+
+
+def as_aligned(stock_hist, index_hist):
+    """stock_hist if it is already an AlignedHistory, else align it onto index_hist."""
+    if isinstance(stock_hist, AlignedHistory):
+        return stock_hist
+    return index_calendar(index_hist).align(stock_hist)
@@ -11,13 +11,14 @@ import pandas as pd
 import numpy as np
 import akshare as ak
 import datetime
-import time
 import sqlite3
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(__file__))
 
+from bar_store import get_bar_store
+
 # Import strategy functions
 from siphon_strategy import (
     calculate_antigravity_score,
@@ -78,16 +79,13 @@ def fetch_stock_history(symbol, days=90):
     end_date = datetime.datetime.now().strftime("%Y%m%d")
     start_date = (datetime.datetime.now() - datetime.timedelta(days=days * 2)).strftime("%Y%m%d")
 
-    if symbol.startswith('6'):
-        prefix = 'sh'
-    elif symbol.startswith('0') or symbol.startswith('3'):
-        prefix = 'sz'
-    else:
+    # Shanghai / Shenzhen only
+    if not symbol.startswith(('6', '0', '3')):
         return None
 
     try:
-        df = ak.stock_zh_a_daily(symbol=f"{prefix}{symbol}", start_date=start_date, end_date=end_date, adjust="qfq")
-        if df.empty or len(df) < 30:
+        df = get_bar_store().get_bars(symbol, start_date, end_date, adjust="qfq")
+        if df is None or len(df) < 30:
             return None
         df = df.sort_values('date')
         df['change_pct'] = df['close'].pct_change() * 100
@@ -204,7 +202,6 @@ def run_backtest(lookback_days=15, forward_days_list=[3, 5, 10]):
             all_data[code] = {'name': name, 'industry': industry, 'hist': df}
         if (i + 1) % 20 == 0:
             print(f"   ... fetched {i + 1}/{len(stocks)} ({len(all_data)} valid)")
-        time.sleep(0.15)
 
     print(f"✅ Loaded {len(all_data)} stocks with valid history\n")
 
@@ -0,0 +1,293 @@
+"""
+BarStore — Persistent incremental daily K-line store shared by every consumer.
+One file per (adjust mode, symbol) plus a JSON manifest. Each refresh only
+appends the bars missing since the last stored date; any window is served from disk.
+The manifest is flushed once per batch (flush()) and at exit, not per symbol.
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+import akshare as ak
+import pandas as pd
+
+from rate_limiter import get_limiter
+from singleflight import SingleFlight
+from trade_calendar import prev_trading_day
+
+logger = logging.getLogger("SiphonSystem")
+
+# Parquet when pyarrow is installed, pickle otherwise (same layout either way)
+try:
+    import pyarrow  # noqa: F401
+    STORE_FORMAT = "parquet"
+except ImportError:
+    STORE_FORMAT = "pkl"
+
+BAR_STORE_DIR = os.path.join("data_cache", "bars")
+# A bar for today fetched during the session is provisional until the close
+MARKET_CLOSE = datetime.time(15, 5)
+# Don't re-check the upstream for a symbol more often than this (seconds)
+REFRESH_TTL = 600
+
+
+def sina_symbol(code):
+    """600000 -> sh600000, 000001 -> sz000001, 830799 -> bj830799."""
+    code = str(code).zfill(6)
+    if code.startswith('6'):
+        return f"sh{code}"
+    if code.startswith(('8', '4', '9')):
+        return f"bj{code}"
+    return f"sz{code}"
+
+
+def _norm_date(value):
+    """Accept 'YYYYMMDD', 'YYYY-MM-DD', date or datetime; return 'YYYY-MM-DD'."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    value = str(value)
+    if len(value) == 8 and value.isdigit():
+        return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+    return value[:10]
+
+
+def _latest_expected_bar(end):
+    """Most recent trading day <= end that should already have a bar."""
+    now = datetime.datetime.now()
+    day = datetime.datetime.strptime(end, '%Y-%m-%d').date()
+    if day >= now.date():
+        day = now.date()
+        if now.time() < datetime.time(9, 30):
+            day -= datetime.timedelta(days=1)
+    return prev_trading_day(day, 0).strftime('%Y-%m-%d')
+
+
+class BarStore:
+    """Local daily-bar store: get_bars() downloads only what the disk is missing."""
+
+    def __init__(self, root=BAR_STORE_DIR, fetcher=None):
+        self.root = root
+        self.fetcher = fetcher or self._fetch_sina
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._frames = {}
+        self._checked = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'downloads': 0, 'rebuilds': 0, 'manifest_writes': 0}
+        self.flight = SingleFlight()
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self._manifest_dirty = False
+        self._flush_lock = threading.Lock()
+        atexit.register(self._flush_at_exit)
+
+    # --- persistence ---
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"BarStore manifest unreadable, starting fresh: {e}")
+        return {}
+
+    def flush(self):
+        """Write the manifest if any symbol changed since the last flush."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._manifest_dirty:
+                    return
+                payload = json.dumps(self.manifest, indent=1, sort_keys=True)
+                self._manifest_dirty = False
+            tmp = self.manifest_path + ".tmp"
+            try:
+                with open(tmp, 'w') as f:
+                    f.write(payload)
+                os.replace(tmp, self.manifest_path)
+            except Exception:
+                with self._lock:
+                    self._manifest_dirty = True
+                raise
+            self._count('manifest_writes')
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"BarStore: could not write manifest at exit: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _path(self, code, adjust):
+        return os.path.join(self.root, adjust or "raw", f"{code}.{STORE_FORMAT}")
+
+    def _read(self, code, adjust):
+        key = (code, adjust)
+        if key in self._frames:
+            return self._frames[key]
+        path = self._path(code, adjust)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path) if STORE_FORMAT == "parquet" else pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"BarStore: corrupt file {path}, rebuilding: {e}")
+            return None
+        self._frames[key] = df
+        return df
+
+    def _write(self, code, adjust, df, covered_from):
+        path = self._path(code, adjust)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if STORE_FORMAT == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_pickle(path)
+        self._frames[(code, adjust)] = df
+        with self._lock:
+            self.manifest.setdefault(adjust or "raw", {})[code] = {
+                'first': df['date'].iloc[0] if not df.empty else None,
+                'last': df['date'].iloc[-1] if not df.empty else None,
+                'rows': len(df),
+                'covered_from': covered_from,
+                'updated_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._manifest_dirty = True
+
+    # --- upstream ---
+
+    @staticmethod
+    def _fetch_sina(code, start, end, adjust):
+        get_limiter('sina').acquire()
+        return ak.stock_zh_a_daily(symbol=sina_symbol(code), start_date=start.replace('-', ''),
+                                   end_date=end.replace('-', ''), adjust=adjust)
+
+    def _download(self, code, start, end, adjust):
+        self._count('downloads')
+        df = self.fetcher(code, start, end, adjust)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        if 'date' not in df.columns:
+            df = df.reset_index()
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        return df.sort_values('date').drop_duplicates('date', keep='last').reset_index(drop=True)
+
+    def _is_stale(self, code, adjust, last, end):
+        meta = self.manifest.get(adjust or "raw", {}).get(code, {})
+        checked = self._checked.get((code, adjust))
+        if checked and time.time() - checked < REFRESH_TTL:
+            return False
+        if last < _latest_expected_bar(end):
+            return True
+        # Today's bar stored before the close is provisional
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        if last == today:
+            updated = meta.get('updated_at', '')
+            return updated < f"{today} {MARKET_CLOSE.strftime('%H:%M:%S')}"
+        return False
+
+    # --- public API ---
+
+    def stored_symbols(self, adjust="qfq"):
+        """Symbols that already have bars on disk for this adjust mode."""
+        with self._lock:
+            return set(self.manifest.get(adjust or "raw", {}))
+
+    def peek(self, symbol, adjust="qfq"):
+        """Bars already on disk for `symbol`, without any download (None if not stored)."""
+        code = str(symbol).zfill(6)
+        with self._lock:
+            lock = self._locks.setdefault((code, adjust), threading.Lock())
+        with lock:
+            return self._read(code, adjust)
+
+    def get_bars(self, symbol, start=None, end=None, adjust="qfq"):
+        """Return daily bars for [start, end] (any date format), or None if unavailable.
+
+        Missing leading history is back-filled once; missing trailing bars are
+        appended. If the overlap bar no longer matches (new adjust factor after an
+        ex-dividend), the symbol is rebuilt from scratch.
+        """
+        code = str(symbol).zfill(6)
+        end = _norm_date(end) or datetime.date.today().strftime('%Y-%m-%d')
+        start = _norm_date(start) or (datetime.date.today() - datetime.timedelta(days=120)).strftime('%Y-%m-%d')
+        # Identical (endpoint, symbol, window, adjust) requests share one in-flight
+        # read/refresh; taken before the per-symbol lock so waiters coalesce
+        window = self.flight.do(('stock_zh_a_daily', code, start, end, adjust),
+                                lambda: self._get_window(code, start, end, adjust))
+        return None if window is None else window.copy()
+
+    def _get_window(self, code, start, end, adjust):
+        with self._lock:
+            lock = self._locks.setdefault((code, adjust), threading.Lock())
+        with lock:
+            df = self._read(code, adjust)
+            meta = self.manifest.get(adjust or "raw", {}).get(code, {})
+            covered_from = meta.get('covered_from') if df is not None else None
+
+            if df is None or df.empty or covered_from is None:
+                df = self._download(code, start, end, adjust)
+                if df.empty:
+                    return None
+                self._write(code, adjust, df, start)
+                self._checked[(code, adjust)] = time.time()
+                covered_from = start
+            else:
+                changed = False
+                if start < covered_from:
+                    older = self._download(code, start, df['date'].iloc[0], adjust)
+                    if not older.empty:
+                        df = pd.concat([older[older['date'] < df['date'].iloc[0]], df], ignore_index=True)
+                    covered_from = start
+                    changed = True
+                last = df['date'].iloc[-1]
+                if self._is_stale(code, adjust, last, end):
+                    newer = self._download(code, last, end, adjust)
+                    self._checked[(code, adjust)] = time.time()
+                    if not newer.empty:
+                        overlap = newer[newer['date'] == last]
+                        stored_close = float(df['close'].iloc[-1])
+                        if not overlap.empty and stored_close > 0 and \
+                                abs(float(overlap['close'].iloc[0]) / stored_close - 1) > 1e-4 and \
+                                last != datetime.date.today().strftime('%Y-%m-%d'):
+                            # Adjust factor moved: stored history is no longer comparable
+                            self._count('rebuilds')
+                            df = self._download(code, covered_from, end, adjust)
+                        else:
+                            df = pd.concat([df[df['date'] < newer['date'].iloc[0]], newer], ignore_index=True)
+                        changed = True
+                else:
+                    self._count('hits')
+                if changed and not df.empty:
+                    self._write(code, adjust, df, covered_from)
+
+        if df.empty:
+            return None
+        window = df[(df['date'] >= start) & (df['date'] <= end)]
+        if window.empty:
+            return None
+        return window.reset_index(drop=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bar_store():
+    """Process-wide BarStore instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BarStore()
+        return _store
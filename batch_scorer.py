@@ -0,0 +1,434 @@
+"""
+BatchScorer — Cross-sectional scoring of the whole candidate pool at once.
+Histories are stacked into right-aligned (symbols x days) arrays, so every
+technical filter and factor from siphon_strategy._score_candidate becomes a
+handful of NumPy column operations instead of per-symbol merges and iterrows.
+Results are the same dicts, with the same values, as the per-symbol path.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from filter_stats import FilterStats
+from jit_kernels import limit_up_gene, resilience_streak, vcp_breakout
+from scoring_engine import _pyround, get_regime_weights
+
+HIST_FIELDS = ('high', 'low', 'close', 'volume', 'change_pct')
+
+
+class PricePanel:
+    """Right-aligned history arrays: column -1 is each symbol's latest bar and
+    shorter histories are NaN-padded on the left.
+
+    close / high / low / volume / chg  — the symbol's own bars, shape (n, depth)
+    m_chg / m_idx_chg / m_close / m_idx_close — only bars whose date is in the
+        index frame, paired with the index row (the inner merge the per-symbol
+        factors do), shape (n, m_depth)
+    """
+
+    def __init__(self, histories, index_df):
+        n = len(histories)
+        self.n = n
+        self.lengths = np.array([len(h) for h in histories], dtype=np.int64)
+        self.depth = int(self.lengths.max()) if n else 0
+
+        long = pd.concat([h[['date'] + list(HIST_FIELDS)] for h in histories], ignore_index=True) \
+            if n else pd.DataFrame(columns=['date'] + list(HIST_FIELDS))
+        sym = np.repeat(np.arange(n), self.lengths)
+        col = self._right_aligned_columns(sym, self.lengths, self.depth)
+        for field in HIST_FIELDS:
+            arr = np.full((n, self.depth), np.nan)
+            arr[sym, col] = pd.to_numeric(long[field], errors='coerce').to_numpy(dtype=float)
+            setattr(self, 'chg' if field == 'change_pct' else field, arr)
+        self.pad = np.arange(self.depth)[None, :] < (self.depth - self.lengths)[:, None]
+
+        long['_sym'] = sym
+        index_cols = index_df[['date', 'close', 'Index_Change']]
+        merged = long[['_sym', 'date', 'close', 'change_pct']].merge(
+            index_cols, on='date', how='inner', suffixes=('', '_idx'))
+        m_sym = merged['_sym'].to_numpy()
+        self.m_lengths = np.bincount(m_sym, minlength=n) if n else np.zeros(0, dtype=np.int64)
+        self.m_depth = int(self.m_lengths.max()) if n and len(merged) else 0
+        m_col = (self.m_depth - self.m_lengths[m_sym]) + merged.groupby('_sym').cumcount().to_numpy()
+        for field, name in (('change_pct', 'm_chg'), ('Index_Change', 'm_idx_chg'),
+                            ('close', 'm_close'), ('close_idx', 'm_idx_close')):
+            arr = np.full((n, self.m_depth), np.nan)
+            arr[m_sym, m_col] = merged[field].to_numpy(dtype=float)
+            setattr(self, name, arr)
+
+    @staticmethod
+    def _right_aligned_columns(sym, lengths, depth):
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        return (depth - lengths[sym]) + (np.arange(len(sym)) - offsets[sym])
+
+    def col(self, arr, k):
+        """Column k from the right (k=1 -> latest bar); NaN where the window is too short."""
+        if arr.shape[1] < k:
+            return np.full(arr.shape[0], np.nan)
+        return arr[:, -k]
+
+
+def _rolling_last(arr, window):
+    """Last value of pandas' rolling(window).mean() for every row.
+    Runs pandas' own kernel on the transposed panel so results match Series.rolling bit for bit."""
+    if arr.shape[1] == 0:
+        return np.full(arr.shape[0], np.nan)
+    return pd.DataFrame(arr.T).rolling(window).mean().iloc[-1].to_numpy()
+
+
+def _nanmean_cols(arr, start, stop):
+    """Row mean over columns [start:stop] from the right, skipping NaN (pandas Series.mean())."""
+    window = arr[:, start:stop] if stop else arr[:, start:]
+    count = np.sum(~np.isnan(window), axis=1)
+    total = np.nansum(window, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _round_as(values, is_numpy, ndigits):
+    """round() the way the per-symbol code does: values that are NumPy scalars there
+    go through np.round (half-to-even on the scaled value), plain floats through
+    the built-in. The two disagree on values like 25.85, so the origin matters."""
+    return np.where(is_numpy, np.round(values, ndigits), _pyround(values, ndigits))
+
+
+def technical_factors(panel, cfg):
+    """History-only inputs of _filter_technicals (NaN where the check does not apply)."""
+    lengths = panel.lengths
+    price = panel.col(panel.close, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Anti-FOMO: 5-day cumulative gain
+        close_5d = panel.col(panel.close, 6)
+        gain_5d = np.where(lengths > 5, (price - close_5d) / close_5d * 100, np.nan)
+
+        # RSI(14)
+        delta = np.diff(panel.close, axis=1, prepend=np.nan)
+        up = np.where(delta > 0, delta, 0.0)
+        down = -np.where(delta < 0, delta, 0.0)
+        up[panel.pad] = np.nan
+        down[panel.pad] = np.nan
+        rsi = 100 - (100 / (1 + _rolling_last(up, 14) / _rolling_last(down, 14)))
+
+    # MA trend
+    ma = np.where(lengths >= cfg.ma_period, _rolling_last(panel.close, cfg.ma_period), np.nan)
+    return {'price': price, 'gain_5d': gain_5d, 'rsi': rsi, 'ma': ma,
+            'avg_volume_20': _nanmean_cols(panel.volume, -20, None)}
+
+
+def technical_mask_from(tech, realtime_change_pct, turnover_rate, cfg, stats=None, spot_checked=False):
+    """True where a candidate passes _filter_technicals, given technical_factors().
+    Stages run in _filter_technicals' order and are recorded in `stats`; the spot
+    gates are skipped when the caller already applied them (spot_checked=True)."""
+    stats = stats if stats is not None else FilterStats()
+    with np.errstate(invalid='ignore'):
+        has_turnover = turnover_rate > 0
+        ok = np.ones(np.broadcast(realtime_change_pct, tech['price']).shape, dtype=bool)
+        stages = () if spot_checked else (
+            ('limit_up', lambda: realtime_change_pct > cfg.limit_up_threshold),
+            ('turnover', lambda: has_turnover & ((turnover_rate < 5.0) | (turnover_rate > 35.0))),
+        )
+        stages += (
+            ('gain_5d', lambda: tech['gain_5d'] > cfg.max_gain_5d),
+            # Liquidity: 20-day average volume when turnover is missing
+            ('liquidity', lambda: ~has_turnover & (tech['avg_volume_20'] < cfg.min_avg_volume)),
+            ('ma_trend', lambda: tech['price'] < tech['ma']),
+            ('rsi', lambda: tech['rsi'] > cfg.max_rsi),
+        )
+        for stage, failed in stages:
+            t = time.perf_counter()
+            ok = stats.mask(stage, ok, failed(), t)
+    return ok
+
+
+def technical_mask(panel, realtime_change_pct, turnover_rate, cfg):
+    """Vectorized siphon_strategy._filter_technicals: True where a candidate passes."""
+    return technical_mask_from(technical_factors(panel, cfg), realtime_change_pct, turnover_rate, cfg)
+
+
+def antigravity_scores(panel, lookback=10):
+    """Vectorized calculate_antigravity_score (score only)."""
+    idx = panel.m_idx_chg[:, -lookback:]
+    stk = panel.m_chg[:, -lookback:]
+    with np.errstate(invalid='ignore'):
+        down = idx < -0.3
+        defiant = down & (stk > 0)
+        resilient = down & ~(stk > 0) & (stk > idx + 1.5)
+    held = defiant | resilient
+    score = (2.0 * defiant + 1.0 * resilient).sum(axis=1)
+    if not idx.shape[1]:
+        return score
+    # Resilient down days after the last non-resilient one = trailing streak
+    streak = resilience_streak(held, down & ~held, lookback)[:, -1]
+    return score + np.where(streak >= 2, 1.0, 0.0)
+
+
+def micro_momentum_scores(panel):
+    """Vectorized calc_micro_momentum."""
+    close, idx_close = panel.m_close, panel.m_idx_close
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stock_3d = (panel.col(close, 1) / panel.col(close, 4) - 1) * 100
+        stock_5d = (panel.col(close, 1) / panel.col(close, 6) - 1) * 100
+        idx_3d = (panel.col(idx_close, 1) / panel.col(idx_close, 4) - 1) * 100
+        idx_5d = (panel.col(idx_close, 1) / panel.col(idx_close, 6) - 1) * 100
+    alpha_3d = stock_3d - idx_3d
+    alpha_5d = stock_5d - idx_5d
+    score = np.minimum(np.maximum(alpha_3d * 2.0, 0), 15.0) + np.minimum(np.maximum(alpha_5d * 1.5, 0), 10.0)
+    score = np.where(panel.m_lengths < 6, 0.0, score)
+    return _pyround(score, 1)
+
+
+def institutional_burst(panel, is_hot_sector):
+    """Vectorized calc_institutional_burst -> (score, vol_ratio, is_closing_high)."""
+    base, vol_ratio, closing_high = institutional_burst_base(panel)
+    return with_sector_bonus(base, is_hot_sector), vol_ratio, closing_high
+
+
+def with_sector_bonus(base, is_hot_sector):
+    """Institutional burst from its sector-independent part (+10 hot sector, capped at 40);
+    NaN base (history too short) scores 0."""
+    with np.errstate(invalid='ignore'):
+        score = np.minimum(base + np.where(is_hot_sector, 10.0, 0.0), 40.0)
+    return np.where(np.isnan(base), 0.0, score)
+
+
+def institutional_burst_base(panel):
+    """calc_institutional_burst without the hot-sector bonus (volume/price + pocket pivot);
+    the score is NaN for histories shorter than 11 bars."""
+    today_vol = panel.col(panel.volume, 1)
+    today_chg = panel.col(panel.chg, 1)
+    high, low, close = panel.col(panel.high, 1), panel.col(panel.low, 1), panel.col(panel.close, 1)
+    ma5_vol = _nanmean_cols(panel.volume, -6, -1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vol_ratio = np.where(ma5_vol > 0, today_vol / ma5_vol, 1.0)
+        hl_range = high - low
+        close_position = np.where(hl_range > 0, (close - low) / hl_range, 1.0)
+
+        score = np.where((close_position > 0.85) & (vol_ratio >= 2.0), 15.0,
+                         np.where((close_position > 0.70) & (vol_ratio >= 1.5), 8.0, 0.0))
+
+        # Pocket pivot: today's volume above every down-day volume of the prior 10 bars
+        recent_chg = panel.chg[:, -11:-1]
+        recent_vol = panel.volume[:, -11:-1]
+        is_down = recent_chg < 0
+        max_down_vol = np.where(is_down.any(axis=1),
+                                np.where(is_down, recent_vol, -np.inf).max(axis=1), 0.0)
+        score += np.where((today_vol > max_down_vol) & (today_chg > 0), 15.0,
+                          np.where((today_vol > ma5_vol * 1.5) & (today_chg > 0), 5.0, 0.0))
+
+    short = panel.lengths < 11
+    return (np.where(short, np.nan, score),
+            np.where(short, 1.0, np.round(vol_ratio, 2)),
+            np.where(short, False, close_position > 0.85))
+
+
+def vcp_scores(panel):
+    """Vectorized calc_vcp_breakout -> (score, is_vcp)."""
+    if panel.depth == 0:
+        return np.zeros(panel.n), np.zeros(panel.n, dtype=bool)
+    score = np.where(panel.lengths >= 6, vcp_breakout(panel.volume, panel.chg)[:, -1], 0.0)
+    return score, score == 15.0
+
+
+def limit_up_gene_scores(panel, lookback=20):
+    """Vectorized calc_limit_up_gene -> (score, had_limit_up)."""
+    if panel.depth == 0:
+        return np.zeros(panel.n), np.zeros(panel.n, dtype=bool)
+    score = limit_up_gene(panel.chg, panel.close, panel.high, lookback)[:, -1]
+    score = np.where(panel.lengths >= lookback, score, 0.0)
+    return score, score > 0
+
+
+def ma_alignment(panel):
+    """Vectorized calc_ma_alignment_score -> (score, label)."""
+    ma5 = _rolling_last(panel.close, 5)
+    ma20 = _rolling_last(panel.close, 20)
+    ma60 = _rolling_last(panel.close, 60)
+    conditions = [panel.lengths < 60,
+                  np.isnan(ma5) | np.isnan(ma20) | np.isnan(ma60),
+                  (ma5 > ma20) & (ma20 > ma60),
+                  ma5 > ma20,
+                  (ma5 < ma20) & (ma20 < ma60)]
+    scores = np.select(conditions, [0.0, 0.0, 10.0, 5.0, -5.0], 0.0)
+    labels = np.select(conditions, ['insufficient_data', 'na', '多头排列', '短多', '空头排列'], '震荡')
+    return scores, labels
+
+
+def composite_scores(ag, mom, inst, vcp, weights):
+    """Vectorized calc_composite_score, summed in the same order so floats match exactly.
+    Weights may be (configs x 1) arrays to score several weightings at once."""
+    score = 0.0 + np.minimum(inst, weights['inst_burst'])
+    score = score + np.minimum(mom, weights['micro_mom'])
+    score = score + np.minimum(ag * 2.0, np.asarray(weights['antigravity'], dtype=float))
+    score = score + np.minimum(vcp, weights['vcp'])
+    return _pyround(np.minimum(score, 100.0), 1)
+
+
+def final_composites(f, inst, weights, sentiment_mult):
+    """_score_candidate's final composite: weighted factors + limit-up gene + MA
+    alignment bonuses, clipped to 0-100, then the sentiment multiplier."""
+    composite = composite_scores(f['ag'], f['mom'], inst, f['vcp'], weights)
+    composite = _pyround(np.minimum(np.maximum(composite + f['lu_gene'] + f['ma_score'], 0), 100.0), 1)
+    composite = composite * sentiment_mult
+    # A NumPy multiplier makes the per-symbol product a NumPy scalar (np.round) unless capped
+    is_numpy = isinstance(sentiment_mult, np.generic) & ~(composite > 100.0)
+    return _round_as(np.minimum(composite, 100.0), is_numpy, 1)
+
+
+def _grade(composite):
+    if composite >= 80:
+        return 'S', '强烈推荐'
+    elif composite >= 60:
+        return 'A', '推荐'
+    elif composite >= 40:
+        return 'B', '观察'
+    return 'C', '弱'
+
+
+def panel_factors(panel, cfg):
+    """Every history-only factor of the pool as {name: array}: what score_candidates
+    needs besides the spot row, hot sectors, regime and sentiment."""
+    factors = technical_factors(panel, cfg)
+    factors['hist_chg'] = panel.col(panel.chg, 1)
+    factors['ag'] = antigravity_scores(panel)
+    factors['mom'] = micro_momentum_scores(panel)
+    factors['inst_base'], factors['vol_ratio'], factors['closing_high'] = institutional_burst_base(panel)
+    factors['vcp'], factors['is_vcp'] = vcp_scores(panel)
+    factors['lu_gene'], factors['had_lu'] = limit_up_gene_scores(panel)
+    factors['ma_score'], factors['ma_label'] = ma_alignment(panel)
+    return factors
+
+
+def pool_factors(histories, index_df, cfg, symbols=None, cache=None):
+    """panel_factors for `histories`, served from `cache` (a FactorCache) where the
+    symbol's bars, index, config and scoring code are unchanged."""
+    if cache is None or symbols is None:
+        return panel_factors(PricePanel(histories, index_df), cfg)
+
+    keys = cache.keys(symbols, histories, index_df, cfg)
+    entries = [cache.lookup(key) for key in keys]
+    misses = [i for i, entry in enumerate(entries) if entry is None]
+    if misses:
+        fresh = panel_factors(PricePanel([histories[i] for i in misses], index_df), cfg)
+        for j, i in enumerate(misses):
+            entries[i] = {name: values[j].item() for name, values in fresh.items()}
+            cache.store(keys[i], entries[i])
+    return {name: np.array([entry[name] for entry in entries]) for name in entries[0]}
+
+
+def with_state_technicals(f, state, symbols, histories, cfg):
+    """`f` with the technical-gate inputs read from a FactorStateStore wherever the
+    symbol's state ends on its history's last bar (O(1) per symbol, no rolling
+    windows); other rows keep the values computed from the panel."""
+    last_dates = [h['date'].iloc[-1] if len(h) else None for h in histories]
+    tech = state.technical_factors(symbols, last_dates, cfg.ma_period)
+    if tech is None:
+        return f
+    current = tech.pop('current')
+    f = dict(f)
+    for name, values in tech.items():
+        f[name] = np.where(current, values, f[name])
+    return f
+
+
+def spot_columns(candidates, hot_sectors):
+    """(realtime change %, turnover, spot price, in hot sector) arrays for [(row, realtime_change_pct, hist), ...]."""
+    rows = [c[0] for c in candidates]
+    realtime_chg = np.array([c[1] for c in candidates], dtype=float)
+    turnover = pd.to_numeric(pd.Series([r.get('Turnover_Rate', 0) for r in rows]), errors='coerce').to_numpy(dtype=float)
+    spot_price = pd.to_numeric(pd.Series([r.get('Price', 0) for r in rows]), errors='coerce').to_numpy(dtype=float)
+    is_hot = np.array([(r['Industry'] in hot_sectors) if hot_sectors else True for r in rows])
+    return realtime_chg, turnover, spot_price, is_hot
+
+
+def score_candidates(candidates, index_df, hot_sectors, regime, sentiment_mult, last_trading_date,
+                     cfg, weights=None, verbose=True, cache=None, stats=None, rs_pct=None, state=None,
+                     spot_checked=False):
+    """Score [(row, realtime_change_pct, hist), ...] in one pass.
+
+    Returns the list of result dicts siphon_strategy._score_candidate would have
+    produced for the same candidates (in candidate order, rejected ones dropped).
+    With a FactorCache, only candidates whose history-only factors changed are recomputed.
+    Per-stage rejections are recorded in `stats` (a FilterStats); every factor is
+    computed up front for the whole pool, timed as the 'factors' stage.
+    rs_pct (RS percentiles by symbol, see rs_rank) fills the RS_Pct column.
+    With a FactorStateStore synced to these histories (`state`), the technical
+    gates read MA / RSI / gain / volume from it; those agree with the rolling
+    recomputation to float tolerance rather than bit for bit.
+    spot_checked: the spot gates already ran before the fetch (not re-applied).
+    """
+    if not candidates:
+        return []
+    weights = weights or get_regime_weights(regime)
+    rows = [c[0] for c in candidates]
+    symbols = [str(r['Symbol']).zfill(6) for r in rows]
+    stats = stats if stats is not None else FilterStats()
+    t = time.perf_counter()
+    f = pool_factors([c[2] for c in candidates], index_df, cfg, symbols, cache)
+    if state is not None:
+        f = with_state_technicals(f, state, symbols, [c[2] for c in candidates], cfg)
+    stats.record('factors', len(candidates), 0, time.perf_counter() - t)
+
+    realtime_chg, turnover, spot_price, is_hot = spot_columns(candidates, hot_sectors)
+    industries = [r['Industry'] for r in rows]
+
+    keep = technical_mask_from(f, realtime_chg, turnover, cfg, stats, spot_checked)
+    ag = f['ag']
+    keep = stats.mask('antigravity', keep, ag < cfg.min_ag_score)
+
+    t = time.perf_counter()
+
+    mom = f['mom']
+    inst = with_sector_bonus(f['inst_base'], is_hot)
+    vol_ratio, closing_high = f['vol_ratio'], f['closing_high']
+    vcp, is_vcp = f['vcp'], f['is_vcp']
+    had_lu, ma_label = f['had_lu'], f['ma_label']
+
+    composite = final_composites(f, inst, weights, sentiment_mult)
+    keep = stats.mask('composite', keep, composite < cfg.min_composite_score, t)
+
+    hist_chg = f['hist_chg']
+    rs = rs_pct.reindex(symbols).to_numpy(dtype=float) if rs_pct is not None else np.full(len(rows), np.nan)
+    price = np.where(~np.isnan(spot_price) & (spot_price > 0), spot_price, f['price'])
+
+    results = []
+    for i in np.flatnonzero(keep):
+        row = rows[i]
+        tags = []
+        if inst[i] >= 25: tags.append(f"爆量突袭{vol_ratio[i]:.1f}x")
+        if mom[i] >= 15: tags.append("强势连击🚀")
+        if closing_high[i]: tags.append("光头阳")
+        if is_vcp[i]: tags.append("老鸭头突破")
+        if ag[i] >= 4: tags.append("金身免伤防御盾")
+        if is_hot[i]: tags.append("主线共振")
+        if had_lu[i]: tags.append("连板基因🧬")
+        if ma_label[i] == '多头排列': tags.append("多头排列📈")
+        signal_str = " ".join(tags) if tags else "Momentum"
+        grade, grade_label = _grade(composite[i])
+        if verbose:
+            print(f"MATCH {row['Name']}: [{grade}] C={composite[i]} Mom={mom[i]:.1f} Burst={inst[i]:.0f} "
+                  f"VCP={vcp[i]:.0f} MA={ma_label[i]}")
+        results.append({
+            'Symbol': str(row['Symbol']).zfill(6),
+            'Name': row['Name'],
+            'Date': last_trading_date,
+            'Industry': industries[i],
+            'Price': float(price[i]),
+            'Change_Pct': hist_chg[i],
+            'AG_Score': composite[i],
+            'Strategy': signal_str,
+            'Logic': signal_str,
+            'Volume_Note': f"VolR:{vol_ratio[i]:.1f}x Burst:{inst[i]:.0f}",
+            'RS_Score': mom[i],
+            'Vol_Explosion': vol_ratio[i],
+            'Momentum_Accel': vcp[i],
+            'Sector_Leader': bool(is_hot[i]),
+            'Flow_Ratio': inst[i],
+            'Composite': composite[i],
+            'Grade': grade,
+            'Grade_Label': grade_label,
+            'MA_Alignment': str(ma_label[i]),
+            'RS_Pct': float(rs[i]),
+        })
+    return results
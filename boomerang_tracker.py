@@ -530,26 +530,17 @@ def sync_from_csv(csv_path="siphon_strategy_results.csv", rec_date=None):
 # --- CLI Entry Point ---
 if __name__ == "__main__":
     import sys
+    import requests_patch  # header spoofing, throttling and cassette record/replay
     
     # Adapter for update_daily_performance
     def ak_fetcher_adapter(stock_code):
         try:
-            # Determine prefix
-            if stock_code.startswith('6'): prefix = 'sh'
-            elif stock_code.startswith('0') or stock_code.startswith('3'): prefix = 'sz'
-            elif stock_code.startswith('8') or stock_code.startswith('4'): prefix = 'bj'
-            else: prefix = 'sh' # Default
+            from bar_store import get_bar_store
+            # Latest bar from the shared store (downloads only what's missing)
+            start_dt = (datetime.date.today() - datetime.timedelta(days=5)).strftime("%Y%m%d")
+            df = get_bar_store().get_bars(stock_code, start_dt, datetime.date.today().strftime("%Y%m%d"), adjust="")
             
-            full_code = prefix + stock_code
-            # Fetch just today/latest
-            df = ak.stock_zh_a_daily(symbol=full_code, start_date=datetime.date.today().strftime("%Y%m%d"), end_date=datetime.date.today().strftime("%Y%m%d"))
-            
-            if df.empty:
-                # Try fetching a bit more history if today is empty (e.g. before market close)
-                start_dt = (datetime.date.today() - datetime.timedelta(days=5)).strftime("%Y%m%d")
-                df = ak.stock_zh_a_daily(symbol=full_code, start_date=start_dt, end_date=datetime.date.today().strftime("%Y%m%d"))
-            
-            if not df.empty:
+            if df is not None and not df.empty:
                 last_row = df.iloc[-1]
                 # Try to calculate change_pct if missing
                 return {
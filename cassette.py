@@ -0,0 +1,193 @@
+"""
+Cassette — Record / replay of akshare and HTTP responses for offline runs.
+SIPHON_CASSETTE=record stores every akshare result and every direct `requests`
+response as gzip pickles; SIPHON_CASSETTE=replay serves them back with zero
+network (and no throttling), so whole pipeline runs are fast and reproducible.
+
+Run replays from a scratch working directory: bar / spot / sentiment caches
+live under data_cache/ and would otherwise short-circuit the recorded calls.
+"""
+
+import datetime
+import gzip
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import akshare_hooks
+
+logger = logging.getLogger("SiphonSystem")
+
+CASSETTE_MODE = os.environ.get("SIPHON_CASSETTE", "").lower()  # "", "record" or "replay"
+CASSETTE_DIR = os.environ.get("SIPHON_CASSETTE_DIR", os.path.join("data_cache", "cassettes"))
+# Seed for the pipeline's shuffles while recording / replaying, so a replay
+# draws the same candidate slice the recording did
+CASSETTE_SEED = int(os.environ.get("SIPHON_CASSETTE_SEED", "0"))
+
+# Dates and timestamp cache-busters differ between the recording day and the
+# replay day; a second "loose" key, used when the exact key misses, drops the
+# timestamps and turns each date into its day offset from today. Two windows
+# for one symbol keep distinct loose keys, and a replay on a later day finds
+# the recording of the same window shape (e.g. "last 120 days").
+_DATE_RE = re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)")
+_STAMP_RE = re.compile(r"\d{10,}")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Replay mode found no recording for a call (treated like a network failure)."""
+
+
+def is_replay():
+    return CASSETTE_MODE == "replay"
+
+
+def is_recording():
+    return CASSETTE_MODE == "record"
+
+
+def shuffle_seed():
+    """Fixed seed in record / replay mode, None (fresh randomness) otherwise."""
+    return CASSETTE_SEED if CASSETTE_MODE in ("record", "replay") else None
+
+
+def _today():
+    return datetime.date.today()
+
+
+def _day_offset(match):
+    try:
+        day = datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return "<date>"
+    return f"<d{(day - _today()).days:+d}>"
+
+
+class Cassette:
+    """gzip-pickle store: <root>/<kind>/<name>/<sha1>.pkl.gz (+ a loose/ copy)."""
+
+    def __init__(self, root=CASSETTE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self.stats = {'recorded': 0, 'replayed': 0, 'loose_replayed': 0, 'misses': 0}
+
+    @staticmethod
+    def _keys(signature):
+        loose = _DATE_RE.sub(_day_offset, _STAMP_RE.sub("<ts>", signature))
+        return (hashlib.sha1(signature.encode('utf-8')).hexdigest(),
+                hashlib.sha1(loose.encode('utf-8')).hexdigest())
+
+    def _paths(self, kind, name, signature):
+        exact, loose = self._keys(signature)
+        base = os.path.join(self.root, kind, re.sub(r"[^\w.-]", "_", name))
+        return os.path.join(base, f"{exact}.pkl.gz"), os.path.join(base, "loose", f"{loose}.pkl.gz")
+
+    def save(self, kind, name, signature, value):
+        exact_path, loose_path = self._paths(kind, name, signature)
+        payload = pickle.dumps({'signature': signature, 'value': value}, protocol=pickle.HIGHEST_PROTOCOL)
+        for path in (exact_path, loose_path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        with self._lock:
+            self.stats['recorded'] += 1
+
+    def load(self, kind, name, signature):
+        exact_path, loose_path = self._paths(kind, name, signature)
+        for path, stat in ((exact_path, 'replayed'), (loose_path, 'loose_replayed')):
+            if os.path.exists(path):
+                with gzip.open(path, 'rb') as f:
+                    value = pickle.loads(f.read())['value']
+                with self._lock:
+                    self.stats[stat] += 1
+                return value
+        with self._lock:
+            self.stats['misses'] += 1
+        raise CassetteMiss(f"No cassette recording for {kind}:{name} {signature[:120]}")
+
+
+_cassette = None
+
+
+def get_cassette():
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette()
+    return _cassette
+
+
+# --- akshare level ---
+
+def _call_signature(args, kwargs):
+    return repr(args) + repr(sorted(kwargs.items()))
+
+
+def _akshare_hook(name, call, args, kwargs):
+    signature = _call_signature(args, kwargs)
+    if is_replay():
+        return get_cassette().load('akshare', name, signature)
+    result = call()
+    try:
+        get_cassette().save('akshare', name, signature, result)
+    except Exception as e:
+        logger.warning(f"Cassette: could not record {name}: {e}")
+    return result
+
+
+# --- requests level (calls made outside akshare, e.g. Sina hq quotes) ---
+
+def _http_signature(method, url, kwargs):
+    prepared = requests.Request(method=method.upper(), url=url, params=kwargs.get('params'),
+                                data=kwargs.get('data'), json=kwargs.get('json')).prepare()
+    body = prepared.body or b""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return f"{prepared.method} {prepared.url} {hashlib.sha1(body).hexdigest()}"
+
+
+def http_replay(method, url, kwargs):
+    """Recorded requests.Response for this request (replay mode), else raise CassetteMiss."""
+    signature = _http_signature(method, url, kwargs)
+    host = requests.utils.urlparse(url).hostname or 'unknown'
+    rec = get_cassette().load('http', host, signature)
+    response = requests.Response()
+    response.status_code = rec['status_code']
+    response._content = rec['content']
+    response.headers = CaseInsensitiveDict(rec['headers'])
+    response.encoding = rec['encoding']
+    response.url = rec['url']
+    response.reason = rec.get('reason')
+    return response
+
+
+def http_record(method, url, kwargs, response):
+    if akshare_hooks.in_akshare_call():
+        return  # already captured as the akshare function's result
+    try:
+        signature = _http_signature(method, url, kwargs)
+        host = requests.utils.urlparse(url).hostname or 'unknown'
+        get_cassette().save('http', host, signature, {
+            'status_code': response.status_code,
+            'content': response.content,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'url': response.url,
+            'reason': response.reason,
+        })
+    except Exception as e:
+        logger.warning(f"Cassette: could not record {url}: {e}")
+
+
+def install_from_env():
+    """Hook akshare when SIPHON_CASSETTE is set (called from requests_patch)."""
+    if CASSETTE_MODE not in ("record", "replay"):
+        return
+    akshare_hooks.register_hook(_akshare_hook)
+    print(f"📼 Cassette {CASSETTE_MODE.upper()} mode ({CASSETTE_DIR})")
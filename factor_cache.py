@@ -0,0 +1,133 @@
+"""
+FactorCache — History-only factor vectors cached per symbol across runs.
+An entry is reused when the symbol's bars (last bar date + content hash), the
+index series, the scoring-relevant StrategyConfig fields and the scoring code
+are all unchanged, so the second cron run of a day, manual dispatches and
+restarts only rescore symbols with a new or revised bar.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("SiphonSystem")
+
+FACTOR_CACHE_PATH = os.path.join("data_cache", "factor_cache.pkl")
+# Modules whose source defines the cached factors: any edit invalidates the cache
+SCORING_MODULES = ("batch_scorer.py", "scoring_engine.py", "jit_kernels.py")
+# StrategyConfig fields that do not change any history-only factor
+NON_SCORING_FIELDS = frozenset({'max_process', 'fetch_workers', 'batch_scoring', 'factor_state', 'factor_cache',
+                                'rs_rank', 'rs_days'})
+HIST_COLUMNS = ['date', 'high', 'low', 'close', 'volume', 'change_pct']
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+def scoring_version():
+    """Hash of the scoring modules' source."""
+    h = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SCORING_MODULES:
+        with open(os.path.join(here, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def config_fingerprint(cfg):
+    fields = {k: v for k, v in dataclasses.asdict(cfg).items() if k not in NON_SCORING_FIELDS}
+    return _digest(json.dumps(fields, sort_keys=True, default=str).encode('utf-8'))
+
+
+def frame_fingerprint(df, columns):
+    """(last date, content hash) of the given columns of a bar frame."""
+    if df is None or df.empty:
+        return None, None
+    h = hashlib.sha1('\x00'.join(map(str, df['date'].to_numpy())).encode('utf-8'))
+    for col in columns:
+        if col == 'date' or col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        if values.dtype.kind not in 'fiub':
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy()
+        h.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return str(df['date'].iloc[-1]), h.hexdigest()[:16]
+
+
+class FactorCache:
+    """symbol -> (key, factors) in one pickle under data_cache/; only the latest
+    entry per symbol is kept."""
+
+    def __init__(self, path=FACTOR_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.version = scoring_version()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._index_fp = (None, None)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"FactorCache: unreadable {self.path}, starting fresh: {e}")
+
+    def save(self):
+        with self._lock:
+            payload = dict(self.entries)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def _index_fingerprint(self, index_df):
+        source, fp = self._index_fp
+        if source is not index_df:
+            fp = frame_fingerprint(index_df, ['date', 'close', 'Index_Change'])
+            self._index_fp = (index_df, fp)
+        return fp
+
+    def keys(self, symbols, histories, index_df, cfg):
+        """Cache key per (symbol, history): (symbol, last bar date, bar hash, config, code, index)."""
+        shared = (config_fingerprint(cfg), self.version, self._index_fingerprint(index_df))
+        return [(str(symbol).zfill(6),) + frame_fingerprint(hist, HIST_COLUMNS) + shared
+                for symbol, hist in zip(symbols, histories)]
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self.entries.get(key[0])
+            if entry is not None and entry[0] == key:
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+            return None
+
+    def store(self, key, factors):
+        with self._lock:
+            self.entries[key[0]] = (key, factors)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_factor_cache():
+    """Process-wide FactorCache instance."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FactorCache()
+        return _cache
@@ -0,0 +1,361 @@
+"""
+FactorState — Persisted per-symbol indicator state updated one bar at a time.
+Rolling sums (MA5..MA60, volume means, RSI-14 gains/losses), Wilder RSI averages,
+MACD EMAs and KDJ are carried forward, so applying a new bar is O(1) and a
+whole-universe factor snapshot needs no history re-scan. The batch scorer reads
+its technical-gate inputs (MA, RSI-14, 5-day gain, 20-day volume) from here.
+"""
+
+import logging
+import math
+import os
+import pickle
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("SiphonSystem")
+
+FACTOR_STATE_PATH = os.path.join("data_cache", "factor_state.pkl")
+# Bump when the state layout changes; old files are discarded
+STATE_VERSION = 1
+
+MA_WINDOWS = (5, 10, 20, 50, 60)
+VOL_WINDOWS = (5, 20)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+KDJ_PERIOD = 9
+# Bars kept per symbol: the longest window plus the bar leaving it
+KEEP_BARS = max(MA_WINDOWS + VOL_WINDOWS + (RSI_PERIOD + 1, 10 + 1)) + 1
+# Running sums are recomputed from the kept bars this often to cancel float drift
+RESYNC_EVERY = 250
+
+_BAR_FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _same_bar(a, b):
+    return a[0] == b[0] and all(x == y or (x != x and y != y) or math.isclose(x, y, rel_tol=1e-9)
+                                for x, y in zip(a[1:], b[1:]))
+
+
+def _up(d):
+    return d if d > 0 else 0.0
+
+
+def _down(d):
+    return -d if d < 0 else 0.0
+
+
+class SymbolFactorState:
+    """Indicator state for one symbol. apply(bar) appends a new bar or, when
+    the date equals the last bar's (a provisional intraday bar being revised),
+    replaces it."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bars = deque(maxlen=KEEP_BARS)
+        self.close_sums = {n: 0.0 for n in MA_WINDOWS}
+        self.vol_sums = {n: 0.0 for n in VOL_WINDOWS}
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        # Recursive (EMA-style) states, plus a copy from before the last bar for revisions
+        self.rec = {'n': 0, 'wilder_gain': None, 'wilder_loss': None, 'wilder_seed': [0.0, 0.0],
+                    'ema_fast': None, 'ema_slow': None, 'dea': None, 'k': 50.0, 'd': 50.0}
+        self._rec_before_last = None
+        self._evicted = None
+        self._since_resync = 0
+
+    @property
+    def last_date(self):
+        return self.bars[-1][0] if self.bars else None
+
+    def _diff_at(self, i):
+        """close[i] - close[i-1] for a deque position (negative ok); the first bar's diff is 0."""
+        n = len(self.bars)
+        i = i % n
+        if i == 0:
+            return 0.0
+        return self.bars[i][4] - self.bars[i - 1][4]
+
+    def apply(self, bar):
+        """bar: (date, open, high, low, close, volume). Returns True if the state changed
+        (False for bars older than the state or an identical repeat of the last bar)."""
+        bar = tuple(bar)
+        if self.bars and bar[0] < self.last_date:
+            return False
+        if self.bars and bar[0] == self.last_date:
+            if _same_bar(bar, self.bars[-1]):
+                return False
+            self._undo_last()
+        self._append(bar)
+        return True
+
+    def _append(self, bar):
+        self._rec_before_last = dict(self.rec, wilder_seed=list(self.rec['wilder_seed']))
+        self._evicted = self.bars[0] if len(self.bars) == self.bars.maxlen else None
+        self.bars.append(bar)
+        n = len(self.bars)
+        close, volume = bar[4], bar[5]
+
+        for w in MA_WINDOWS:
+            self.close_sums[w] += close
+            if n > w:
+                self.close_sums[w] -= self.bars[-w - 1][4]
+        for w in VOL_WINDOWS:
+            self.vol_sums[w] += volume
+            if n > w:
+                self.vol_sums[w] -= self.bars[-w - 1][5]
+        diff = self._diff_at(-1)
+        self.gain_sum += _up(diff)
+        self.loss_sum += _down(diff)
+        if n > RSI_PERIOD:
+            old = self._diff_at(-RSI_PERIOD - 1) if n > RSI_PERIOD + 1 else 0.0
+            self.gain_sum -= _up(old)
+            self.loss_sum -= _down(old)
+
+        self._advance_recursive(bar, diff)
+        self._since_resync += 1
+        if self._since_resync >= RESYNC_EVERY:
+            self._resync()
+
+    def _advance_recursive(self, bar, diff):
+        rec = self.rec
+        rec['n'] += 1
+        close = bar[4]
+        # Wilder RSI: SMA seed over the first RSI_PERIOD diffs, then smoothed
+        if rec['n'] > 1:
+            if rec['wilder_gain'] is None:
+                rec['wilder_seed'][0] += _up(diff)
+                rec['wilder_seed'][1] += _down(diff)
+                if rec['n'] == RSI_PERIOD + 1:
+                    rec['wilder_gain'] = rec['wilder_seed'][0] / RSI_PERIOD
+                    rec['wilder_loss'] = rec['wilder_seed'][1] / RSI_PERIOD
+            else:
+                rec['wilder_gain'] = (rec['wilder_gain'] * (RSI_PERIOD - 1) + _up(diff)) / RSI_PERIOD
+                rec['wilder_loss'] = (rec['wilder_loss'] * (RSI_PERIOD - 1) + _down(diff)) / RSI_PERIOD
+        # MACD
+        if rec['ema_fast'] is None:
+            rec['ema_fast'] = rec['ema_slow'] = close
+            rec['dea'] = 0.0
+        else:
+            rec['ema_fast'] += (close - rec['ema_fast']) * 2 / (MACD_FAST + 1)
+            rec['ema_slow'] += (close - rec['ema_slow']) * 2 / (MACD_SLOW + 1)
+            dif = rec['ema_fast'] - rec['ema_slow']
+            rec['dea'] += (dif - rec['dea']) * 2 / (MACD_SIGNAL + 1)
+        # KDJ(9, 3, 3)
+        n = len(self.bars)
+        window = [self.bars[i] for i in range(max(0, n - KDJ_PERIOD), n)]
+        hhv = max(b[2] for b in window)
+        llv = min(b[3] for b in window)
+        rsv = (close - llv) / (hhv - llv) * 100 if hhv > llv else 50.0
+        rec['k'] = rec['k'] * 2 / 3 + rsv / 3
+        rec['d'] = rec['d'] * 2 / 3 + rec['k'] / 3
+
+    def _undo_last(self):
+        self.bars.pop()
+        if self._evicted is not None:
+            self.bars.appendleft(self._evicted)
+        if self._rec_before_last is not None:
+            self.rec = self._rec_before_last
+        self._rec_before_last = None
+        self._evicted = None
+        self._resync()
+
+    def _resync(self):
+        closes = [b[4] for b in self.bars]
+        volumes = [b[5] for b in self.bars]
+        self.close_sums = {w: float(sum(closes[-w:])) for w in MA_WINDOWS}
+        self.vol_sums = {w: float(sum(volumes[-w:])) for w in VOL_WINDOWS}
+        diffs = [self._diff_at(i) for i in range(max(0, len(closes) - RSI_PERIOD), len(closes))]
+        self.gain_sum = sum(_up(d) for d in diffs)
+        self.loss_sum = sum(_down(d) for d in diffs)
+        self._since_resync = 0
+
+    # --- Readouts ---
+
+    def ma(self, window):
+        return self.close_sums[window] / window if len(self.bars) >= window else None
+
+    def avg_volume(self, window):
+        n = min(window, len(self.bars))
+        return self.vol_sums[window] / n if n else None
+
+    def rsi(self):
+        """RSI-14 on simple 14-day averages (the live _filter_technicals definition)."""
+        if len(self.bars) < RSI_PERIOD:
+            return None
+        if self.loss_sum <= 0:
+            return 100.0 if self.gain_sum > 0 else None
+        return 100 - 100 / (1 + self.gain_sum / self.loss_sum)
+
+    def rsi_wilder(self):
+        gain, loss = self.rec['wilder_gain'], self.rec['wilder_loss']
+        if gain is None:
+            return None
+        if loss <= 0:
+            return 100.0 if gain > 0 else None
+        return 100 - 100 / (1 + gain / loss)
+
+    def factors(self):
+        if not self.bars:
+            return {'Symbol': self.symbol}
+        last = self.bars[-1]
+        rec = self.rec
+        close_5d = self.bars[-6][4] if len(self.bars) > 5 else None
+        dif = rec['ema_fast'] - rec['ema_slow']
+        row = {
+            'Symbol': self.symbol,
+            'date': last[0],
+            'close': last[4],
+            'gain_5d': (last[4] - close_5d) / close_5d * 100 if close_5d else None,
+            'rsi14': self.rsi(),
+            'rsi14_wilder': self.rsi_wilder(),
+            'macd_dif': dif,
+            'macd_dea': rec['dea'],
+            'macd_hist': 2 * (dif - rec['dea']),
+            'kdj_k': rec['k'],
+            'kdj_d': rec['d'],
+            'kdj_j': 3 * rec['k'] - 2 * rec['d'],
+        }
+        for w in MA_WINDOWS:
+            row[f'ma{w}'] = self.ma(w)
+        for w in VOL_WINDOWS:
+            row[f'avg_vol{w}'] = self.avg_volume(w)
+        return row
+
+    def recent_bars(self, n):
+        """Last n kept bars as a DataFrame (for window factors such as antigravity)."""
+        return pd.DataFrame(list(self.bars)[-n:], columns=list(_BAR_FIELDS))
+
+
+def _hist_bars(hist):
+    df = hist[list(_BAR_FIELDS)]
+    return [(str(d), float(o), float(h), float(l), float(c), float(v))
+            for d, o, h, l, c, v in df.itertuples(index=False, name=None)]
+
+
+class FactorStateStore:
+    """All symbols' states in one pickle under data_cache/."""
+
+    def __init__(self, path=FACTOR_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.states = {}
+        self.stats = {'applied': 0, 'rebuilt': 0, 'unchanged': 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == STATE_VERSION:
+                self.states = data['states']
+        except Exception as e:
+            logger.warning(f"FactorState: unreadable {self.path}, starting fresh: {e}")
+
+    def save(self):
+        with self._lock:
+            payload = {'version': STATE_VERSION, 'states': dict(self.states)}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def get(self, symbol):
+        return self.states.get(str(symbol).zfill(6))
+
+    def sync(self, symbol, hist):
+        """Bring the symbol's state up to the end of `hist` (date/open/high/low/close/volume).
+
+        Only bars from the state's last date onwards are applied. If the bars the
+        state remembers no longer match `hist` (adjusted prices were rewritten),
+        the state is rebuilt from the full history instead.
+        """
+        symbol = str(symbol).zfill(6)
+        if hist is None or hist.empty:
+            return self.states.get(symbol)
+        bars = _hist_bars(hist)
+        with self._lock:
+            state = self.states.get(symbol)
+            start = self._resume_index(state, bars)
+            if start is None:
+                state = SymbolFactorState(symbol)
+                start = 0
+                self.stats['rebuilt'] += 1
+            applied = 0
+            for bar in bars[start:]:
+                if state.apply(bar):
+                    applied += 1
+            self.stats['applied'] += applied
+            if not applied:
+                self.stats['unchanged'] += 1
+            self.states[symbol] = state
+            return state
+
+    @staticmethod
+    def _resume_index(state, bars):
+        """Position in `bars` of the state's last bar, or None if the state must be rebuilt."""
+        if state is None or not state.bars:
+            return None
+        positions = {bar[0]: i for i, bar in enumerate(bars)}
+        last_date = state.last_date
+        if last_date not in positions:
+            # hist ends before the state (stale window) or doesn't reach back to it
+            return None if bars[-1][0] > last_date or bars[0][0] > last_date else len(bars)
+        # Every remembered bar except the (possibly provisional) last one must still match
+        for kept in list(state.bars)[:-1]:
+            i = positions.get(kept[0])
+            if i is not None and not _same_bar(kept, bars[i]):
+                return None
+        return positions[last_date]
+
+    def frame(self, symbols=None):
+        """Current factors for `symbols` (default: all) as one DataFrame."""
+        with self._lock:
+            states = list(self.states.values()) if symbols is None else \
+                [self.states[s] for s in (str(x).zfill(6) for x in symbols) if s in self.states]
+        return pd.DataFrame([s.factors() for s in states])
+
+    def technical_factors(self, symbols, last_dates, ma_period):
+        """The technical-gate inputs of batch_scorer.technical_factors read from the
+        state, plus 'current': True where the symbol's state ends on `last_dates[i]`.
+
+        Other rows are NaN for the caller to recompute. Running sums agree with the
+        rolling recomputation to float tolerance, not bit for bit. None when
+        ma_period is not one of MA_WINDOWS.
+        """
+        if ma_period not in MA_WINDOWS:
+            return None
+        names = ('price', 'gain_5d', 'rsi', 'ma', 'avg_volume_20')
+        out = {name: np.full(len(symbols), np.nan) for name in names}
+        current = np.zeros(len(symbols), dtype=bool)
+        with self._lock:
+            for i, (symbol, last_date) in enumerate(zip(symbols, last_dates)):
+                state = self.states.get(str(symbol).zfill(6))
+                if state is None or last_date is None or state.last_date != str(last_date):
+                    continue
+                row = state.factors()
+                for name, key in zip(names, ('close', 'gain_5d', 'rsi14', f'ma{ma_period}', 'avg_vol20')):
+                    if row[key] is not None:
+                        out[name][i] = row[key]
+                current[i] = True
+        out['current'] = current
+        return out
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_factor_store():
+    """Process-wide FactorStateStore instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FactorStateStore()
+        return _store
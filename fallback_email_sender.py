@@ -1,5 +1,6 @@
 print("DEBUG: Script started...")
 import requests_patch
+import run_metrics
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -8,12 +9,14 @@ from email.header import Header
 import pandas as pd
 import datetime
 import sqlite3
-import akshare as ak
 import time
 import os
 import random
 
 from index_service import get_benchmark_return, update_index_cache
+from trade_calendar import is_trading_day, prev_trading_day, trading_days_between
+from spot_cache import cached_price_map
+from industry_index import cached_industry
 
 # Import Enrichment
 if os.environ.get("SKIP_AI"):
@@ -78,6 +81,14 @@ class DirectSinaFetcher:
     def fetch_prices(self, codes: list):
         """Batch fetch prices from Sina Direct API"""
         if not codes: return
+        # v11.1: Reuse a fresh full-market snapshot (e.g. from the strategy run) first
+        snapshot = cached_price_map()
+        codes = [str(c).zfill(6) for c in codes]
+        for c in codes:
+            if c in snapshot:
+                self.price_map[c] = snapshot[c]
+        codes = [c for c in codes if c not in self.price_map]
+        if not codes: return
         print(f"🔄 Fetching Prices (Sina Direct) for {len(codes)} symbols...")
         
         # Split into chunks of 20 to be safe with URL length
@@ -135,6 +146,7 @@ logger = logging.getLogger("SiphonSystem")
 # --- v7.0 KlineCache + Shield (extracted modules) ---
 from kline_cache import KlineCache
 from shield_service import ShieldService
+from bar_store import get_bar_store
 
 # Global KlineCache instance
 kline_cache = KlineCache()
@@ -192,10 +204,10 @@ def fetch_enhanced_tracking_data(industry_map={}):
         # ... logic continues ...
         
         # v4.4 Fix: Exclude T+0 (Today's picks) from History Tracking
-        # v4.5 Req: History Review 15 trading days (~25 calendar days)
+        # v4.5 Req: History Review 15 trading days
         today = datetime.date.today()
         today_str = today.strftime('%Y-%m-%d')
-        cutoff_date = (today - datetime.timedelta(days=25)).strftime('%Y-%m-%d')
+        cutoff_date = prev_trading_day(today, 15).strftime('%Y-%m-%d')
         
         history_candidates = [
             item for item in sorted_codes 
@@ -235,7 +247,7 @@ def fetch_enhanced_tracking_data(industry_map={}):
             if not curr_price: 
                 curr_price = rec_price # Fallback
             
-            days = (datetime.date.today() - datetime.datetime.strptime(rec_date_str, '%Y-%m-%d').date()).days
+            days = trading_days_between(rec_date_str, today)
             
             # v6.0 FIX: Universal Price Correction for History
             # v11.0: Use KlineCache instead of direct API calls for price verification
@@ -250,17 +262,13 @@ def fetch_enhanced_tracking_data(industry_map={}):
                 if verified_price is None:
                     for _ in range(2):  # Reduced retries since cache handles most cases
                         try:
-                            prefix = "sz" if code.startswith("0") or code.startswith("3") else "sh"
-                            if code.startswith("4") or code.startswith("8"):
-                                prefix = "bj"
-                            long_code = prefix + code
                             rec_dt = datetime.datetime.strptime(rec_date_str, "%Y-%m-%d")
                             s_str = (rec_dt - datetime.timedelta(days=10)).strftime("%Y%m%d")
                             e_str = rec_dt.strftime("%Y%m%d")
 
-                            df_hist = ak.stock_zh_a_daily(symbol=long_code, start_date=s_str, end_date=e_str, adjust="qfq")
+                            df_hist = get_bar_store().get_bars(code, s_str, e_str, adjust="qfq")
 
-                            if not df_hist.empty:
+                            if df_hist is not None and not df_hist.empty:
                                 verified_price = float(df_hist.iloc[-1]['close'])
                                 break
                         except Exception:
@@ -299,13 +307,11 @@ def fetch_enhanced_tracking_data(industry_map={}):
                     if cached_max is not None:
                         max_high = float(cached_max)
                     else:
-                        # Fallback to API if cache miss
-                        prefix = "sz" if code.startswith("0") or code.startswith("3") else "sh"
-                        long_code = prefix + code
+                        # Fallback to the bar store if cache miss
                         today_str_clean = datetime.date.today().strftime("%Y%m%d")
                         rec_dt_str_clean = rec_date_str.replace("-", "")
-                        df_max = ak.stock_zh_a_daily(symbol=long_code, start_date=rec_dt_str_clean, end_date=today_str_clean, adjust="qfq")
-                        max_high = float(df_max['high'].max()) if not df_max.empty else curr_price
+                        df_max = get_bar_store().get_bars(code, rec_dt_str_clean, today_str_clean, adjust="qfq")
+                        max_high = float(df_max['high'].max()) if df_max is not None and not df_max.empty else curr_price
                     # Ensure Current Price is considered (for T+0 or intraday breakout)
                     if curr_price > max_high:
                         max_high = curr_price
@@ -343,15 +349,9 @@ def fetch_enhanced_tracking_data(industry_map={}):
 
 def generate_report():
     # v10.2: Early exit if market is closed
-    try:
-        df_dates = ak.tool_trade_date_hist_sina()
-        if not df_dates.empty:
-            today = datetime.date.today()
-            if today not in df_dates['trade_date'].values:
-                print("⏸️ Market is CLOSED today. Skipping email report.")
-                return
-    except Exception as e:
-        print(f"⚠️ Holiday check error (Email Sender): {e}")
+    if not is_trading_day():
+        print("⏸️ Market is CLOSED today. Skipping email report.")
+        return
 
     if not os.path.exists(CSV_PATH): return
 
@@ -549,6 +549,9 @@ def generate_report():
         score_bar = f'<div style="width:40px; height:3px; background:#e2e8f0; border-radius:2px; margin-top:3px;"><div style="width:{bar_w}%; height:100%; background:linear-gradient(90deg, #f59e0b, #d97706); border-radius:2px;"></div></div>'
         
         ind = row.get("Industry","-")
+        if not ind or ind == "Unknown" or ind == "-":
+             # v11.1: Local board/industry index first (no network)
+             ind = cached_industry(symbol) or ind
         if not ind or ind == "Unknown" or ind == "-":
              try:
                  import akshare as aks
@@ -778,6 +781,9 @@ def generate_report():
             row_dict = dict(row)
             symbol = str(row_dict.get("Symbol", "")).zfill(6)
             ind = row_dict.get("Industry", "-")
+            if not ind or ind == "Unknown" or ind == "-":
+                # v11.1: Local board/industry index first (no network)
+                ind = cached_industry(symbol) or ind
             if not ind or ind == "Unknown" or ind == "-":
                 try:
                     import akshare as aks
@@ -823,6 +829,11 @@ def generate_report():
         attachment = MIMEApplication(extra_html.encode('utf-8'))
         attachment.add_header('Content-Disposition', 'attachment', filename=f'extra_stocks_{today_date.replace("/","-")}.html')
         msg.attach(attachment)
+
+    # v11.1: How much duplicate bar fetching the single-flight layer absorbed
+    fl = get_bar_store().flight.stats
+    logger.info(f"🧵 Bar fetches: {fl['calls']} upstream, {fl['coalesced']} coalesced, {fl['hits']} repeat hits")
+
     # v7.0.1: Add retry logic for SSL errors
     for attempt in range(3):
         try:
@@ -901,4 +912,5 @@ def generate_report():
                 time.sleep(2)  # Wait before retry
 
 if __name__ == "__main__":
+    run_metrics.write_summary_at_exit()
     generate_report()
@@ -0,0 +1,45 @@
+"""
+FetchPool — Bounded, rate-limited concurrent fetch stage.
+Streams results back as they complete so downstream scoring overlaps network time.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import run_metrics
+from rate_limiter import get_limiter
+
+
+def fetch_concurrently(items, fetch_fn, source='sina', max_workers=8, limiter=None):
+    """Run fetch_fn(item) for every item on a worker pool, throttled per source.
+
+    Yields (item, result, error) in completion order. Closing the generator early
+    (e.g. `break` once enough rows are collected) cancels all pending fetches.
+    Pass source=None when fetch_fn already throttles its own network calls.
+    """
+    items = list(items)
+    if not items:
+        return
+    if limiter is None and source is not None:
+        limiter = get_limiter(source)
+
+    def _task(item):
+        if limiter is not None:
+            t0 = time.perf_counter()
+            limiter.acquire()
+            run_metrics.get_metrics().record_wait('source', source or 'custom', time.perf_counter() - t0)
+        return fetch_fn(item)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    futures = {executor.submit(_task, item): item for item in items}
+    try:
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,51 @@
+"""
+FilterStats — Per-stage candidate counts and timings for the filter pipeline.
+Each stage records how many symbols it saw, how many it rejected and how long
+it took, so a run report shows where candidates drop out and where time goes.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger("SiphonSystem")
+
+
+class FilterStats:
+    """Stage name -> seen / rejected / seconds, in first-recorded order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, seen=1, rejected=0, seconds=0.0):
+        with self._lock:
+            s = self.stages.setdefault(stage, {'seen': 0, 'rejected': 0, 'seconds': 0.0})
+            s['seen'] += int(seen)
+            s['rejected'] += int(rejected)
+            s['seconds'] += seconds
+
+    def check(self, stage, failed, started):
+        """Record one symbol's outcome for `stage` timed from `started` (perf_counter); returns `failed`."""
+        self.record(stage, 1, bool(failed), time.perf_counter() - started)
+        return failed
+
+    def mask(self, stage, alive, failed, started=None):
+        """Vectorized stage: reject `failed` among `alive` (bool arrays). Returns the new alive mask."""
+        rejected = alive & failed
+        self.record(stage, alive.sum(), rejected.sum(),
+                    time.perf_counter() - started if started is not None else 0.0)
+        return alive & ~failed
+
+    def summary(self):
+        with self._lock:
+            return {k: dict(v) for k, v in self.stages.items()}
+
+    def report(self, title="Filter pipeline"):
+        stages = self.summary()
+        if not stages:
+            return
+        print(f"🧪 {title}:")
+        for name, s in stages.items():
+            print(f"   {name:18s} seen {s['seen']:5d}  rejected {s['rejected']:5d}  {s['seconds'] * 1000:8.1f} ms")
+        logger.info(f"FilterStats {title}: {stages}")
@@ -0,0 +1,303 @@
+"""
+IndustryIndex — SQLite symbol -> industry store for the per-stock fallback.
+Each symbol carries its own fetched_at: stale entries are served immediately and
+refreshed in the background, and only never-seen symbols are fetched up front.
+BoardIndex — Industry board -> constituents in the same database, refreshed
+at most once a day per board.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import akshare as ak
+import pandas as pd
+
+from fetch_pool import fetch_concurrently
+
+logger = logging.getLogger("SiphonSystem")
+
+INDUSTRY_DB_PATH = os.path.join("data_cache", "industry_index.db")
+# Pre-v11.1 whole-file pickle cache, imported once on first use
+LEGACY_PICKLE_PATH = os.path.join("data_cache", "industry_map_cache.pkl")
+# Industry membership rarely changes; refresh an entry after this many days
+INDUSTRY_TTL_DAYS = 30
+UNKNOWN = 'Unknown'
+
+
+@contextmanager
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _fetch_industry_em(code):
+    info = ak.stock_individual_info_em(symbol=code)
+    row = dict(zip(info['item'], info['value']))
+    return row.get('行业') or UNKNOWN
+
+
+class IndustryIndex:
+    """Per-symbol industry lookups backed by a small SQLite table."""
+
+    def __init__(self, path=INDUSTRY_DB_PATH, fetcher=None, ttl_days=INDUSTRY_TTL_DAYS, max_workers=8):
+        self.path = path
+        self.fetcher = fetcher or _fetch_industry_em
+        self.ttl = ttl_days * 86400
+        self.max_workers = max_workers
+        self._write_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_thread = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS industry (
+                    symbol TEXT PRIMARY KEY,
+                    industry TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+        self._migrate_legacy()
+
+    def _connect(self):
+        return _connect(self.path)
+
+    def _migrate_legacy(self, legacy_path=LEGACY_PICKLE_PATH):
+        if not os.path.exists(legacy_path):
+            return
+        with self._connect() as conn:
+            if conn.execute("SELECT COUNT(*) FROM industry").fetchone()[0]:
+                return
+        try:
+            legacy = pd.read_pickle(legacy_path)
+            fetched_at = os.path.getmtime(legacy_path)
+            rows = [(str(code).zfill(6), ind, fetched_at) for code, ind in legacy.items()
+                    if ind and ind != UNKNOWN]
+            self._store(rows)
+            print(f"   💾 Imported {len(rows)} industries from legacy cache")
+        except Exception as e:
+            logger.warning(f"IndustryIndex: legacy cache import failed: {e}")
+
+    def _store(self, rows):
+        if not rows:
+            return
+        with self._write_lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO industry (symbol, industry, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def _read(self, symbols):
+        found = {}
+        symbols = list(symbols)
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for symbol, industry, fetched_at in conn.execute(
+                        f"SELECT symbol, industry, fetched_at FROM industry WHERE symbol IN ({marks})", chunk):
+                    found[symbol] = (industry, fetched_at)
+        return found
+
+    def _fetch_many(self, symbols, label):
+        """Fetch on the worker pool; successful lookups are persisted, failures are not."""
+        result = {}
+        pending = []
+        done = 0
+        for code, industry, error in fetch_concurrently(symbols, self.fetcher, source='eastmoney',
+                                                        max_workers=self.max_workers):
+            if error is not None:
+                result[code] = UNKNOWN
+                continue
+            result[code] = industry
+            pending.append((code, industry, time.time()))
+            done += 1
+            if done % 50 == 0:
+                print(f"   ... {label} {done}/{len(symbols)}")
+                self._store(pending)
+                pending = []
+        self._store(pending)
+        return result
+
+    def _refresh_in_background(self, symbols):
+        with self._refresh_lock:
+            todo = [s for s in symbols if s not in self._refreshing]
+            self._refreshing.update(todo)
+        if not todo:
+            return
+
+        def _run():
+            try:
+                self._fetch_many(todo, "refreshed")
+            except Exception as e:
+                logger.warning(f"IndustryIndex: background refresh failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.difference_update(todo)
+
+        self._refresh_thread = threading.Thread(target=_run, name="industry-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def lookup(self, symbols):
+        """Return {code: industry} for every symbol.
+
+        Misses are fetched concurrently before returning; entries older than the
+        TTL are returned as-is and re-fetched in a background thread.
+        """
+        symbols = [str(s).zfill(6) for s in symbols]
+        found = self._read(symbols)
+        now = time.time()
+        result = {code: industry for code, (industry, _) in found.items()}
+        missing = [s for s in symbols if s not in found]
+        stale = [s for s, (_, fetched_at) in found.items() if now - fetched_at > self.ttl]
+
+        if stale:
+            print(f"   🔄 Refreshing {len(stale)} stale industry entries in background...")
+            self._refresh_in_background(stale)
+        if missing:
+            print(f"   📋 Fetching industry for {len(missing)} new stocks (concurrent)...")
+            result.update(self._fetch_many(missing, "fetched"))
+        return result
+
+
+def _fetch_board_em(board):
+    df = ak.stock_board_industry_cons_em(symbol=board)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['Symbol', 'Name'])
+    df = df[['代码', '名称']].copy()
+    df.columns = ['Symbol', 'Name']
+    df['Symbol'] = df['Symbol'].astype(str).str.zfill(6)
+    return df
+
+
+class BoardIndex:
+    """Board constituents cached per board for the trading day, plus the reverse
+    symbol -> board map for callers that must not hit the network."""
+
+    def __init__(self, path=INDUSTRY_DB_PATH, fetcher=None, max_workers=4):
+        self.path = path
+        self.fetcher = fetcher or _fetch_board_em
+        self.max_workers = max_workers
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _connect(path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS board_members (
+                    board TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    name TEXT,
+                    fetched_on TEXT NOT NULL,
+                    PRIMARY KEY (board, symbol)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_board_members_symbol ON board_members (symbol)")
+
+    def _cached(self, boards):
+        cached = {}
+        with _connect(self.path) as conn:
+            for board in boards:
+                rows = conn.execute("SELECT symbol, name, fetched_on FROM board_members WHERE board = ?",
+                                    (board,)).fetchall()
+                if rows:
+                    df = pd.DataFrame([r[:2] for r in rows], columns=['Symbol', 'Name'])
+                    cached[board] = (df, rows[0][2])
+        return cached
+
+    def _store(self, board, df, fetched_on):
+        rows = [(board, sym, name, fetched_on) for sym, name in zip(df['Symbol'], df['Name'])]
+        with self._write_lock, _connect(self.path) as conn:
+            conn.execute("DELETE FROM board_members WHERE board = ?", (board,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO board_members (board, symbol, name, fetched_on) VALUES (?, ?, ?, ?)", rows)
+
+    def members(self, boards):
+        """Return {board: DataFrame[Symbol, Name]}.
+
+        Boards not yet fetched today are downloaded concurrently under the
+        EastMoney limiter; if a download fails, yesterday's list is used.
+        Boards with no data at all are left out.
+        """
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        cached = self._cached(boards)
+        result = {b: df for b, (df, fetched_on) in cached.items() if fetched_on == today}
+        stale = [b for b in boards if b not in result]
+
+        for board, df, error in fetch_concurrently(stale, self.fetcher, source='eastmoney',
+                                                   max_workers=self.max_workers):
+            if error is None and df is not None and not df.empty:
+                self._store(board, df, today)
+                result[board] = df
+                continue
+            if board in cached:
+                print(f"   ⚠️ {board}: refresh failed ({error or 'empty'}), using list from {cached[board][1]}")
+                result[board] = cached[board][0]
+            elif error is not None:
+                print(f"   ❌ Error fetching {board}: {error}")
+        return result
+
+    def board_map(self):
+        """{symbol: board} from whatever is cached (no network). The most
+        recently fetched board wins for symbols listed under several."""
+        with _connect(self.path) as conn:
+            rows = conn.execute("SELECT symbol, board FROM board_members ORDER BY fetched_on").fetchall()
+        return {symbol: board for symbol, board in rows}
+
+
+def cached_industry(symbol, path=None):
+    """Industry for one symbol from the local board / industry tables, or None. Never downloads.
+    Each table is queried on its own, so a database without one of them still answers."""
+    path = path or INDUSTRY_DB_PATH
+    if not os.path.exists(path):
+        return None
+    symbol = str(symbol).zfill(6)
+    queries = (
+        ("SELECT board FROM board_members WHERE symbol = ? ORDER BY fetched_on DESC LIMIT 1", (symbol,)),
+        ("SELECT industry FROM industry WHERE symbol = ? AND industry != ?", (symbol, UNKNOWN)),
+    )
+    try:
+        with _connect(path) as conn:
+            for sql, params in queries:
+                try:
+                    row = conn.execute(sql, params).fetchone()
+                except sqlite3.Error as e:
+                    logger.debug(f"cached_industry: {e}")
+                    continue
+                if row is not None:
+                    return row[0]
+    except sqlite3.Error:
+        return None
+    return None
+
+
+_index = None
+_board_index = None
+_index_lock = threading.Lock()
+
+
+def get_industry_index():
+    """Process-wide IndustryIndex instance."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IndustryIndex()
+        return _index
+
+
+def get_board_index():
+    """Process-wide BoardIndex instance."""
+    global _board_index
+    with _index_lock:
+        if _board_index is None:
+            _board_index = BoardIndex()
+        return _board_index
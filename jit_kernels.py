@@ -0,0 +1,233 @@
+"""
+JitKernels — Optional Numba-compiled kernels for the path-dependent scoring loops.
+Resilience streaks (antigravity), limit-up gene premium, VCP contraction/expansion
+and the backtest's intraday TP/SL walk, over (symbols x days) panels.
+Each kernel has a plain-loop body (compiled with numba.njit when available) and
+a pure-NumPy fallback with the same results.
+
+Switch: SIPHON_NUMBA=0 forces the NumPy path; without numba installed it is used anyway.
+"""
+
+import logging
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger("SiphonSystem")
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+USE_NUMBA = NUMBA_AVAILABLE and os.environ.get("SIPHON_NUMBA", "1") != "0"
+
+TPSL_NONE, TPSL_STOP_LOSS, TPSL_TAKE_PROFIT = 0, 1, 2
+
+
+def _jit(fn):
+    return numba.njit(cache=True)(fn) if USE_NUMBA else fn
+
+
+def _as_panel(values, dtype=float):
+    """2-D view of a series or panel (rows = symbols)."""
+    arr = np.asarray(values, dtype=dtype)
+    return arr.reshape(1, -1) if arr.ndim == 1 else arr
+
+
+def _same_shape(out, like):
+    return out.reshape(-1) if np.ndim(like) == 1 else out
+
+
+# ─── Resilience streak (antigravity) ───
+
+def _streak_loop(held, failed, lookback):
+    rows, days = held.shape
+    out = np.zeros((rows, days), dtype=np.int64)
+    for r in range(rows):
+        cum = np.zeros(days + 1, dtype=np.int64)
+        last_fail = -1
+        for t in range(days):
+            cum[t + 1] = cum[t] + (1 if held[r, t] else 0)
+            if failed[r, t]:
+                last_fail = t
+            start = max(last_fail + 1, t - lookback + 1, 0)
+            out[r, t] = cum[t + 1] - cum[start]
+    return out
+
+
+def _streak_numpy(held, failed, lookback):
+    rows, days = held.shape
+    day = np.arange(days)
+    cum = np.concatenate((np.zeros((rows, 1), dtype=np.int64), np.cumsum(held, axis=1)), axis=1)
+    last_fail = np.maximum.accumulate(np.where(failed, day, -1), axis=1)
+    start = np.maximum(np.maximum(last_fail + 1, day - lookback + 1), 0)
+    return np.take_along_axis(cum, day[None, :] + 1, axis=1) - np.take_along_axis(cum, start, axis=1)
+
+
+_streak_kernel = _jit(_streak_loop)
+
+
+def resilience_streak(held, failed, lookback=10):
+    """Per day: resilient ("held") down days since the last failed one inside the
+    `lookback`-day window ending there — the antigravity consecutive counter."""
+    held_p = _as_panel(held, dtype=bool)
+    failed_p = _as_panel(failed, dtype=bool)
+    fn = _streak_kernel if USE_NUMBA else _streak_numpy
+    return _same_shape(fn(held_p, failed_p, lookback), held)
+
+
+# ─── Limit-up gene ───
+
+def _limit_up_loop(change_pct, close, high, lookback):
+    rows, days = change_pct.shape
+    out = np.zeros((rows, days))
+    for r in range(rows):
+        last = -1
+        for t in range(days):
+            if change_pct[r, t] >= 9.5:
+                last = t
+            if last < 0 or last <= t - lookback:
+                continue
+            score = 5.0
+            if close[r, last] >= high[r, last] * 0.999:
+                score += 3.0
+            if last < t:
+                premium = change_pct[r, last + 1]
+                if premium > 3.0:
+                    score += 7.0
+                elif premium > 0:
+                    score += 4.0
+            out[r, t] = min(score, 15.0)
+    return out
+
+
+def _limit_up_numpy(change_pct, close, high, lookback):
+    rows, days = change_pct.shape
+    day = np.arange(days)
+    with np.errstate(invalid='ignore'):
+        is_lu = change_pct >= 9.5
+        last = np.maximum.accumulate(np.where(is_lu, day, -1), axis=1)
+        had = (last >= 0) & (last > day - lookback)
+        at = np.maximum(last, 0)
+        sealed = np.take_along_axis(close, at, axis=1) >= np.take_along_axis(high, at, axis=1) * 0.999
+        premium = np.take_along_axis(change_pct, np.minimum(at + 1, days - 1), axis=1)
+        has_next = last < day
+        score = 5.0 + np.where(sealed, 3.0, 0.0) + np.where(
+            has_next & (premium > 3.0), 7.0, np.where(has_next & (premium > 0), 4.0, 0.0))
+    return np.where(had, np.minimum(score, 15.0), 0.0)
+
+
+_limit_up_kernel = _jit(_limit_up_loop)
+
+
+def limit_up_gene(change_pct, close, high, lookback=20):
+    """Per day: calc_limit_up_gene's score for the `lookback` bars ending there
+    (the minimum-history check is left to the caller)."""
+    args = [_as_panel(a) for a in (change_pct, close, high)]
+    fn = _limit_up_kernel if USE_NUMBA else _limit_up_numpy
+    return _same_shape(fn(*args, lookback), change_pct)
+
+
+# ─── VCP contraction / expansion ───
+
+def _vcp_loop(volume, change_pct):
+    rows, days = volume.shape
+    score = np.zeros((rows, days))
+    for r in range(rows):
+        for t in range(2, days):
+            total = 0.0
+            count = 0
+            for k in range(max(t - 6, 0), t - 1):
+                v = volume[r, k]
+                if not np.isnan(v):
+                    total += v
+                    count += 1
+            if count == 0:
+                continue
+            yesterday, today = volume[r, t - 1], volume[r, t]
+            if yesterday < total / count * 0.6:
+                if today > yesterday * 2.0 and change_pct[r, t] > 2.0:
+                    score[r, t] = 15.0
+                elif today > yesterday * 1.5 and change_pct[r, t] > 0:
+                    score[r, t] = 8.0
+    return score
+
+
+def _vcp_numpy(volume, change_pct):
+    rows, days = volume.shape
+    # 5 bars before yesterday: volume[t-6 : t-1], shorter at the start
+    padded = np.concatenate((np.full((rows, 4), np.nan), volume), axis=1)
+    windows = sliding_window_view(padded, 5, axis=1)[:, :days]      # windows[:, j] = volume[j-4 : j+1]
+    valid = ~np.isnan(windows)
+    total = np.where(valid, windows, 0.0).sum(axis=2)
+    count = valid.sum(axis=2)
+    ma5_prev = np.full((rows, days), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ma5_prev[:, 2:] = (total / count)[:, :days - 2]
+        yesterday = np.concatenate((np.full((rows, 1), np.nan), volume[:, :-1]), axis=1)
+        contracted = yesterday < ma5_prev * 0.6
+        slingshot = contracted & (volume > yesterday * 2.0) & (change_pct > 2.0)
+        partial = contracted & ~slingshot & (volume > yesterday * 1.5) & (change_pct > 0)
+    return np.where(slingshot, 15.0, np.where(partial, 8.0, 0.0))
+
+
+_vcp_kernel = _jit(_vcp_loop)
+
+
+def vcp_breakout(volume, change_pct):
+    """Per day: calc_vcp_breakout's score (15 slingshot, 8 partial) for the history
+    ending there; is_vcp is score == 15 (the minimum-history check is left to the caller)."""
+    volume_p, change_p = _as_panel(volume), _as_panel(change_pct)
+    fn = _vcp_kernel if USE_NUMBA else _vcp_numpy
+    return _same_shape(fn(volume_p, change_p), volume)
+
+
+# ─── Intraday TP/SL walk (backtest exits) ───
+
+def _tpsl_loop(open_, high, low, entry_price, tp_pct, sl_pct):
+    sl_price = entry_price * (1 - sl_pct / 100)
+    tp_price = entry_price * (1 + tp_pct / 100)
+    for i in range(len(high)):
+        # Stop loss is checked first on each bar (more urgent)
+        if sl_pct > 0 and low[i] <= sl_price:
+            return i, min(sl_price, open_[i]), TPSL_STOP_LOSS
+        if tp_pct > 0 and high[i] >= tp_price:
+            return i, max(tp_price, open_[i]), TPSL_TAKE_PROFIT
+    return -1, np.nan, TPSL_NONE
+
+
+def _tpsl_numpy(open_, high, low, entry_price, tp_pct, sl_pct):
+    sl_price = entry_price * (1 - sl_pct / 100)
+    tp_price = entry_price * (1 + tp_pct / 100)
+    hit_sl = (low <= sl_price) if sl_pct > 0 else np.zeros(len(low), dtype=bool)
+    hit_tp = (high >= tp_price) if tp_pct > 0 else np.zeros(len(high), dtype=bool)
+    hit = hit_sl | hit_tp
+    if not hit.any():
+        return -1, np.nan, TPSL_NONE
+    i = int(np.argmax(hit))
+    if hit_sl[i]:
+        return i, min(sl_price, open_[i]), TPSL_STOP_LOSS
+    return i, max(tp_price, open_[i]), TPSL_TAKE_PROFIT
+
+
+_tpsl_kernel = _jit(_tpsl_loop)
+
+
+def tpsl_walk(open_, high, low, entry_price, tp_pct=0.0, sl_pct=0.0):
+    """First intraday bar that triggers stop loss or take profit.
+
+    Returns: (bar_index, sell_price, reason) with reason TPSL_STOP_LOSS /
+    TPSL_TAKE_PROFIT, or (-1, nan, TPSL_NONE) if nothing triggers.
+    """
+    arrays = [np.ascontiguousarray(a, dtype=float) for a in (open_, high, low)]
+    fn = _tpsl_kernel if USE_NUMBA else _tpsl_numpy
+    i, price, reason = fn(*arrays, float(entry_price), float(tp_pct), float(sl_pct))
+    return int(i), float(price), int(reason)
+
+
+def backend():
+    return "numba" if USE_NUMBA else "numpy"
@@ -4,9 +4,9 @@ Extracted from fallback_email_sender.py for modularity.
 """
 
 import datetime
-import time
 import logging
-import akshare as ak
+
+from bar_store import get_bar_store
 
 logger = logging.getLogger("SiphonSystem")
 
@@ -29,9 +29,8 @@ class KlineCache:
             if symbol in self.cache:
                 continue
             try:
-                prefix = "sz" if symbol.startswith("0") or symbol.startswith("3") else "sh"
-                df = ak.stock_zh_a_daily(symbol=prefix+symbol, start_date=self.start, end_date=self.today, adjust="qfq")
-                if not df.empty and len(df) >= 30:
+                df = get_bar_store().get_bars(symbol, self.start, self.today, adjust="qfq")
+                if df is not None and len(df) >= 30:
                     # Pre-calculate indicators if ShieldService available
                     if shield_service:
                         shield_service.calc_macd(df)
@@ -41,7 +40,10 @@ class KlineCache:
                     success_count += 1
             except Exception as e:
                 logger.warning(f"KlineCache: Failed {symbol}: {e}")
-            time.sleep(0.1)  # Rate limiting
+        try:
+            get_bar_store().flush()
+        except Exception as e:
+            logger.warning(f"KlineCache: BarStore manifest flush failed: {e}")
         logger.info(f"✅ Pre-fetched {success_count}/{len(symbols)} stocks successfully.")
     
     def get(self, symbol):
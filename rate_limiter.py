@@ -0,0 +1,82 @@
+"""
+RateLimiter — Token-bucket throttling for market-data sources.
+Replaces the fixed time.sleep() pacing between per-symbol API calls.
+"""
+
+import os
+import threading
+import time
+
+# Default (rate per second, burst) for each upstream source.
+# Override at runtime with env SIPHON_RATE_<SOURCE>, e.g. SIPHON_RATE_SINA=5
+SOURCE_RATE_LIMITS = {
+    'sina': (3.0, 3),
+    'eastmoney': (2.0, 2),
+    'tencent': (5.0, 5),
+}
+DEFAULT_RATE_LIMIT = (2.0, 2)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens/s up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate):
+        """Change the refill rate (tokens already in the bucket are kept)."""
+        with self._lock:
+            self._refill()
+            self.rate = max(float(rate), 1e-6)
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are available. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(source):
+    """Return the shared TokenBucket for a data source (created on first use)."""
+    source = (source or 'default').lower()
+    with _limiters_lock:
+        limiter = _limiters.get(source)
+        if limiter is None:
+            rate, burst = SOURCE_RATE_LIMITS.get(source, DEFAULT_RATE_LIMIT)
+            if os.environ.get("SIPHON_CASSETTE", "").lower() == "replay":
+                # Cassette replay never touches the network: don't throttle
+                rate, burst = 1e9, 1e9
+            env_rate = os.environ.get(f"SIPHON_RATE_{source.upper()}")
+            if env_rate and rate < 1e9:
+                try:
+                    rate = float(env_rate)
+                    burst = max(1, int(rate))
+                except ValueError:
+                    pass
+            limiter = TokenBucket(rate, burst)
+            _limiters[source] = limiter
+        return limiter
@@ -1,10 +1,174 @@
 import requests
+from requests.adapters import HTTPAdapter
 from requests.sessions import Session
+import threading
+import time
 import warnings
+from urllib.parse import urlsplit
+
+import cassette
+import run_metrics
+from rate_limiter import TokenBucket
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
+# --- v11.1: Per-host adaptive throttling + circuit breaker ---
+HOST_BASE_RATE = 8.0        # requests/s per host when healthy
+HOST_MIN_RATE = 0.5         # floor after repeated back-offs
+BREAKER_THRESHOLD = 5       # consecutive failures before the breaker opens
+BREAKER_COOLDOWN = 30.0     # seconds the breaker stays open (doubles on failed probe)
+BREAKER_MAX_COOLDOWN = 300.0
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's breaker is open."""
+
+
+class HostGuard:
+    """Token bucket that halves its rate on 429/5xx/timeouts and recovers on success,
+    plus a circuit breaker that fails fast once a host keeps failing."""
+
+    def __init__(self, host, rate=HOST_BASE_RATE):
+        self.host = host
+        self.base_rate = rate
+        self.bucket = TokenBucket(rate, max(1, int(rate)))
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = BREAKER_COOLDOWN
+        self.half_open = False
+        self.probing = False  # half-open: the single probe request is in flight
+        self.stats = {'requests': 0, 'ok': 0, 'failures': 0, 'throttled': 0, 'server_errors': 0,
+                      'timeouts': 0, 'errors': 0, 'fast_fails': 0, 'breaker_opens': 0}
+
+    @property
+    def state(self):
+        if self.open_until > time.monotonic():
+            return 'open'
+        return 'half-open' if self.half_open else 'closed'
+
+    def before_request(self):
+        """Admit one request or raise CircuitOpenError. Returns True when the caller
+        is the half-open probe; pass it back to after_request(probe=...)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.open_until > now:
+                self.stats['fast_fails'] += 1
+                raise CircuitOpenError(f"Circuit open for {self.host} ({self.open_until - now:.0f}s left)")
+            if self.open_until:
+                # Cooldown elapsed: half-open
+                self.open_until = 0.0
+                self.half_open = True
+            probe = False
+            if self.half_open:
+                if self.probing:
+                    self.stats['fast_fails'] += 1
+                    raise CircuitOpenError(f"Circuit half-open for {self.host} (probe in flight)")
+                # Only this caller goes through until the probe has a verdict
+                self.probing = probe = True
+            self.stats['requests'] += 1
+        self.bucket.acquire()
+        return probe
+
+    def after_request(self, status=None, error=None, probe=False):
+        with self._lock:
+            if probe:
+                self.probing = False
+            if error is not None:
+                failed = isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+                if isinstance(error, requests.exceptions.Timeout):
+                    self.stats['timeouts'] += 1
+                if not failed:
+                    # Not a host failure, but no response either: no verdict (the next caller probes)
+                    self.stats['errors'] += 1
+                    return
+            else:
+                failed = status == 429 or (status is not None and status >= 500)
+                if status == 429:
+                    self.stats['throttled'] += 1
+                elif failed:
+                    self.stats['server_errors'] += 1
+
+            if not failed:
+                self.stats['ok'] += 1
+                self.consecutive_failures = 0
+                self.half_open = False
+                self.cooldown = BREAKER_COOLDOWN
+                if self.bucket.rate < self.base_rate:
+                    self.bucket.set_rate(min(self.base_rate, self.bucket.rate + self.base_rate * 0.1))
+                return
+
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            self.bucket.set_rate(max(HOST_MIN_RATE, self.bucket.rate / 2))
+            if self.half_open or self.consecutive_failures >= BREAKER_THRESHOLD:
+                if self.half_open:
+                    self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self.half_open = False
+                self.open_until = time.monotonic() + self.cooldown
+                self.stats['breaker_opens'] += 1
+                print(f"⛔ Circuit OPEN for {self.host} after {self.consecutive_failures} failures "
+                      f"(cooldown {self.cooldown:.0f}s)")
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, host=self.host, state=self.state,
+                        rate=round(self.bucket.rate, 2),
+                        consecutive_failures=self.consecutive_failures)
+
+
+_host_guards = {}
+_host_guards_lock = threading.Lock()
+
+
+def get_host_guard(url):
+    host = urlsplit(url).hostname or 'unknown'
+    with _host_guards_lock:
+        guard = _host_guards.get(host)
+        if guard is None:
+            guard = _host_guards[host] = HostGuard(host)
+        return guard
+
+
+def get_host_stats():
+    """Live per-host rate / error / breaker stats, keyed by hostname."""
+    with _host_guards_lock:
+        guards = list(_host_guards.values())
+    return {g.host: g.snapshot() for g in guards}
+
+
+def print_host_stats():
+    stats = get_host_stats()
+    if not stats:
+        return
+    print("🌐 Data source health:")
+    for host, st in sorted(stats.items(), key=lambda kv: -kv[1]['requests']):
+        print(f"   {host}: {st['requests']} req, {st['failures']} fail "
+              f"(429={st['throttled']} 5xx={st['server_errors']} timeout={st['timeouts']}), "
+              f"fast-fail={st['fast_fails']}, rate={st['rate']}/s, breaker={st['state']}")
+    conns = get_connection_stats()
+    if conns:
+        total_req = sum(c['requests'] for c in conns.values())
+        total_conn = sum(c['connections'] for c in conns.values())
+        print(f"🔌 Keep-alive: {total_req} requests over {total_conn} connections "
+              f"({total_req - total_conn} handshakes saved)")
+
+
+def _response_bytes(response, stream):
+    # Streamed bodies are left unread; trust Content-Length for those
+    if stream:
+        try:
+            return int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            return 0
+    return len(response.content or b"")
+
+
+def _metrics_extra():
+    return {'host_guard': get_host_stats(), 'keep_alive': get_connection_stats()}
+
+
 # --- Global Header Spoofing for Akshare (Anti-Bot Bypass) ---
 # We patch Session.request because most libraries (including akshare) 
 # eventually use a Session or the functional API which uses a default session.
@@ -34,7 +198,86 @@ def spoofed_session_request(self, method, url, *args, **kwargs):
         kwargs['timeout'] = 30
     
     kwargs['headers'] = headers
-    return original_session_request(self, method, url, *args, **kwargs)
+
+    if cassette.is_replay():
+        return cassette.http_replay(method, url, kwargs)
+
+    guard = get_host_guard(url)
+    metrics = run_metrics.get_metrics()
+    t0 = time.perf_counter()
+    try:
+        probe = guard.before_request()
+    except CircuitOpenError:
+        metrics.record_call('host', guard.host, 0.0, failed=True)
+        raise
+    t1 = time.perf_counter()
+    metrics.record_wait('host', guard.host, t1 - t0)
+    try:
+        response = original_session_request(self, method, url, *args, **kwargs)
+    except Exception as e:
+        guard.after_request(error=e, probe=probe)
+        metrics.record_call('host', guard.host, time.perf_counter() - t1, failed=True)
+        raise
+    guard.after_request(status=response.status_code, probe=probe)
+    nbytes = _response_bytes(response, kwargs.get('stream'))
+    metrics.record_call('host', guard.host, time.perf_counter() - t1, nbytes,
+                        failed=response.status_code == 429 or response.status_code >= 500)
+    run_metrics.add_akshare_bytes(nbytes)
+    if cassette.is_recording():
+        cassette.http_record(method, url, kwargs, response)
+    return response
+
+# --- v11.1: Shared keep-alive session for the functional API ---
+# requests.get()/post() build and tear down a Session per call, so every call pays
+# a fresh TCP + TLS handshake. Route them through one pooled Session instead.
+POOL_CONNECTIONS = 32       # distinct hosts kept in the pool manager
+POOL_MAXSIZE = 16           # idle keep-alive sockets kept per host (>= fetch workers)
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Process-wide pooled Session. trust_env stays on, so http(s)_proxy / no_proxy
+    are still read from the environment on every request (as requests.get did)."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _shared_session = session
+        return _shared_session
+
+
+def _iter_pools(adapter):
+    managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+    for manager in managers:
+        if manager is None:
+            continue
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is not None:
+                yield pool
+
+
+def get_connection_stats():
+    """Requests vs. sockets opened per host on the shared session.
+    'reused' is the number of TCP/TLS handshakes saved by keep-alive."""
+    if _shared_session is None:
+        return {}
+    stats = {}
+    adapters = {id(a): a for a in _shared_session.adapters.values()}
+    for adapter in adapters.values():
+        for pool in _iter_pools(adapter):
+            st = stats.setdefault(pool.host, {'requests': 0, 'connections': 0})
+            st['requests'] += pool.num_requests
+            st['connections'] += pool.num_connections
+    for st in stats.values():
+        st['reused'] = max(0, st['requests'] - st['connections'])
+    return stats
+
 
 # Functional API patch
 original_api_request = requests.api.request
@@ -50,7 +293,15 @@ def spoofed_api_request(method, url, **kwargs):
     if 'timeout' not in kwargs:
         kwargs['timeout'] = 30
         
-    return original_api_request(method, url, **kwargs)
+    return get_shared_session().request(method, url, **kwargs)
+
+
+def pooled_get(url, params=None, **kwargs):
+    return spoofed_api_request('GET', url, params=params, **kwargs)
+
+
+def pooled_post(url, data=None, json=None, **kwargs):
+    return spoofed_api_request('POST', url, data=data, json=json, **kwargs)
 
 _patched = False
 
@@ -63,10 +314,13 @@ def apply_patch():
     requests.api.request = spoofed_api_request
     requests.request = spoofed_api_request
     # Also patch the shortcuts
-    requests.get = lambda url, **kwargs: spoofed_api_request('GET', url, **kwargs)
-    requests.post = lambda url, **kwargs: spoofed_api_request('POST', url, **kwargs)
+    requests.get = pooled_get
+    requests.post = pooled_post
+    # Metrics hook first so it is outermost and also times cassette replays
+    run_metrics.install(_metrics_extra)
+    cassette.install_from_env()
     _patched = True
-    print("✅ Global Request Patch Applied (Header Spoofing & Timeouts Active)")
+    print("✅ Global Request Patch Applied (Header Spoofing, Timeouts & Keep-Alive Pool Active)")
 
 # v11.0: No longer auto-applies on import. Callers must call apply_patch() explicitly,
 # or set env SIPHON_AUTO_PATCH=1 for backward compatibility.
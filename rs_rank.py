@@ -0,0 +1,114 @@
+"""
+RSRank — Full-market relative-strength percentile, computed cross-sectionally.
+N-day returns for the whole A-share universe come from one vectorized pass
+over the local bar store, or for the horizons EastMoney publishes, from the
+cached spot snapshot. RS_Pct is the share of the universe a symbol
+outperforms (0-100), so the scorer only does an index lookup per candidate.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bar_store import get_bar_store
+from spot_cache import get_spot_cache
+
+logger = logging.getLogger("SiphonSystem")
+
+# N-day return columns in the EastMoney spot snapshot
+SNAPSHOT_RETURN_COLUMNS = {1: '涨跌幅', 60: '60日涨跌幅'}
+# Fewer ranked symbols than this is not a market-wide percentile
+MIN_UNIVERSE = 1000
+
+
+def returns_from_snapshot(days, snapshot=None):
+    """{symbol: N-day return %} Series from a spot snapshot (the cached EastMoney one
+    by default, never downloaded); None if the snapshot does not carry that horizon."""
+    column = SNAPSHOT_RETURN_COLUMNS.get(days)
+    if column is None:
+        return None
+    if snapshot is None:
+        snapshot = get_spot_cache().peek("eastmoney")
+    if snapshot is None or column not in snapshot.columns or '代码' not in snapshot.columns:
+        return None
+    codes = snapshot['代码'].astype(str).str.replace(r'^(sh|sz|bj)', '', regex=True).str.zfill(6)
+    returns = pd.Series(pd.to_numeric(snapshot[column], errors='coerce').to_numpy(), index=codes.to_numpy())
+    return returns[~returns.index.duplicated(keep='last')].dropna()
+
+
+def returns_from_bars(days, store=None, adjust="qfq", symbols=None):
+    """{symbol: N-day return %} Series from bars already on disk (no downloads).
+
+    All closes go into one (dates x symbols) array on the union calendar; a
+    suspension carries its last close forward. Symbols without a bar on the
+    latest date, or without history back to N sessions before it, are left out.
+    """
+    store = store or get_bar_store()
+    symbols = sorted(symbols if symbols is not None else store.stored_symbols(adjust))
+    codes, dates, closes = [], [], []
+    for code in symbols:
+        df = store.peek(code, adjust)
+        if df is None or len(df) < 2:
+            continue
+        # Enough rows for `days` sessions plus suspensions inside the window
+        tail = df.tail(days * 2 + 20)
+        codes.append(str(code).zfill(6))
+        dates.append(tail['date'].to_numpy())
+        closes.append(tail['close'].to_numpy())
+    if not codes:
+        return pd.Series(dtype=float)
+
+    # One (dates x symbols) array on the union calendar
+    calendar, row = np.unique(np.concatenate(dates).astype(str), return_inverse=True)
+    if len(calendar) <= days:
+        return pd.Series(dtype=float)
+    col = np.repeat(np.arange(len(codes)), [len(d) for d in dates])
+    panel = np.full((len(calendar), len(codes)), np.nan)
+    panel[row, col] = pd.to_numeric(pd.Series(np.concatenate(closes)), errors='coerce').to_numpy(dtype=float)
+
+    current = panel[-1]
+    start = pd.DataFrame(panel[:len(calendar) - days]).ffill().to_numpy()[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = (current / start - 1) * 100
+    returns = pd.Series(returns, index=codes)
+    return returns[np.isfinite(returns)]
+
+
+def rs_percentiles(returns):
+    """Percentile rank (0-100) of each return within the universe."""
+    return (returns.rank(pct=True) * 100).round(1)
+
+
+class RSRank:
+    """N-day returns and RS percentiles for the whole universe, indexed by symbol."""
+
+    def __init__(self, returns, days, source):
+        self.returns = returns
+        self.pct = rs_percentiles(returns).rename('RS_Pct')
+        self.days = days
+        self.source = source
+
+    def __len__(self):
+        return len(self.pct)
+
+    def lookup(self, symbols):
+        """RS_Pct per symbol (NaN when unranked)."""
+        return self.pct.reindex([str(s).zfill(6) for s in symbols]).to_numpy(dtype=float)
+
+
+def compute_rs_rank(days=60, store=None, snapshot=None, min_universe=MIN_UNIVERSE):
+    """RSRank from the cached snapshot when it carries `days`, else the bar store.
+    None when neither covers enough of the market to rank against."""
+    for source, loader in (("snapshot", lambda: returns_from_snapshot(days, snapshot)),
+                           ("bars", lambda: returns_from_bars(days, store))):
+        try:
+            returns = loader()
+        except Exception as e:
+            logger.warning(f"RSRank: {source} returns failed: {e}")
+            continue
+        if returns is not None and len(returns) >= min_universe:
+            return RSRank(returns, days, source)
+        if returns is not None:
+            logger.info(f"RSRank: {source} covers only {len(returns)} symbols for {days}-day returns")
+    return None
@@ -0,0 +1,190 @@
+"""
+RunMetrics — Per-host and per-akshare-function latency / failure counters.
+requests_patch records every HTTP call by host, the akshare hook records every
+akshare function, and the retry decorator records attempts, retries and backoff
+sleeps. Pipeline entry points call write_summary_at_exit() so the totals go
+to logs/run_metrics_<script>_<timestamp>.json when they finish; importing the
+patch alone (tests, ad-hoc scripts) only collects.
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger("SiphonSystem")
+
+METRICS_DIR = "logs"
+# Set SIPHON_METRICS=0 to disable collection and the exit summary (even from entry points)
+METRICS_ENABLED = os.environ.get("SIPHON_METRICS", "1") == "1"
+
+_local = threading.local()
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _Series:
+    __slots__ = ('latencies', 'bytes', 'failures', 'retries', 'wait_s', 'sleep_s')
+
+    def __init__(self):
+        self.latencies = []
+        self.bytes = 0
+        self.failures = 0
+        self.retries = 0
+        self.wait_s = 0.0
+        self.sleep_s = 0.0
+
+    def summary(self):
+        lat = sorted(self.latencies)
+        ms = lambda v: None if v is None else round(v * 1000, 1)
+        return {
+            'count': len(lat),
+            'failures': self.failures,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'total_s': round(sum(lat), 3),
+            'p50_ms': ms(_percentile(lat, 50)),
+            'p95_ms': ms(_percentile(lat, 95)),
+            'p99_ms': ms(_percentile(lat, 99)),
+            'max_ms': ms(lat[-1] if lat else None),
+            'throttle_wait_s': round(self.wait_s, 3),
+            'retry_sleep_s': round(self.sleep_s, 3),
+        }
+
+
+class RunMetrics:
+    """Series keyed by (kind, name): kind is 'host', 'akshare', 'function'
+    (retry-decorated) or 'source' (fetch_pool limiter waits only)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.started_at = time.time()
+
+    def _get(self, kind, name):
+        series = self._series.get((kind, name))
+        if series is None:
+            series = self._series[(kind, name)] = _Series()
+        return series
+
+    def record_call(self, kind, name, elapsed, nbytes=0, failed=False):
+        with self._lock:
+            series = self._get(kind, name)
+            series.latencies.append(elapsed)
+            series.bytes += nbytes
+            if failed:
+                series.failures += 1
+
+    def record_wait(self, kind, name, seconds):
+        with self._lock:
+            self._get(kind, name).wait_s += seconds
+
+    def record_retry(self, name, sleep_s=0.0):
+        with self._lock:
+            series = self._get('function', name)
+            series.retries += 1
+            series.sleep_s += sleep_s
+
+    def summary(self):
+        with self._lock:
+            items = list(self._series.items())
+        result = {'host': {}, 'akshare': {}, 'function': {}, 'source': {}}
+        for (kind, name), series in items:
+            result.setdefault(kind, {})[name] = series.summary()
+        return result
+
+    def write_summary(self, extra=None, directory=METRICS_DIR):
+        """Write the run summary as JSON; returns the path, or None if nothing was recorded."""
+        if not self._series:
+            return None
+        script = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+        now = datetime.datetime.now()
+        payload = {
+            'script': script,
+            'started_at': datetime.datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'finished_at': now.isoformat(timespec='seconds'),
+            'wall_s': round(time.time() - self.started_at, 3),
+        }
+        payload.update(self.summary())
+        if extra:
+            payload.update(extra)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run_metrics_{script}_{now.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        return path
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def add_akshare_bytes(nbytes):
+    """Attribute bytes received over HTTP to the akshare function running on this thread."""
+    if getattr(_local, 'ak_bytes', None) is not None:
+        _local.ak_bytes += nbytes
+
+
+def akshare_hook(name, call, args, kwargs):
+    """akshare_hooks hook: time the whole function, including parsing and any cassette replay."""
+    _local.ak_bytes = 0
+    t0 = time.perf_counter()
+    failed = True
+    try:
+        result = call()
+        failed = False
+        return result
+    finally:
+        _metrics.record_call('akshare', name, time.perf_counter() - t0, _local.ak_bytes, failed)
+        _local.ak_bytes = None
+
+
+_exit_extras = []
+_exit_registered = False
+
+
+def install(extra_fn=None):
+    """Register the akshare hook once. extra_fn() -> dict is merged into the
+    summary (requests_patch adds breaker / keep-alive stats)."""
+    if not METRICS_ENABLED:
+        return
+    if extra_fn is not None and extra_fn not in _exit_extras:
+        _exit_extras.append(extra_fn)
+    import akshare_hooks
+    akshare_hooks.register_hook(akshare_hook)
+
+
+def write_summary_at_exit():
+    """Write the run summary to logs/ when the process exits. Only pipeline entry
+    points call this, so importing the patch never leaves files behind."""
+    global _exit_registered
+    if not METRICS_ENABLED or _exit_registered:
+        return
+    atexit.register(_write_at_exit)
+    _exit_registered = True
+
+
+def _write_at_exit():
+    try:
+        extra = {}
+        for fn in _exit_extras:
+            extra.update(fn())
+        path = _metrics.write_summary(extra)
+        if path:
+            print(f"📈 Run metrics written to {path}")
+    except Exception as e:
+        logger.warning(f"RunMetrics: could not write summary: {e}")
@@ -8,6 +8,9 @@ and live recommendation.
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from jit_kernels import resilience_streak
 
 
 # ─── Market regime detection ───
@@ -193,6 +196,158 @@ def calc_composite_score(ag_score, micro_mom_score, inst_score, vcp_score, regim
     return round(min(score, 100.0), 1)
 
 
+# ─── Live scoring kernels (1-D arrays, oldest bar first) ───
+
+def _nanmean(values):
+    """Mean skipping NaN, computed the way pandas' Series.mean() does."""
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    if not count:
+        return np.float64(np.nan)
+    return np.where(valid, values, 0.0).sum() / count
+
+
+def _rolling_mean_last(values, window):
+    """Last value of Series.rolling(window).mean() (pandas' own kernel, bit for bit)."""
+    return pd.Series(values, dtype=float).rolling(window).mean().iloc[-1]
+
+
+def calc_antigravity_from_changes(stock_changes, index_changes, lookback=10):
+    """Live antigravity (0-10+) from date-paired daily changes (%).
+
+    Unlike calc_antigravity_score (close-based, used by the backtest), a down day
+    counts once: +2 if the stock rose, else +1 if it beat the index by > 1.5pt.
+    Two or more resilient down days since the last failed one add a +1 bonus.
+
+    Returns: (score, hits) with hits = [(position, is_defiant), ...]
+    """
+    score = 0.0
+    hits = []
+    consecutive_resilience = 0
+
+    for i in range(max(0, len(index_changes) - lookback), len(index_changes)):
+        idx_chg = index_changes[i]
+        if not idx_chg < -0.3:
+            continue
+        stk_chg = stock_changes[i]
+        if stk_chg > 0:
+            score += 2.0
+            consecutive_resilience += 1
+            hits.append((i, True))
+        elif stk_chg > (idx_chg + 1.5):
+            score += 1.0
+            consecutive_resilience += 1
+            hits.append((i, False))
+        else:
+            consecutive_resilience = 0
+
+    if consecutive_resilience >= 2:
+        score += 1.0
+
+    return score, hits
+
+
+def calc_pocket_pivot(today_vol, today_change_pct, prev_volumes, prev_changes, ma5_vol):
+    """Pocket pivot (0-15): today's volume above every down-day volume of the prior bars."""
+    is_down = np.asarray(prev_changes, dtype=float) < 0
+    if is_down.any():
+        down_vols = np.asarray(prev_volumes, dtype=float)[is_down]
+        down_vols = down_vols[~np.isnan(down_vols)]
+        max_down_vol = down_vols.max() if len(down_vols) else np.nan
+    else:
+        max_down_vol = 0
+
+    if today_vol > max_down_vol and today_change_pct > 0:
+        return 15.0
+    if today_vol > ma5_vol * 1.5 and today_change_pct > 0:
+        return 5.0
+    return 0.0
+
+
+def calc_institutional_burst(volume, high, low, close, change_pct, is_hot_sector=False):
+    """Institutional Burst (0-40): volume/price action + pocket pivot + sector synergy.
+
+    Returns: (score, vol_ratio, is_closing_high)
+    """
+    if len(volume) < 11:
+        return 0.0, 1.0, False
+
+    ma5_vol = _nanmean(volume[-6:-1])
+    high_low_range = high[-1] - low[-1]
+    close_position = (close[-1] - low[-1]) / high_low_range if high_low_range > 0 else 1.0
+
+    score, vol_ratio, is_closing_high = calc_volume_burst(volume[-1], ma5_vol, close_position)
+    score += calc_pocket_pivot(volume[-1], change_pct[-1], volume[-11:-1], change_pct[-11:-1], ma5_vol)
+    if is_hot_sector:
+        score += 10.0
+
+    return min(score, 40.0), vol_ratio, is_closing_high
+
+
+def calc_vcp_breakout(volume, change_pct):
+    """VCP & Squeeze Breakout (0-15) from volume / change arrays.
+
+    Returns: (score, is_vcp)
+    """
+    if len(volume) < 6:
+        return 0.0, False
+    return calc_vcp_breakout_from_values(volume[-2], volume[-1], _nanmean(volume[-7:-2]), change_pct[-1])
+
+
+def calc_limit_up_gene(change_pct, close, high, lookback=20):
+    """Limit-Up Gene (0-15): +5 for a limit-up in the last `lookback` bars, +3 if the
+    latest one sealed at the high, +7/+4 for a strong/positive next-day premium.
+
+    Returns: (score, had_limit_up)
+    """
+    n = len(change_pct)
+    if n < lookback:
+        return 0.0, False
+
+    limit_up = np.flatnonzero(np.asarray(change_pct[-lookback:], dtype=float) >= 9.5)
+    if not len(limit_up):
+        return 0.0, False
+
+    score = 5.0
+    last = n - lookback + limit_up[-1]
+    if close[last] >= high[last] * 0.999:
+        score += 3.0
+    if last + 1 < n:
+        premium = change_pct[last + 1]
+        if premium > 3.0:
+            score += 7.0
+        elif premium > 0:
+            score += 4.0
+
+    return round(min(score, 15.0), 1), True
+
+
+def calc_ma_alignment(close):
+    """MA5/MA20/MA60 alignment bonus.
+
+    Returns: (score_adjustment, alignment_label)
+    """
+    if len(close) < 60:
+        return 0.0, 'insufficient_data'
+
+    ma5 = _rolling_mean_last(close, 5)
+    ma20 = _rolling_mean_last(close, 20)
+    ma60 = _rolling_mean_last(close, 60)
+
+    if pd.isna(ma5) or pd.isna(ma20) or pd.isna(ma60):
+        return 0.0, 'na'
+
+    if ma5 > ma20 > ma60:
+        return 10.0, '多头排列'
+    elif ma5 > ma20:
+        return 5.0, '短多'
+    elif ma5 < ma20 < ma60:
+        return -5.0, '空头排列'
+    else:
+        return 0.0, '震荡'
+
+
 # ─── Confidence grading ───
 
 def get_confidence_grade(composite_score):
@@ -212,18 +367,82 @@ def get_confidence_grade(composite_score):
 
 # ─── Backtest-compatible static factor computation ───
 
-def precompute_static_factors_unified(df_daily, index_daily=None):
-    """Compute static factors for backtest, using the same scoring as live.
-
-    This replaces the old `precompute_static_factors` in win_server_fixed.py
-    to ensure scoring consistency.
-
-    Args:
-        df_daily: DataFrame with columns [date, close, high, low, volume, change_pct]
-        index_daily: Optional DataFrame with [date, close, Index_Change] for AG scoring
-
-    Returns: DataFrame with per-day factors
-    """
+def _pyround(values, ndigits):
+    """Element-wise built-in round() (correctly rounded), which np.round is not on ties."""
+    values = np.asarray(values, dtype=float)
+    return np.array([round(v, ndigits) for v in values.ravel().tolist()], dtype=float).reshape(values.shape)
+
+
+def _window_mean(values, width, first, n):
+    """out[i] = np.mean(values[i - first : i - first + width]) for i in [0, n) where the window fits."""
+    out = np.full(n, np.nan)
+    if len(values) >= width:
+        means = sliding_window_view(values, width).mean(axis=1)
+        lo = max(first, 0)
+        hi = min(n, len(means) + first)
+        if hi > lo:
+            out[lo:hi] = means[lo - first:hi - first]
+    return out
+
+
+def _shift(values, k, fill=np.nan):
+    """values[i - k] at position i (NaN/`fill` where i - k < 0)."""
+    out = np.full(len(values), fill, dtype=float)
+    if k < len(values):
+        out[k:] = values[:len(values) - k]
+    return out
+
+
+def _micro_momentum_series(close, idx_closes, start, n):
+    """calc_micro_momentum on the 7-bar window ending at each i (positional index alignment)."""
+    scores = np.zeros(n)
+    if idx_closes is None:
+        return scores
+    m = min(n, len(idx_closes))
+    if m <= start:
+        return scores
+    c = np.asarray(close[:m], dtype=float)
+    x = np.asarray(idx_closes[:m], dtype=float)
+    i = np.arange(start, m)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        alpha_3d = (c[i] / c[i - 3] - 1) * 100 - (x[i] / x[i - 3] - 1) * 100
+        alpha_5d = (c[i] / c[i - 5] - 1) * 100 - (x[i] / x[i - 5] - 1) * 100
+    score = np.minimum(np.maximum(alpha_3d * 2.0, 0), 15.0) + np.minimum(np.maximum(alpha_5d * 1.5, 0), 10.0)
+    scores[start:m] = _pyround(score, 1)
+    return scores
+
+
+def _antigravity_series(close, idx_changes, start, n, lookback=10):
+    """calc_antigravity_score over the `lookback` days ending at each i >= start."""
+    scores = np.zeros(n)
+    if idx_changes is None:
+        return scores
+    m = min(n, len(idx_changes))
+    if m <= start:
+        return scores
+    c = np.asarray(close[:m], dtype=float)
+    idx = np.asarray(idx_changes[:m], dtype=float)
+    prev = _shift(c, 1)
+    valid = (prev != 0) & (np.arange(m) >= 1)   # the loop skips days after a zero close
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stk = (c / prev - 1) * 100
+        down = valid & (idx < -0.3)
+        up = down & (stk > 0)
+        reset = down & ~(stk > 0)
+        bonus = down & (stk - idx > 1.5)
+
+    window_sum = lambda flags: np.convolve(flags.astype(float), np.ones(lookback))[:m]
+    # Consecutive counter = up-days after the last reset inside the window
+    streak = resilience_streak(up, reset, lookback)
+
+    score = 2.0 * window_sum(up) + window_sum(bonus) + np.where(streak >= 2, 1.0, 0.0)
+    scores[start:m] = score[start:m]
+    return scores
+
+
+def _precompute_static_factors_loop(df_daily, index_daily=None):
+    """Reference day-by-day implementation of precompute_static_factors_unified.
+    Kept for parity tests and benchmarks (scripts/bench_static_factors.py)."""
     if len(df_daily) < 10:
         return None
 
@@ -310,3 +529,91 @@ def precompute_static_factors_unified(df_daily, index_daily=None):
     )
 
     return df_f
+
+
+def precompute_static_factors_unified(df_daily, index_daily=None):
+    """Compute static factors for backtest, using the same scoring as live.
+
+    This replaces the old `precompute_static_factors` in win_server_fixed.py
+    to ensure scoring consistency.
+
+    Args:
+        df_daily: DataFrame with columns [date, close, high, low, volume, change_pct]
+        index_daily: Optional DataFrame with [date, close, Index_Change] for AG scoring
+
+    Vectorized over the whole history (rolling windows, cumulative sums and
+    shifted arrays); values match _precompute_static_factors_loop exactly.
+
+    Returns: DataFrame with per-day factors
+    """
+    if len(df_daily) < 10:
+        return None
+
+    close = df_daily['close'].values
+    high = df_daily['high'].values
+    low = df_daily['low'].values
+    volume = df_daily['volume'].values
+    dates = df_daily['date'].values
+    n = len(close)
+    active = np.arange(n) >= 10     # the loop leaves the first 10 days at their defaults
+
+    idx_closes = None
+    idx_changes = None
+    if index_daily is not None and len(index_daily) > 0:
+        idx_closes = index_daily['close'].values
+        if 'Index_Change' in index_daily.columns:
+            idx_changes = index_daily['Index_Change'].values
+
+    close_f = close.astype(float)
+    close_3 = _shift(close_f, 3)
+    close_1 = _shift(close_f, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 3-day momentum
+        pct_3d = np.where(active, np.where(close_3 != 0, (close_f / close_3 - 1) * 100, 0), 0.0)
+
+        # Volume ratio: 3-day mean over the 5 days before it
+        v3 = _window_mean(volume, 3, 2, n)
+        v5 = _window_mean(volume, 5, 7, n)
+        vol_ratio = np.where(active, v3 / (v5 + 1e-9), 1.0)
+
+        # Average daily volume
+        avg_vol = np.where(active, _window_mean(volume, 5, 4, n), 0.0)
+
+        # Close position in range
+        hl_range = high - low
+        close_position = np.where(active, np.where(hl_range > 0, (close - low) / hl_range, 1.0), 0.0)
+
+        # VCP (calc_vcp_breakout_from_values on shifted arrays)
+        yesterday_vol = _shift(volume.astype(float), 1)
+        change_pct = np.where(close_1 != 0, (close_f / close_1 - 1) * 100, 0)
+        contracted = active & (yesterday_vol < v5 * 0.6)
+        is_vcp = contracted & (volume > yesterday_vol * 2.0) & (change_pct > 2.0)
+        partial = contracted & ~is_vcp & (volume > yesterday_vol * 1.5) & (change_pct > 0)
+    vcp_scores = np.where(is_vcp, 15.0, np.where(partial, 8.0, 0.0))
+
+    micro_mom = _micro_momentum_series(close, idx_closes, 10, n)
+    ag_scores = _antigravity_series(close, idx_changes, 11, n)
+
+    df_f = pd.DataFrame({
+        'date': dates,
+        'last_close': close,
+        'pct_3d': pct_3d,
+        'vol_ratio': vol_ratio,
+        'is_vcp': is_vcp,
+        'avg_daily_vol': avg_vol,
+        'close_position': close_position,
+        'ag_score': ag_scores,
+        'micro_mom': micro_mom,
+        'vcp_score': vcp_scores,
+    })
+
+    # calc_composite_score (neutral weights, volume burst of calc_volume_burst(0, 1, .) = 0),
+    # summed in the same order so the floats match
+    w = get_regime_weights('neutral')
+    score = 0.0 + np.minimum(0.0, w['inst_burst'])
+    score = score + np.minimum(micro_mom, w['micro_mom'])
+    score = score + np.minimum(ag_scores * 2.0, float(w['antigravity']))
+    score = score + np.minimum(vcp_scores, w['vcp'])
+    df_f['ag_score_static'] = _pyround(np.minimum(score, 100.0), 1)
+
+    return df_f
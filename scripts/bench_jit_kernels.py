@@ -0,0 +1,101 @@
+"""
+Benchmark — path-dependent scoring kernels on a full-market, multi-year panel.
+Times the plain Python loops, the NumPy fallback and (when numba is installed)
+the compiled kernels from jit_kernels, and checks they agree.
+
+Usage: python scripts/bench_jit_kernels.py [--symbols 5000] [--days 1250] [--loop-symbols 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import jit_kernels as jk
+
+
+def make_panel(symbols, days, seed=0):
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0.0005, 0.03, (symbols, days))
+    ret[rng.random((symbols, days)) < 0.01] = 0.1
+    close = 10 * np.cumprod(1 + ret, axis=1)
+    high = np.where(rng.random((symbols, days)) < 0.3, close, close * (1 + np.abs(rng.normal(0, 0.01, (symbols, days)))))
+    volume = rng.lognormal(14, 0.7, (symbols, days))
+    volume[rng.random((symbols, days)) < 0.1] *= 0.2
+    change_pct = np.concatenate((np.zeros((symbols, 1)), (close[:, 1:] / close[:, :-1] - 1) * 100), axis=1)
+    idx_change = rng.normal(0, 1.2, (symbols, days))
+    held = (idx_change < -0.3) & (change_pct > 0)
+    failed = (idx_change < -0.3) & ~held
+    return {'close': close, 'high': high, 'volume': volume, 'change_pct': change_pct,
+            'held': held, 'failed': failed}
+
+
+def make_intraday(positions, bars=48, seed=1):
+    rng = np.random.default_rng(seed)
+    open_ = 10 * np.cumprod(1 + rng.normal(0, 0.004, (positions, bars)), axis=1)
+    return open_, open_ * 1.003, open_ * 0.997
+
+
+KERNELS = {
+    'resilience_streak': (jk._streak_loop, jk._streak_numpy, '_streak_kernel',
+                          lambda p: (p['held'], p['failed'], 10)),
+    'limit_up_gene': (jk._limit_up_loop, jk._limit_up_numpy, '_limit_up_kernel',
+                      lambda p: (p['change_pct'], p['close'], p['high'], 20)),
+    'vcp_breakout': (jk._vcp_loop, jk._vcp_numpy, '_vcp_kernel',
+                     lambda p: (p['volume'], p['change_pct'])),
+}
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jit_kernels on a synthetic market panel")
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=1250)
+    parser.add_argument("--loop-symbols", type=int, default=20, help="rows timed with the Python loop (extrapolated)")
+    parser.add_argument("--positions", type=int, default=20000, help="TP/SL walks (48 five-minute bars each)")
+    args = parser.parse_args()
+
+    print(f"📊 Panel {args.symbols} symbols x {args.days} days | numba "
+          f"{'available' if jk.NUMBA_AVAILABLE else 'not installed'} | backend={jk.backend()}")
+    panel = make_panel(args.symbols, args.days)
+    sub = {k: v[:args.loop_symbols] for k, v in panel.items()}
+    scale = args.symbols / max(args.loop_symbols, 1)
+
+    for name, (loop_fn, numpy_fn, jit_attr, make_args) in KERNELS.items():
+        loop_s, loop_out = timed(loop_fn, *make_args(sub))
+        numpy_s, numpy_out = timed(numpy_fn, *make_args(panel))
+        assert np.array_equal(loop_out, numpy_out[:args.loop_symbols]), f"{name}: NumPy fallback disagrees"
+        line = f"   {name:18s} loop ~{loop_s * scale:8.2f}s  numpy {numpy_s:7.3f}s ({loop_s * scale / numpy_s:6.1f}x)"
+        if jk.USE_NUMBA:
+            kernel = getattr(jk, jit_attr)
+            kernel(*make_args(sub))  # compile
+            jit_s, jit_out = timed(kernel, *make_args(panel))
+            assert np.array_equal(jit_out, numpy_out), f"{name}: numba kernel disagrees"
+            line += f"  numba {jit_s:7.3f}s ({loop_s * scale / jit_s:6.1f}x)"
+        print(line)
+
+    open_, high, low = make_intraday(args.positions)
+    backends = [('loop', jk._tpsl_loop), ('numpy', jk._tpsl_numpy)]
+    if jk.USE_NUMBA:
+        jk._tpsl_kernel(open_[0], high[0], low[0], 10.0, 2.0, 2.0)  # compile
+        backends.append(('numba', jk._tpsl_kernel))
+    results = {}
+    for label, fn in backends:
+        t0 = time.perf_counter()
+        results[label] = [fn(open_[i], high[i], low[i], 10.0, 1.5, 1.5)[:1] for i in range(args.positions)]
+        results[label + '_s'] = time.perf_counter() - t0
+    assert all(results[label] == results['loop'] for label, _ in backends), "tpsl_walk backends disagree"
+    print(f"   {'tpsl_walk':18s} " + "  ".join(
+        f"{label} {results[label + '_s'] * 1e6 / args.positions:6.2f}us/walk" for label, _ in backends))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
-import akshare as ak
-import pandas as pd
 import datetime
+import os
 import sys
 
+# Run from anywhere: trade_calendar lives in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trade_calendar import get_trade_calendar
+
 def main():
     try:
         today = datetime.date.today()
-        # Fetch trading calendar
-        trade_dates_df = ak.tool_trade_date_hist_sina()
-        trade_dates = pd.to_datetime(trade_dates_df['trade_date']).dt.date.tolist()
-        
-        if today in trade_dates:
+        # Cached trading calendar (downloaded at most once a day)
+        calendar = get_trade_calendar()
+        if calendar.fallback:
+            raise RuntimeError("calendar unavailable")
+
+        if calendar.is_trading_day(today):
             print(f"✅ {today} is a trading day.")
             sys.exit(0)
         else:
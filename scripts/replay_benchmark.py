@@ -0,0 +1,96 @@
+"""
+Replay Benchmark — Time the daily pipeline end-to-end against a cassette.
+
+Record once on a networked box:
+    SIPHON_CASSETTE=record python scripts/replay_benchmark.py
+then rerun offline (default mode):
+    python scripts/replay_benchmark.py [--cassette-dir DIR] [--stages strategy,report,tracker]
+
+Each run happens in a fresh scratch directory so the bar / spot / sentiment
+caches under data_cache/ can't short-circuit the recorded calls. The tracker
+database and last results CSV are copied in so the report has history to read.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", default=os.environ.get("SIPHON_CASSETTE") or "replay",
+                        choices=["record", "replay"])
+    parser.add_argument("--cassette-dir", default=os.path.join(REPO_ROOT, "data_cache", "cassettes"))
+    parser.add_argument("--stages", default="strategy,report,tracker")
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    # Must be set before requests_patch / cassette are imported
+    os.environ["SIPHON_CASSETTE"] = args.mode
+    os.environ["SIPHON_CASSETTE_DIR"] = os.path.abspath(args.cassette_dir)
+    os.environ.setdefault("SKIP_AI", "1")
+
+    workdir = tempfile.mkdtemp(prefix="siphon_replay_")
+    for name in ("boomerang_tracker.db", "siphon_strategy_results.csv"):
+        if os.path.exists(os.path.join(REPO_ROOT, name)):
+            shutil.copy(os.path.join(REPO_ROOT, name), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    import requests_patch
+    requests_patch.apply_patch()
+    import cassette
+    import run_metrics
+    run_metrics.write_summary_at_exit()
+    import siphon_strategy
+    import fallback_email_sender
+    import boomerang_tracker
+    from bar_store import get_bar_store
+
+    # The recording may come from a different day: run whatever the calendar says
+    siphon_strategy.is_trading_day = lambda *a, **k: True
+    fallback_email_sender.is_trading_day = lambda *a, **k: True
+
+    def tracker_fetcher(stock_code):
+        df = get_bar_store().get_bars(stock_code, None, None, adjust="")
+        if df is None or df.empty:
+            return None
+        last_row = df.iloc[-1]
+        return {'close': float(last_row['close']), 'change_pct': float(last_row.get('change_pct', 0.0))}
+
+    stages = {
+        'strategy': siphon_strategy.run_siphoner_strategy,
+        'report': fallback_email_sender.generate_report,
+        'tracker': lambda: boomerang_tracker.update_daily_performance(tracker_fetcher),
+    }
+
+    timings = []
+    for name in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        t0 = time.perf_counter()
+        try:
+            stages[name]()
+            status = "ok"
+        except SystemExit as e:
+            # The strategy bails out with sys.exit on fatal data errors
+            status = f"exited: {e.code}"
+        except Exception as e:
+            status = f"failed: {e}"
+        timings.append((name, time.perf_counter() - t0, status))
+
+    print("\n" + "=" * 60)
+    print(f"📼 {args.mode.upper()} benchmark ({workdir})")
+    for name, elapsed, status in timings:
+        print(f"   {name:<10} {elapsed:8.2f}s  {status}")
+    print(f"   Cassette: {cassette.get_cassette().stats}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Scoring parity — diff the live scoring factors (scoring_engine kernels) against the
+frozen DataFrame implementations over recorded histories, and report the
+per-candidate scoring cost of each path.
+
+Histories come from the local bar store (data_cache/bars, read offline) and the
+index from --index-csv or fetch_index_data (replayable with SIPHON_CASSETTE=replay).
+With no recorded data, or with --synthetic N, synthetic bars are used instead.
+
+Usage: python scripts/scoring_parity.py [--limit 300] [--days 120] [--index-csv path] [--synthetic N]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+import legacy_live_scoring as legacy
+import siphon_strategy as live
+from bar_store import BarStore
+from batch_scorer import (PricePanel, antigravity_scores, institutional_burst, limit_up_gene_scores,
+                          ma_alignment, micro_momentum_scores, vcp_scores)
+
+FACTORS = ('antigravity', 'micro_momentum', 'inst_burst', 'vcp', 'limit_up_gene', 'ma_alignment', 'composite')
+
+
+def _factors(mod, hist, index_df, is_hot, regime):
+    ag = mod.calculate_antigravity_score(hist, index_df)
+    mom = mod.calc_micro_momentum(hist, index_df)
+    inst = mod.calc_institutional_burst(hist, is_hot)
+    vcp = mod.calc_vcp_breakout(hist)
+    return {
+        'antigravity': ag,
+        'micro_momentum': mom,
+        'inst_burst': inst,
+        'vcp': vcp,
+        'limit_up_gene': mod.calc_limit_up_gene(hist),
+        'ma_alignment': mod.calc_ma_alignment_score(hist),
+        'composite': mod.calc_composite_score(ag[0], mom[0], inst[0], vcp[0], regime=regime),
+    }
+
+
+def _recorded_histories(limit, days):
+    store = BarStore(fetcher=lambda *args: None)  # offline: never download
+    start = (datetime.date.today() - datetime.timedelta(days=days * 2)).strftime('%Y-%m-%d')
+    histories = []
+    for code in sorted(store.stored_symbols(adjust=""))[:limit]:
+        df = store.get_bars(code, start, adjust="")
+        if df is None or len(df) < 2:
+            continue
+        df = df.sort_values('date')
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df['change_pct'] = (df['close'].pct_change() * 100).fillna(0)
+        histories.append(df[['date', 'open', 'high', 'low', 'close', 'volume', 'change_pct']].reset_index(drop=True))
+    return histories
+
+
+def _synthetic(count, days):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=datetime.date.today(), periods=days).strftime('%Y-%m-%d')
+    index_df = pd.DataFrame({'date': dates, 'close': 3500 * np.cumprod(1 + rng.normal(0, 0.012, days))})
+    index_df['Index_Change'] = index_df['close'].pct_change() * 100
+    histories = []
+    for _ in range(count):
+        ret = rng.normal(0.001, 0.03, days)
+        ret[rng.integers(0, days, size=3)] = 0.1
+        close = 10 * np.cumprod(1 + ret)
+        df = pd.DataFrame({'date': dates, 'open': close,
+                           'high': close * (1 + np.abs(rng.normal(0, 0.01, days))),
+                           'low': close * (1 - np.abs(rng.normal(0, 0.01, days))),
+                           'close': close, 'volume': rng.lognormal(14, 0.7, days)})
+        df['change_pct'] = (df['close'].pct_change() * 100).fillna(0)
+        histories.append(df)
+    return histories, index_df
+
+
+def _timed(fn, histories):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) / max(len(histories), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff live scoring kernels against the legacy DataFrame factors")
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--index-csv", default=None)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--regime", default="neutral")
+    args = parser.parse_args()
+
+    histories, index_df = [], None
+    if not args.synthetic:
+        histories = _recorded_histories(args.limit, args.days)
+        if args.index_csv:
+            index_df = pd.read_csv(args.index_csv, dtype={'date': str})
+        elif histories:
+            index_df = live.fetch_index_data(days=args.days)
+    if not histories or index_df is None or index_df.empty:
+        if not args.synthetic:
+            print("⚠️ No recorded histories/index available, using synthetic bars")
+        histories, index_df = _synthetic(args.synthetic or args.limit, args.days)
+
+    print(f"📊 {len(histories)} histories, index {len(index_df)} days, regime={args.regime}")
+    diffs = {k: [] for k in FACTORS}
+    for i, hist in enumerate(histories):
+        is_hot = bool(i % 2)
+        old = _factors(legacy, hist, index_df, is_hot, args.regime)
+        new = _factors(live, hist, index_df, is_hot, args.regime)
+        for k in FACTORS:
+            if old[k] != new[k]:
+                diffs[k].append((i, old[k], new[k]))
+
+    for k in FACTORS:
+        status = "✅" if not diffs[k] else "❌"
+        print(f"   {status} {k:15s} {len(diffs[k])} diffs")
+        for i, a, b in diffs[k][:5]:
+            print(f"        #{i}: legacy={a} live={b}")
+
+    # Per-candidate scoring cost
+    def run(mod):
+        return lambda: [_factors(mod, h, index_df, True, args.regime) for h in histories]
+
+    def run_batch():
+        panel = PricePanel(histories, index_df)
+        antigravity_scores(panel)
+        micro_momentum_scores(panel)
+        institutional_burst(panel, np.ones(panel.n, dtype=bool))
+        vcp_scores(panel)
+        limit_up_gene_scores(panel)
+        ma_alignment(panel)
+
+    legacy_s = _timed(run(legacy), histories)
+    live_s = _timed(run(live), histories)
+    batch_s = _timed(run_batch, histories)
+    print("⏱️ Per-candidate factor cost")
+    print(f"   legacy DataFrame: {legacy_s * 1000:8.3f} ms")
+    print(f"   engine kernels:   {live_s * 1000:8.3f} ms  ({legacy_s / live_s:.1f}x)")
+    print(f"   batch panel:      {batch_s * 1000:8.3f} ms  ({legacy_s / batch_s:.1f}x)")
+    return 1 if any(diffs.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,17 @@
+import os
+import sys
+
 import akshare as ak
 import pandas as pd
 
+# Run from anywhere: spot_cache lives in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spot_cache import get_spot_snapshot
+
 def fetch_data():
     print("Fetching A-Share spot data...")
-    # Fetch real-time data for A-shares
-    stock_spot_df = ak.stock_zh_a_spot_em()
+    # Fetch real-time data for A-shares (reuses a fresh cached snapshot if there is one)
+    stock_spot_df = get_spot_snapshot("eastmoney", ak.stock_zh_a_spot_em)
     
     # Rename columns for clarity (optional, but good for inspection)
     # The API usually returns Chinese column names or specific English keys.
@@ -8,9 +8,10 @@ v3.0 improvements:
 
 import datetime
 import logging
-import akshare as ak
 import pandas as pd
 
+from bar_store import get_bar_store
+
 logger = logging.getLogger("SiphonSystem")
 
 
@@ -89,11 +90,8 @@ class ShieldService:
                 logger.debug(f"Cache miss for {symbol}, fetching...")
                 today = datetime.date.today().strftime("%Y%m%d")
                 start = (datetime.date.today() - datetime.timedelta(days=90)).strftime("%Y%m%d")
-                prefix = "sz" if symbol.startswith("0") or symbol.startswith("3") else "sh"
-                if symbol.startswith("4") or symbol.startswith("8"):
-                    prefix = "bj"
-                df = ak.stock_zh_a_daily(symbol=prefix+symbol, start_date=start, end_date=today, adjust="qfq")
-                if not df.empty:
+                df = get_bar_store().get_bars(symbol, start, today, adjust="qfq")
+                if df is not None and not df.empty:
                     ShieldService.calc_macd(df)
                     ShieldService.calc_kdj(df)
                     ShieldService.calc_ma(df, 20)
@@ -0,0 +1,86 @@
+"""
+SingleFlight — Collapse identical upstream requests into one call.
+Callers asking for the same key while a fetch is in flight wait for it and
+share its result; a finished result is also reused for a short TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'done_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.done_at = None
+
+
+class SingleFlight:
+    """Keyed request coalescing with hit / coalesce counters.
+
+    stats['calls']     — fn actually executed
+    stats['coalesced'] — waited on a call already in flight
+    stats['hits']      — served from a result finished less than `ttl` seconds ago
+    """
+
+    def __init__(self, ttl=300.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._recent = OrderedDict()
+        self.stats = {'calls': 0, 'coalesced': 0, 'hits': 0, 'errors': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None:
+                if time.monotonic() - recent.done_at <= self.ttl:
+                    self._recent.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return recent.result
+                del self._recent[key]
+            call = self._inflight.get(key)
+            if call is not None:
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._inflight[key] = _Call()
+                self.stats['calls'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        call.done_at = time.monotonic()
+        with self._lock:
+            del self._inflight[key]
+            if call.error is None:
+                self._recent[key] = call
+                while len(self._recent) > self.max_entries:
+                    self._recent.popitem(last=False)
+            else:
+                self.stats['errors'] += 1
+        call.event.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def forget(self, key=None):
+        """Drop a remembered result (or all of them) so the next call refetches."""
+        with self._lock:
+            if key is None:
+                self._recent.clear()
+            else:
+                self._recent.pop(key, None)
@@ -1,14 +1,15 @@
 
 import akshare as ak
 import pandas as pd
+import numpy as np
 import time
 import datetime
 import os
 import functools
-import warnings
-import pickle
+import json
 import random
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 # --- v11.0: Unified logging configuration ---
 logging.basicConfig(
@@ -20,7 +21,24 @@ logger = logging.getLogger("SiphonSystem")
 
 
 # --- Global Configuration & Patching ---
+import cassette
 import requests_patch
+import run_metrics
+from fetch_pool import fetch_concurrently
+from batch_scorer import score_candidates
+from bar_store import get_bar_store
+from factor_state import get_factor_store
+from aligned_history import as_aligned, index_calendar
+# v11.1: Live factors run on the shared scoring_engine kernels
+import scoring_engine
+from scoring_engine import get_regime_weights, calc_composite_score
+from factor_cache import get_factor_cache
+from filter_stats import FilterStats
+from rs_rank import compute_rs_rank
+# v10.2 holiday check, v11.1: served from the cached calendar
+from trade_calendar import is_trading_day, prev_trading_day
+from spot_cache import get_spot_snapshot
+from industry_index import get_board_index, get_industry_index
 
 # --- Configuration ---
 CACHE_DIR = "data_cache"
@@ -63,29 +81,18 @@ class StrategyConfig:
     vol_explosion_multiplier: float = 2.0  # Volume explosion threshold
     # Processing
     max_process: int = 300
+    fetch_workers: int = 8            # History fetch pool size (throttled per source)
+    batch_scoring: bool = True        # Score fetched chunks in vectorized passes (batch_scorer)
+    factor_state: bool = True         # Carry per-symbol indicator state forward (factor_state)
+    factor_cache: bool = True         # Reuse factors of unchanged histories across runs (factor_cache)
+    rs_rank: bool = True              # Full-market RS percentile column (rs_rank)
+    rs_days: int = 60                 # RS return horizon in sessions
 
 CONFIG = StrategyConfig()
 
-# --- v10.2: Market Holiday Check ---
-def is_trading_day():
-    """Check if today is a trading day in A-share market."""
-    try:
-        # Get trading dates from Sina (includes past and future)
-        df_dates = ak.tool_trade_date_hist_sina()
-        if df_dates.empty:
-            return True # Fallback to continue if API fails
-        
-        # Current date in Beijing Time (approximate for GHA which is UTC)
-        # GHA runs at 01:50 UTC (09:50 BEI) and 06:35 UTC (14:35 BEI)
-        # In both cases, UTC date is the same as BEI date.
-        today = datetime.date.today()
-        
-        # Check if today is in the trading calendar
-        is_trade = today in df_dates['trade_date'].values
-        return is_trade
-    except Exception as e:
-        print(f"⚠️ Holiday check error: {e}. Defaulting to TRADING DAY.")
-        return True
+# v11.1: Batch scoring runs on chunks of this many fetched histories, so it
+# overlaps the fetches still in flight instead of waiting for the whole pool
+BATCH_SCORE_CHUNK = 64
 
 # --- Utilities ---
 def retry(times=3, initial_delay=2):
@@ -93,14 +100,29 @@ def retry(times=3, initial_delay=2):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             delay = initial_delay
+            metrics = run_metrics.get_metrics()
             for i in range(times):
+                t0 = time.perf_counter()
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    metrics.record_call('function', func.__name__, time.perf_counter() - t0)
+                    return result
+                except cassette.CassetteMiss:
+                    # Replay has no recording for this call: retrying can't help
+                    metrics.record_call('function', func.__name__, time.perf_counter() - t0, failed=True)
+                    raise
+                except requests_patch.CircuitOpenError as e:
+                    # Source is known-dead: don't burn backoff sleeps on it
+                    metrics.record_call('function', func.__name__, time.perf_counter() - t0, failed=True)
+                    print(f"[Error] {func.__name__} skipped: {e}")
+                    return None
                 except Exception as e:
+                    metrics.record_call('function', func.__name__, time.perf_counter() - t0, failed=True)
                     if i < times - 1:
-                        sleep_time = delay * (2 ** i)
-                        print(f"[Warning] {func.__name__} failed (Attempt {i+1}/{times}). Retrying in {sleep_time}s... Error: {e}")
-                        time.sleep(sleep_time + random.random())
+                        sleep_time = delay * (2 ** i) + random.random()
+                        print(f"[Warning] {func.__name__} failed (Attempt {i+1}/{times}). Retrying in {delay * (2 ** i)}s... Error: {e}")
+                        metrics.record_retry(func.__name__, sleep_time)
+                        time.sleep(sleep_time)
                     else:
                         print(f"[Error] {func.__name__} failed after {times} retries.")
             return None
@@ -140,6 +162,9 @@ def get_industry_data_robustly():
                     except Exception:
                         pass
                     return df
+            except cassette.CassetteMiss as e:
+                print(f"   ⚠️ stock_yjbb_em({date_str}) not in cassette: {e}")
+                break
             except Exception as e:
                 sleep_time = BASE_DELAY * (2 ** attempt) + random.random() * 3
                 print(f"   ⚠️ stock_yjbb_em({date_str}) attempt {attempt+1}/{MAX_ATTEMPTS} failed: {e}")
@@ -215,22 +240,18 @@ def fetch_target_industry_pool(include_dynamic=True):
 
     print(f"🔍 Fetching component stocks for {len(all_industries)} industries (base {len(TARGET_INDUSTRIES)} + bonus {len(dynamic_industries)})...")
 
+    # v11.1: Concurrent, rate-limited, cached per board for the day
+    board_members = get_board_index().members(all_industries)
     for industry in all_industries:
-        try:
-            df = ak.stock_board_industry_cons_em(symbol=industry)
-            if df is not None and not df.empty:
-                df = df[['代码', '名称']].copy()
-                df.columns = ['Symbol', 'Name']
-                df['Symbol'] = df['Symbol'].astype(str).str.zfill(6)
-                df['Industry'] = industry
-                pool_dfs.append(df)
-                tag = "🌟" if industry in dynamic_industries else "✅"
-                print(f"   {tag} {industry}: {len(df)} stocks")
-            else:
-                print(f"   ⚠️ {industry}: No stocks found via EM")
-        except Exception as e:
-            print(f"   ❌ Error fetching {industry}: {e}")
-        time.sleep(1.0)
+        df = board_members.get(industry)
+        if df is not None and not df.empty:
+            df = df.copy()
+            df['Industry'] = industry
+            pool_dfs.append(df)
+            tag = "🌟" if industry in dynamic_industries else "✅"
+            print(f"   {tag} {industry}: {len(df)} stocks")
+        else:
+            print(f"   ⚠️ {industry}: No stocks found via EM")
 
     if not pool_dfs:
         return pd.DataFrame()
@@ -244,50 +265,68 @@ def fetch_target_industry_pool(include_dynamic=True):
 def fetch_industry_per_stock(symbols):
     """v10.1.2: Fetch industry for a list of stock codes using stock_individual_info_em.
     Returns a dict {code: industry}. Only used as ultimate fallback.
-    Optimized for small batches (~500 stocks)."""
-    CACHE_PATH = os.path.join(CACHE_DIR, "industry_map_cache.pkl")
-    CACHE_TTL_HOURS = 24
+    v11.1: Backed by the SQLite IndustryIndex (per-symbol TTL, concurrent misses)."""
+    try:
+        return get_industry_index().lookup(symbols)
+    except Exception as e:
+        print(f"  Industry index error: {e}")
+        return {}
 
-    # Load existing cache
-    industry_map = {}
-    if os.path.exists(CACHE_PATH):
-        try:
-            age_hours = (time.time() - os.path.getmtime(CACHE_PATH)) / 3600
-            if age_hours < CACHE_TTL_HOURS:
-                industry_map = pd.read_pickle(CACHE_PATH)
-        except Exception as e:
-            print(f"  Cache load warning: {e}")
 
-    # Fetch missing symbols
-    missing = [s for s in symbols if s not in industry_map]
-    if not missing:
-        return industry_map
+# --- Data Fetching ---
 
-    print(f"   📋 Fetching industry for {len(missing)} stocks (Sequential)...")
-    fetched = 0
-    for code in missing:
-        try:
-            info = ak.stock_individual_info_em(symbol=code)
-            row = dict(zip(info['item'], info['value']))
-            industry_map[code] = row.get('行业', 'Unknown')
-            fetched += 1
-            if fetched % 50 == 0:
-                print(f"   ... progress {fetched}/{len(missing)}")
-        except Exception:
-            industry_map[code] = 'Unknown'
-        time.sleep(0.05) 
-
-    # Save updated cache
-    try:
-        if not os.path.exists(CACHE_DIR): os.makedirs(CACHE_DIR)
-        pd.to_pickle(industry_map, CACHE_PATH)
-    except Exception as e:
-        print(f"  Cache save warning: {e}")
 
-    return industry_map
+# --- v11.1: Hedged spot snapshot (Tencent/Sina vs EastMoney) ---
+SPOT_ENRICH_TIMEOUT = 90  # seconds to wait for the EastMoney snapshot when Tencent won
 
 
-# --- Data Fetching ---
+def _fetch_tencent_spot():
+    spot_df = get_spot_snapshot("tencent", ak.stock_zh_a_spot)
+    if spot_df is None or spot_df.empty:
+        raise ValueError("empty Tencent/Sina snapshot")
+    # Strip market prefix from code (e.g. "sh600000" -> "600000")
+    spot_df['代码'] = spot_df['代码'].str.replace(r'^(sh|sz|bj)', '', regex=True)
+    # Fill missing columns
+    spot_df['量比'] = 1.0
+    spot_df['换手率'] = 0.0
+    spot_df['市盈率-动态'] = 0.0
+    spot_df['总市值'] = 0
+    return spot_df
+
+
+def _fetch_em_spot():
+    spot_df = get_spot_snapshot("eastmoney", ak.stock_zh_a_spot_em)
+    if spot_df is None or spot_df.empty:
+        raise ValueError("empty EastMoney snapshot")
+    return spot_df
+
+
+def fetch_spot_hedged():
+    """Start both full-market spot downloads at once and return the first complete one.
+
+    Returns (spot_df, source, em_future). spot_df is None if both sources failed;
+    em_future resolves to the EastMoney snapshot (or raises) either way.
+    """
+    print("📡 Fetching spot snapshot: Tencent/Sina + EastMoney (hedged)...")
+    executor = ThreadPoolExecutor(max_workers=2)
+    futures = {
+        executor.submit(_fetch_tencent_spot): "tencent",
+        executor.submit(_fetch_em_spot): "eastmoney",
+    }
+    # Don't block on the loser: it finishes in the background
+    executor.shutdown(wait=False)
+    em_future = next(f for f, src in futures.items() if src == "eastmoney")
+
+    for future in as_completed(futures):
+        src = futures[future]
+        try:
+            spot_df = future.result()
+        except Exception as e:
+            print(f"⚠️ {src} spot failed: {e}")
+            continue
+        print(f"✅ {src} spot snapshot first: {len(spot_df)} stocks")
+        return spot_df, src, em_future
+    return None, None, em_future
 
 
 def fetch_basic_pool():
@@ -302,36 +341,9 @@ def fetch_basic_pool():
     else:
         print("⚠️ No proxy detected in environment.")
 
-    spot_df = None
-    source = None
-    
-    # 1. Try Tencent/Sina FIRST (Primary) — works during market hours
-    try:
-        print("📡 Trying Tencent/Sina source (Primary)...")
-        spot_df = ak.stock_zh_a_spot()
-        if spot_df is not None and not spot_df.empty:
-            source = "tencent"
-            # Strip market prefix from code (e.g. "sh600000" -> "600000")
-            spot_df['代码'] = spot_df['代码'].str.replace(r'^(sh|sz|bj)', '', regex=True)
-            # Fill missing columns
-            spot_df['量比'] = 1.0
-            spot_df['换手率'] = 0.0
-            spot_df['市盈率-动态'] = 0.0
-            spot_df['总市值'] = 0
-            print(f"✅ Tencent source success: {len(spot_df)} stocks")
-    except Exception as e:
-        print(f"⚠️ Tencent failed: {e}")
-    
-    # 2. Fallback to EastMoney — works during market hours
-    if spot_df is None or spot_df.empty:
-        try:
-            print("🔄 Trying EastMoney fallback...")
-            spot_df = ak.stock_zh_a_spot_em()
-            if spot_df is not None and not spot_df.empty:
-                source = "eastmoney"
-                print(f"✅ EastMoney fallback success: {len(spot_df)} stocks")
-        except Exception as e2:
-            print(f"❌ EastMoney also failed: {e2}")
+    # 1+2. Tencent/Sina and EastMoney raced; first complete snapshot wins.
+    #      The EastMoney download keeps running for Market_Cap enrichment.
+    spot_df, source, em_future = fetch_spot_hedged()
     
     # 3. Ultimate Fallback: Build pool from Industry data + Sina Daily bars
     #    Uses stock_zh_a_daily (Sina source), ALWAYS works even pre-market
@@ -352,57 +364,49 @@ def fetch_basic_pool():
             target_stocks = target_stocks.rename(columns={'Symbol': '股票代码', 'Name': '股票简称', 'Industry': '所处行业'})
             
             # Shuffle to avoid always hitting same stocks on retry
-            target_stocks = target_stocks.sample(frac=1).reset_index(drop=True)
+            target_stocks = target_stocks.sample(frac=1, random_state=cassette.shuffle_seed()).reset_index(drop=True)
             
             print(f"📊 Building pool from {len(target_stocks)} industry-matched stocks via Sina...")
             
             end_date = datetime.datetime.now().strftime("%Y%m%d")
             start_date = (datetime.datetime.now() - datetime.timedelta(days=10)).strftime("%Y%m%d")
             
-            rows = []
-            attempts = 0
-            max_attempts = min(len(target_stocks), 500)  # Scan up to 500 stocks
+            # v11.1: Scan up to 500 stocks on the fetch pool; symbols already in the
+            # local bar store go first so most rows come from disk.
+            codes = [str(c).zfill(6) for c in target_stocks['股票代码']]
+            names = dict(zip(codes, target_stocks['股票简称']))
+            stored = get_bar_store().stored_symbols("qfq")
+            codes = sorted(codes, key=lambda c: c not in stored)[:500]
+            
+            def _fallback_row(code):
+                hist = get_bar_store().get_bars(code, start_date, end_date, adjust="qfq")
+                if hist is None or len(hist) < 2:
+                    return None
+                latest = hist.iloc[-1]
+                prev = hist.iloc[-2]
+                chg = ((float(latest['close']) - float(prev['close'])) / float(prev['close'])) * 100
+                return {
+                    '代码': code,
+                    '名称': names.get(code, code),
+                    '最新价': float(latest['close']),
+                    '涨跌幅': round(chg, 3),
+                    '量比': 1.0,
+                    '换手率': 0.0,
+                    '市盈率-动态': 0.0,
+                    '总市值': 0
+                }
             
-            for _, row in target_stocks.iterrows():
+            rows = []
+            # BarStore throttles its own Sina downloads, so no extra limiter here
+            for _, row, _err in fetch_concurrently(codes, _fallback_row, source=None,
+                                                    max_workers=CONFIG.fetch_workers):
+                if row is None:
+                    continue
+                rows.append(row)
+                if len(rows) % 50 == 0:
+                    print(f"   ... fetched {len(rows)} stocks so far")
                 if len(rows) >= 200:
                     break
-                if attempts >= max_attempts:
-                    break
-                attempts += 1
-                
-                code = str(row['股票代码']).zfill(6)
-                # Sina needs sh/sz prefix
-                if code.startswith('6'):
-                    prefix = 'sh'
-                elif code.startswith('0') or code.startswith('3'):
-                    prefix = 'sz'
-                elif code.startswith('8') or code.startswith('4') or code.startswith('9'):
-                    prefix = 'bj'
-                else:
-                    continue
-                
-                try:
-                    hist = ak.stock_zh_a_daily(symbol=f"{prefix}{code}",
-                                               start_date=start_date, end_date=end_date, adjust="qfq")
-                    if hist is not None and not hist.empty and len(hist) >= 2:
-                        latest = hist.iloc[-1]
-                        prev = hist.iloc[-2]
-                        chg = ((float(latest['close']) - float(prev['close'])) / float(prev['close'])) * 100
-                        rows.append({
-                            '代码': code,
-                            '名称': row.get('股票简称', code),
-                            '最新价': float(latest['close']),
-                            '涨跌幅': round(chg, 3),
-                            '量比': 1.0,
-                            '换手率': 0.0,
-                            '市盈率-动态': 0.0,
-                            '总市值': 0
-                        })
-                        if len(rows) % 50 == 0:
-                            print(f"   ... fetched {len(rows)} stocks so far")
-                except:
-                    pass
-                time.sleep(0.05)
             
             if rows:
                 spot_df = pd.DataFrame(rows)
@@ -479,9 +483,8 @@ def fetch_basic_pool():
             
             print(f"   📋 Filtered to {len(filtered_cands)} candidates for scan...")
             cand_symbols = filtered_cands['Symbol'].tolist()
-            # Shuffle to handle partial timeouts better in retries
-            import random
-            random.shuffle(cand_symbols)
+            # Shuffle to handle partial timeouts better in retries (seeded under a cassette)
+            random.Random(cassette.shuffle_seed()).shuffle(cand_symbols)
             
             # Fetch industry for only these candidates
             scanned_map = fetch_industry_per_stock(cand_symbols)
@@ -516,11 +519,11 @@ def fetch_basic_pool():
             print("⚠️ Growth data unavailable, skipping PEG filter")
             merged['Growth_Rate'] = 0
         
-        # For non-EastMoney sources: try to enrich Market Cap
+        # For non-EastMoney sources: enrich Market Cap from the hedged EastMoney snapshot
         if source in ("tencent", "hist_fallback"):
             print(f"📊 Fetching Market Cap data...")
             try:
-                em_spot = ak.stock_zh_a_spot_em()
+                em_spot = em_future.result(timeout=SPOT_ENRICH_TIMEOUT)
                 if em_spot is not None and not em_spot.empty:
                     cap_map = dict(zip(em_spot['代码'].astype(str), em_spot['总市值']))
                     merged['Market_Cap'] = merged['Symbol'].map(cap_map)
@@ -620,16 +623,10 @@ def fetch_index_data(symbol="sh000300", days=60):
 def fetch_stock_history_cn(symbol, days=60):
     end_date = datetime.datetime.now().strftime("%Y%m%d")
     start_date = (datetime.datetime.now() - datetime.timedelta(days=days*2)).strftime("%Y%m%d")
-    
-    if symbol.startswith('6'): prefix = 'sh'
-    elif symbol.startswith('0') or symbol.startswith('3'): prefix = 'sz'
-    elif symbol.startswith('8') or symbol.startswith('4'): prefix = 'bj'
-    else: prefix = ''
-    
-    full_symbol = f"{prefix}{symbol}"
-    
+
     try:
-        df = ak.stock_zh_a_daily(symbol=full_symbol, start_date=start_date, end_date=end_date)
+        # Served from the local bar store; only missing bars hit Sina
+        df = get_bar_store().get_bars(symbol, start_date, end_date, adjust="")
         if df is None or df.empty: return None
         
         # Robust column handling (English/Chinese/Index)
@@ -684,48 +681,28 @@ def fetch_stock_history_hk(symbol, days=60):
 
 def calculate_antigravity_score(stock_hist, index_hist):
     """v3.5: Enhanced scoring with consecutive resilience bonus"""
-    merged = pd.merge(stock_hist, index_hist, on='date', how='inner')
-    if merged.empty: return 0.0, []
-    
-    recent_days = merged.tail(10)
-    down_days = recent_days[recent_days['Index_Change'] < -0.3]  # v3.5: Relaxed from -0.5
-    
-    score = 0.0
-    details = []
-    consecutive_resilience = 0
-    
-    for _, row in down_days.iterrows():
-        idx_chg = row['Index_Change']
-        stk_chg = row['change_pct']
-        
-        if stk_chg > 0:
-            score += 2.0
-            consecutive_resilience += 1
-            details.append(f"{row['date']}:逆势(Idx{idx_chg:.2f}%)")
-        elif stk_chg > (idx_chg + 1.5):  # v3.5: Relaxed from +2.0
-            score += 1.0
-            consecutive_resilience += 1
-            details.append(f"{row['date']}:抗跌(Idx{idx_chg:.2f}%)")
-        else:
-            consecutive_resilience = 0  # Reset if not resilient
-    
-    # v3.5: Consecutive Resilience Bonus
-    if consecutive_resilience >= 2:
-        score += 1.0
-        details.append("连续抗跌")
-            
+    aligned = as_aligned(stock_hist, index_hist)
+    if not len(aligned): return 0.0, []
+
+    # v11.1: scoring_engine kernel over the last 10 shared trading days
+    score, hits = scoring_engine.calc_antigravity_from_changes(aligned.change, aligned.idx_change)
+    details = [f"{aligned.date(i)}:{'逆势' if defiant else '抗跌'}(Idx{aligned.idx_change[i]:.2f}%)"
+               for i, defiant in hits]
+    if score > sum(2.0 if defiant else 1.0 for _, defiant in hits):
+        details.append("连续抗跌")  # consecutive resilience bonus
     return score, details
 
 def calculate_beta(stock_hist, index_hist, days=5):
     # Calculate Beta of Stock vs Index over last N days
-    merged = pd.merge(stock_hist, index_hist, on='date', how='inner')
-    if len(merged) < days: return 1.0 # Default to high correlation if no data
-    
-    recent = merged.tail(days)
-    if recent.empty: return 1.0
-    
-    # Simple correlation proxy for Beta efficiency
-    correlation = recent['change_pct'].corr(recent['Index_Change'])
+    aligned = as_aligned(stock_hist, index_hist)
+    if len(aligned) < days or days <= 0: return 1.0 # Default to high correlation if no data
+
+    # Simple correlation proxy for Beta efficiency (pairwise-complete, as Series.corr)
+    stk, idx = aligned.change[-days:], aligned.idx_change[-days:]
+    valid = ~(np.isnan(stk) | np.isnan(idx))
+    if not valid.any(): return 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = np.corrcoef(stk[valid], idx[valid])[0, 1]
     return correlation if not pd.isna(correlation) else 1.0
 
 def analyze_structure_v2(stock_hist):
@@ -768,29 +745,12 @@ def calc_micro_momentum(stock_hist, index_hist):
     Replaces older 20-day / 10-day Alpha tracking.
     15 points for 3-day Alpha. 10 points for 5-day Alpha.
     """
-    merged = pd.merge(stock_hist, index_hist, on='date', how='inner', suffixes=('', '_idx'))
-    if len(merged) < 6:
-        return 0.0, False
-
-    closes = merged['close']
-    idx_closes = merged['close_idx']
-
-    stock_3d = (closes.iloc[-1] / closes.iloc[-4] - 1) * 100 if len(closes) > 3 else 0
-    stock_5d = (closes.iloc[-1] / closes.iloc[-6] - 1) * 100 if len(closes) > 5 else 0
+    aligned = as_aligned(stock_hist, index_hist)
+    return scoring_engine.calc_micro_momentum(aligned.close, aligned.idx_close)
 
-    idx_3d = (idx_closes.iloc[-1] / idx_closes.iloc[-4] - 1) * 100 if len(idx_closes) > 3 else 0
-    idx_5d = (idx_closes.iloc[-1] / idx_closes.iloc[-6] - 1) * 100 if len(idx_closes) > 5 else 0
+def _hist_arrays(stock_hist, *columns):
+    return [stock_hist[col].to_numpy(dtype=float) for col in columns]
 
-    alpha_3d = stock_3d - idx_3d
-    alpha_5d = stock_5d - idx_5d
-
-    # Scoring: Up to 15 pts if 3-day alpha > 7.5%, Up to 10 pts if 5-day alpha > 6.6%
-    score_3d = min(max(alpha_3d * 2.0, 0), 15.0)
-    score_5d = min(max(alpha_5d * 1.5, 0), 10.0)
-
-    score = score_3d + score_5d
-    is_accelerating = alpha_3d > alpha_5d > 0
-    return round(score, 1), is_accelerating
 
 def calc_institutional_burst(stock_hist, is_hot_sector):
     """v10.0: Institutional Burst (0-40).
@@ -798,65 +758,15 @@ def calc_institutional_burst(stock_hist, is_hot_sector):
     """
     if len(stock_hist) < 11:
         return 0.0, 1.0, False
-
-    today = stock_hist.iloc[-1]
-    ma5_vol = stock_hist['volume'].iloc[-6:-1].mean()
-    today_vol = today['volume']
-    
-    vol_ratio = today_vol / ma5_vol if ma5_vol > 0 else 1.0
-    
-    score = 0.0
-    
-    # 1. Price Momentum: Close near high (0-15)
-    high_low_range = today['high'] - today['low']
-    if high_low_range > 0:
-        close_position = (today['close'] - today['low']) / high_low_range
-    else:
-        close_position = 1.0
-        
-    if close_position > 0.85 and vol_ratio >= 2.0:
-        score += 15.0  # Exploding volume closing near high
-    elif close_position > 0.70 and vol_ratio >= 1.5:
-        score += 8.0
-        
-    # 2. Pocket Pivot (0-15)
-    # Today's volume > max down volume of last 10 days
-    recent_10 = stock_hist.iloc[-11:-1]
-    down_vols = recent_10[recent_10['change_pct'] < 0]['volume']
-    max_down_vol = down_vols.max() if not down_vols.empty else 0
-    
-    if today_vol > max_down_vol and today['change_pct'] > 0:
-        score += 15.0
-    elif today_vol > ma5_vol * 1.5 and today['change_pct'] > 0:
-        score += 5.0
-        
-    # 3. Sector Synergy & Active Turnover (0-10)
-    if is_hot_sector:
-        score += 10.0
-
-    return min(score, 40.0), round(vol_ratio, 2), close_position > 0.85
+    volume, high, low, close, change_pct = _hist_arrays(stock_hist, 'volume', 'high', 'low', 'close', 'change_pct')
+    return scoring_engine.calc_institutional_burst(volume, high, low, close, change_pct, is_hot_sector)
 
 def calc_vcp_breakout(stock_hist):
     """v10.0: VCP & Squeeze Breakout (0-15).
     Yesterday volume extremely low, today exploding upwards.
     """
     if len(stock_hist) < 6: return 0.0, False
-    
-    ma5_vol_prev = stock_hist['volume'].iloc[-7:-2].mean()
-    yesterday_vol = stock_hist.iloc[-2]['volume']
-    today_vol = stock_hist.iloc[-1]['volume']
-    
-    score = 0.0
-    is_vcp = False
-    
-    if yesterday_vol < ma5_vol_prev * 0.6:  # Extreme volume contraction yesterday
-        if today_vol > yesterday_vol * 2.0 and stock_hist.iloc[-1]['change_pct'] > 2.0:
-            score += 15.0  # Perfect slingshot
-            is_vcp = True
-        elif today_vol > yesterday_vol * 1.5 and stock_hist.iloc[-1]['change_pct'] > 0:
-            score += 8.0
-            
-    return score, is_vcp
+    return scoring_engine.calc_vcp_breakout(*_hist_arrays(stock_hist, 'volume', 'change_pct'))
 
 
 def calc_limit_up_gene(stock_hist, lookback=20):
@@ -869,76 +779,73 @@ def calc_limit_up_gene(stock_hist, lookback=20):
     """
     if stock_hist is None or len(stock_hist) < lookback:
         return 0.0, False
+    change_pct, close, high = _hist_arrays(stock_hist, 'change_pct', 'close', 'high')
+    return scoring_engine.calc_limit_up_gene(change_pct, close, high, lookback)
 
-    recent = stock_hist.tail(lookback)
-    score = 0.0
-    had_limit_up = False
-
-    # Detect limit-up days (change_pct >= 9.5% for main board, >= 19.5% for STAR/ChiNext)
-    limit_up_days = recent[recent['change_pct'] >= 9.5]
-
-    if len(limit_up_days) == 0:
-        return 0.0, False
-
-    had_limit_up = True
-    score += 5.0  # Base: had a limit-up in the lookback period
-
-    # Check most recent limit-up quality
-    last_lu = limit_up_days.iloc[-1]
 
-    # Proxy for early seal: close == high (strong buying pressure, sealed at limit)
-    if last_lu['close'] >= last_lu['high'] * 0.999:
-        score += 3.0  # Tight seal — likely early limit-up
-
-    # Day-after premium: find the bar right after the limit-up
-    lu_idx = stock_hist.index.get_loc(last_lu.name)
-    if lu_idx + 1 < len(stock_hist):
-        next_day = stock_hist.iloc[lu_idx + 1]
-        premium = next_day['change_pct']
-        # Positive premium after limit-up = strong continuation gene
-        if premium > 3.0:
-            score += 7.0
-        elif premium > 0:
-            score += 4.0
-
-    return round(min(score, 15.0), 1), had_limit_up
-
-
-def calc_sector_momentum(pool_df, industry_col='Industry'):
+def calc_sector_momentum(pool_df, industry_col='Industry', board_map=None, market='CN'):
     """v6.0: Sector momentum with per-stock ranking within sector.
-    Returns hot_sectors list AND a dict mapping industry -> stock rankings.
+    Returns hot_sectors list, sector stats AND each hot-sector stock's
+    percentile rank within its sector (Series indexed by zero-padded symbol).
+    v11.1: Missing/Unknown CN industries are filled from the cached A-share board
+    index (HK pools keep their own labels, e.g. the single '-' group).
     """
     try:
-        sector_stats = pool_df.groupby(industry_col).agg(
-            avg_change=('Change_Pct', lambda x: pd.to_numeric(x, errors='coerce').mean()),
+        known = pool_df[industry_col].notna() & ~pool_df[industry_col].isin(['Unknown', '-', ''])
+        if market == 'CN' and not known.all():
+            if board_map is None:
+                board_map = get_board_index().board_map()
+            symbols = pool_df['Symbol'].astype(str).str.zfill(6)
+            pool_df = pool_df.copy()
+            pool_df[industry_col] = pool_df[industry_col].where(known, symbols.map(board_map))
+
+        change = pd.to_numeric(pool_df['Change_Pct'], errors='coerce')
+        sector_stats = pd.DataFrame({industry_col: pool_df[industry_col], 'Change_Pct': change,
+                                     'Symbol': pool_df['Symbol']}).groupby(industry_col).agg(
+            # Series.mean per group: pandas' grouped 'mean' sums differently in the last bits,
+            # which reorders sectors whose 2-decimal averages tie exactly
+            avg_change=('Change_Pct', pd.Series.mean),
             count=('Symbol', 'count')
         ).reset_index()
 
         sector_stats = sector_stats[sector_stats['count'] >= 3]
         if sector_stats.empty:
-            return [], sector_stats, {}
+            return [], sector_stats, pd.Series(dtype=float)
 
         sector_stats['momentum_rank'] = sector_stats['avg_change'].rank(pct=True)
         hot_sectors = sector_stats[sector_stats['momentum_rank'] > 0.4][industry_col].tolist()
 
-        # v6.0: Build per-sector stock ranking
-        sector_rankings = {}
-        for industry in hot_sectors:
-            sector_stocks = pool_df[pool_df[industry_col] == industry].copy()
-            sector_stocks['Change_Pct_num'] = pd.to_numeric(sector_stocks['Change_Pct'], errors='coerce')
-            sector_stocks['rank_in_sector'] = sector_stocks['Change_Pct_num'].rank(pct=True)
-            for _, srow in sector_stocks.iterrows():
-                sector_rankings[str(srow['Symbol']).zfill(6)] = srow['rank_in_sector']
+        # v6.0: Per-stock ranking within each hot sector
+        # v11.1: One groupby rank over the pool -> Series indexed by zero-padded symbol
+        in_hot = pool_df[industry_col].isin(hot_sectors).to_numpy()
+        industries = pool_df.loc[in_hot, industry_col]
+        ranks = change[in_hot].groupby(industries).rank(pct=True)
+        sector_rankings = pd.Series(ranks.to_numpy(), name='rank_in_sector',
+                                    index=pool_df.loc[in_hot, 'Symbol'].astype(str).str.zfill(6).to_numpy())
+        # A symbol listed twice keeps its rank from the later hot sector, then the later row
+        order = np.argsort(pd.Index(hot_sectors).get_indexer(industries), kind='stable')
+        sector_rankings = sector_rankings.iloc[order]
+        sector_rankings = sector_rankings[~sector_rankings.index.duplicated(keep='last')]
 
         return hot_sectors, sector_stats, sector_rankings
     except Exception as e:
         print(f"⚠️ Sector momentum calc error: {e}")
-        return [], pd.DataFrame(), {}
+        return [], pd.DataFrame(), pd.Series(dtype=float)
 
 def calc_sector_leader_score(symbol, is_hot_sector, sector_rankings):
     """v6.0: Sector leader scoring (0-10).
     Rewards stocks that lead their hot sector.
+    v11.1: `symbol` / `is_hot_sector` may be columns; returns one score per row.
     """
+    if np.ndim(symbol) > 0:
+        symbols = pd.Index(symbol).astype(str)
+        known = symbols.isin(sector_rankings.index)
+        rank_pct = np.where(known, sector_rankings.reindex(symbols).to_numpy(dtype=float), 0.5)
+        with np.errstate(invalid='ignore'):
+            return np.select(
+                [~np.asarray(is_hot_sector, dtype=bool), rank_pct >= 0.9, rank_pct >= 0.7, rank_pct >= 0.5],
+                [0.0, 10.0, 7.0, 4.0], default=2.0)
+
     if not is_hot_sector:
         return 0.0
 
@@ -974,7 +881,99 @@ def detect_market_regime(index_hist):
         return 'neutral', round(change_5d, 2)
 
 
-def fetch_market_sentiment():
+# --- v11.1: Sentiment factors run in parallel under one deadline ---
+SENTIMENT_DEADLINE = 12  # seconds for all factors together; late ones score neutral
+SENTIMENT_CACHE_TEMPLATE = os.path.join(CACHE_DIR, "sentiment_{}.json")
+
+
+def _sentiment_northbound():
+    """Factor 1: Northbound capital flow (沪深港通)."""
+    details, score = {}, 0
+    hsgt_df = ak.stock_hsgt_hist_em(symbol="沪深港通")
+    if hsgt_df is not None and len(hsgt_df) >= 1:
+        # Get latest day net inflow (in 亿元)
+        latest = hsgt_df.iloc[-1]
+        # Column name varies; try common patterns
+        flow_col = None
+        for col in hsgt_df.columns:
+            if '净' in str(col) and '流' in str(col):
+                flow_col = col
+                break
+        if flow_col is None:
+            flow_col = hsgt_df.columns[1]  # fallback to second column
+
+        net_flow = float(latest[flow_col])
+        details['northbound_flow'] = round(net_flow, 2)
+        if net_flow > 50:
+            score += 1
+        elif net_flow > 100:
+            score += 2
+        elif net_flow < -50:
+            score -= 1
+        elif net_flow < -100:
+            score -= 2
+    return details, score
+
+
+def _sentiment_limit_up():
+    """Factor 2a: Limit-up count (涨停数)."""
+    zt_df = ak.stock_zt_pool_em(date=datetime.datetime.now().strftime('%Y%m%d'))
+    limit_up_count = len(zt_df) if zt_df is not None else 0
+    score = 0
+    if limit_up_count >= 80:
+        score += 1  # Hot market
+    elif limit_up_count <= 20:
+        score -= 1  # Cold market
+    return {'limit_up_count': limit_up_count}, score
+
+
+def _sentiment_limit_down():
+    """Factor 2b: Broken/limit-down board count (跌停数)."""
+    dt_df = ak.stock_zt_pool_zbgc_em(date=datetime.datetime.now().strftime('%Y%m%d'))
+    limit_down_count = len(dt_df) if dt_df is not None else 0
+    score = -1 if limit_down_count >= 30 else 0  # Panic
+    return {'limit_down_count': limit_down_count}, score
+
+
+def _sentiment_main_flow():
+    """Factor 3: Market-wide fund flow."""
+    details, score = {}, 0
+    flow_df = ak.stock_main_fund_flow()
+    if flow_df is not None and len(flow_df) >= 1:
+        # Main force net inflow for the market
+        latest = flow_df.iloc[0]
+        for col in flow_df.columns:
+            if '净' in str(col) and '额' in str(col):
+                main_flow = float(latest[col])
+                details['main_fund_flow'] = round(main_flow / 1e8, 2)  # Convert to 亿
+                if main_flow > 0:
+                    score += 1
+                break
+    return details, score
+
+
+# name -> (reader, detail keys, reuse today's cached reading without refetching)
+# Northbound history only moves once a day; the intraday pools and flows are
+# refetched and fall back to the cached reading only if the live call misses.
+SENTIMENT_FACTORS = {
+    'northbound': (_sentiment_northbound, ('northbound_flow',), True),
+    'limit_up': (_sentiment_limit_up, ('limit_up_count',), False),
+    'limit_down': (_sentiment_limit_down, ('limit_down_count',), False),
+    'main_flow': (_sentiment_main_flow, ('main_fund_flow',), False),
+}
+
+
+def _load_sentiment_cache(path):
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.warning(f"Sentiment cache unreadable: {e}")
+    return {}
+
+
+def fetch_market_sentiment(deadline=SENTIMENT_DEADLINE):
     """v11.0: Fetch macro sentiment factors as a global confidence multiplier.
 
     Returns: (multiplier, sentiment_details)
@@ -984,71 +983,51 @@ def fetch_market_sentiment():
     details = {}
     sentiment_score = 0  # -3 (extreme fear) to +3 (extreme greed)
 
-    # Factor 1: Northbound capital flow (沪深港通)
-    try:
-        hsgt_df = ak.stock_hsgt_hist_em(symbol="沪深港通")
-        if hsgt_df is not None and len(hsgt_df) >= 1:
-            # Get latest day net inflow (in 亿元)
-            latest = hsgt_df.iloc[-1]
-            # Column name varies; try common patterns
-            flow_col = None
-            for col in hsgt_df.columns:
-                if '净' in str(col) and '流' in str(col):
-                    flow_col = col
-                    break
-            if flow_col is None:
-                flow_col = hsgt_df.columns[1]  # fallback to second column
-
-            net_flow = float(latest[flow_col])
-            details['northbound_flow'] = round(net_flow, 2)
-            if net_flow > 50:
-                sentiment_score += 1
-            elif net_flow > 100:
-                sentiment_score += 2
-            elif net_flow < -50:
-                sentiment_score -= 1
-            elif net_flow < -100:
-                sentiment_score -= 2
-    except Exception as e:
-        print(f"  ⚠️ 北向资金获取失败: {e}")
-        details['northbound_flow'] = None
+    cache_path = SENTIMENT_CACHE_TEMPLATE.format(prev_trading_day(n=0).strftime('%Y%m%d'))
+    cache = _load_sentiment_cache(cache_path)
 
-    # Factor 2: Limit-up / limit-down count (涨停/跌停数)
-    try:
-        zt_df = ak.stock_zt_pool_em(date=datetime.datetime.now().strftime('%Y%m%d'))
-        limit_up_count = len(zt_df) if zt_df is not None else 0
-        details['limit_up_count'] = limit_up_count
-        if limit_up_count >= 80:
-            sentiment_score += 1  # Hot market
-        elif limit_up_count <= 20:
-            sentiment_score -= 1  # Cold market
-    except Exception:
-        details['limit_up_count'] = None
+    readings = {}
+    to_fetch = {}
+    for name, (reader, _keys, reuse) in SENTIMENT_FACTORS.items():
+        if reuse and name in cache:
+            readings[name] = cache[name]
+        else:
+            to_fetch[name] = reader
+
+    if to_fetch:
+        executor = ThreadPoolExecutor(max_workers=len(to_fetch))
+        futures = {executor.submit(reader): name for name, reader in to_fetch.items()}
+        executor.shutdown(wait=False)  # stragglers finish in the background
+        done, not_done = wait(futures, timeout=deadline)
+        for future in done:
+            name = futures[future]
+            try:
+                part, score = future.result()
+                readings[name] = cache[name] = {'details': part, 'score': score}
+            except Exception as e:
+                print(f"  ⚠️ 情绪因子 {name} 获取失败: {e}")
+        for future in not_done:
+            print(f"  ⏱️ 情绪因子 {futures[future]} 超时 ({deadline}s)")
+
+    for name, (_reader, keys, _reuse) in SENTIMENT_FACTORS.items():
+        reading = readings.get(name)
+        if reading is None and name in cache:
+            # Live call missed: use this trading day's last good reading
+            reading = cache[name]
+            print(f"  ♻️ 情绪因子 {name} 使用当日缓存")
+        if reading is None:
+            # Neutral: contributes nothing to the score
+            for key in keys:
+                details[key] = None
+            continue
+        details.update(reading['details'])
+        sentiment_score += reading['score']
 
     try:
-        dt_df = ak.stock_zt_pool_zbgc_em(date=datetime.datetime.now().strftime('%Y%m%d'))
-        limit_down_count = len(dt_df) if dt_df is not None else 0
-        details['limit_down_count'] = limit_down_count
-        if limit_down_count >= 30:
-            sentiment_score -= 1  # Panic
-    except Exception:
-        details['limit_down_count'] = None
-
-    # Factor 3: Market-wide fund flow
-    try:
-        flow_df = ak.stock_main_fund_flow()
-        if flow_df is not None and len(flow_df) >= 1:
-            # Main force net inflow for the market
-            latest = flow_df.iloc[0]
-            for col in flow_df.columns:
-                if '净' in str(col) and '额' in str(col):
-                    main_flow = float(latest[col])
-                    details['main_fund_flow'] = round(main_flow / 1e8, 2)  # Convert to 亿
-                    if main_flow > 0:
-                        sentiment_score += 1
-                    break
-    except Exception:
-        details['main_fund_flow'] = None
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except Exception as e:
+        logger.warning(f"Sentiment cache save failed: {e}")
 
     # Convert sentiment_score to multiplier
     # -3 → 0.7, 0 → 1.0, +3 → 1.3
@@ -1059,51 +1038,6 @@ def fetch_market_sentiment():
     return round(multiplier, 2), details
 
 
-# Default weight allocation
-DEFAULT_WEIGHTS = {
-    'inst_burst': 40,
-    'micro_mom': 25,
-    'antigravity': 20,
-    'vcp': 15,
-}
-
-# Market-regime-adaptive weight adjustments
-REGIME_WEIGHT_ADJUSTMENTS = {
-    'bull':    {'inst_burst': 0, 'micro_mom': +10, 'antigravity': -10, 'vcp': 0},
-    'bear':    {'inst_burst': -10, 'micro_mom': 0, 'antigravity': +10, 'vcp': 0},
-    'neutral': {'inst_burst': 0, 'micro_mom': 0, 'antigravity': 0, 'vcp': 0},
-}
-
-
-def get_regime_weights(regime='neutral'):
-    """v11.0: Return adjusted weight caps based on market regime."""
-    adj = REGIME_WEIGHT_ADJUSTMENTS.get(regime, REGIME_WEIGHT_ADJUSTMENTS['neutral'])
-    return {k: DEFAULT_WEIGHTS[k] + adj[k] for k in DEFAULT_WEIGHTS}
-
-
-def calc_composite_score(ag_score, micro_mom_score, inst_score, vcp_score, regime='neutral'):
-    """v11.0: Ultra-Short-Term Extreme Burst (0-100) with market-adaptive weights.
-
-    Default weight allocation:
-    1. Institutional Burst (Volume/Price/Sector) — 40pts
-    2. Micro-Momentum (3D/5D Alpha)              — 25pts
-    3. Antigravity (Resilience)                  — 20pts
-    4. VCP / Squeeze Breakout                    — 15pts
-
-    Bull regime: Momentum +10, AG -10
-    Bear regime: AG +10, Burst -10
-    """
-    w = get_regime_weights(regime)
-
-    score = 0.0
-    score += min(inst_score, w['inst_burst'])                           # capped by regime weight
-    score += min(micro_mom_score, w['micro_mom'])                       # capped by regime weight
-    score += min(ag_score * 2.0, float(w['antigravity']))               # ag_score natively 0-10
-    score += min(vcp_score, w['vcp'])                                   # capped by regime weight
-
-    return round(min(score, 100.0), 1)
-
-
 def fetch_hk_index_data(symbol="HSI", days=60):
     print(f"Fetching HK Index Data ({symbol})...")
     try:
@@ -1147,27 +1081,51 @@ def _filter_fundamentals(row, market, cfg=CONFIG):
 
     return True, change_pct
 
-def _filter_technicals(hist, change_pct, realtime_change_pct, turnover_rate=None, cfg=CONFIG):
-    """Apply v10.0 technical filters. Returns (pass, rsi, stock_3d, vcp_signal)."""
+def _filter_spot(realtime_change_pct, turnover_rate, cfg=CONFIG, stats=None):
+    """v11.1: Spot-only gates (no history needed), run before the history fetch. Returns pass."""
+    stats = stats if stats is not None else FilterStats()
+
+    # Limit-up filter
+    t = time.perf_counter()
+    if stats.check('limit_up', realtime_change_pct > cfg.limit_up_threshold, t):
+        return False
+
+    # v10.0 Active Turnover Gate (missing turnover falls back to volume in _filter_technicals)
+    t = time.perf_counter()
+    out_of_band = turnover_rate > 0 and (turnover_rate < 5.0 or turnover_rate > 35.0)
+    return not stats.check('turnover', out_of_band, t)
+
+
+def _filter_technicals(hist, change_pct, realtime_change_pct, turnover_rate=None, cfg=CONFIG, stats=None,
+                       spot_checked=False):
+    """Apply v10.0 technical filters. Returns (pass, rsi, stock_3d, vcp_signal).
+
+    v11.1: History stages run in ascending cost order (RSI last) and are recorded
+    in `stats`; rsi is 0 for candidates rejected before the RSI stage. The spot
+    gates run first (also recorded) unless the caller already applied them
+    before the fetch (spot_checked=True).
+    """
+    stats = stats if stats is not None else FilterStats()
+    if not spot_checked and not _filter_spot(realtime_change_pct,
+                                             turnover_rate if turnover_rate is not None else 0, cfg, stats):
+        return False, 0, 0, False
     current_price = hist.iloc[-1]['close']
 
     # Anti-FOMO: 5-day cumulative gain
+    t = time.perf_counter()
+    gain_5d = np.nan
     if len(hist) > 5:
         close_5d_ago = hist.iloc[-6]['close']
         gain_5d = (current_price - close_5d_ago) / close_5d_ago * 100
-        if gain_5d > cfg.max_gain_5d: return False, 0, 0, False
+    if stats.check('gain_5d', gain_5d > cfg.max_gain_5d, t): return False, 0, 0, False
 
-    # RSI filter
-    delta = hist['close'].diff()
-    u = delta.where(delta > 0, 0)
-    d = -delta.where(delta < 0, 0)
-    rs = u.rolling(14).mean() / d.rolling(14).mean()
-    rsi = 100 - (100 / (1 + rs)).iloc[-1]
-    if not pd.isna(rsi) and rsi > cfg.max_rsi: return False, rsi, 0, False
-
-    # Limit-up filter
-    if realtime_change_pct > cfg.limit_up_threshold:
-        return False, rsi, 0, False
+    # Liquidity fallback: absolute volume when turnover is missing
+    t = time.perf_counter()
+    low_volume = False
+    if not (turnover_rate is not None and turnover_rate > 0):
+        avg_volume_20 = hist['volume'].tail(20).mean()
+        low_volume = pd.notna(avg_volume_20) and avg_volume_20 < cfg.min_avg_volume
+    if stats.check('liquidity', low_volume, t): return False, 0, 0, False
 
     # 3-day stock change
     stock_3d = 0.0
@@ -1175,19 +1133,21 @@ def _filter_technicals(hist, change_pct, realtime_change_pct, turnover_rate=None
         stock_3d = (current_price - hist.iloc[-4]['close']) / hist.iloc[-4]['close'] * 100
 
     # MA trend filter
+    t = time.perf_counter()
+    below_ma = False
     if len(hist) >= cfg.ma_period:
         ma = hist['close'].rolling(cfg.ma_period).mean().iloc[-1]
-        if current_price < ma: return False, rsi, stock_3d, False
+        below_ma = current_price < ma
+    if stats.check('ma_trend', below_ma, t): return False, 0, stock_3d, False
 
-    # v10.0 Liquidity & Active Turnover Gate (replaces simple volume checks)
-    if turnover_rate is not None and turnover_rate > 0:
-        if turnover_rate < 5.0 or turnover_rate > 35.0:
-            return False, rsi, stock_3d, False
-    else:
-        # Fallback to absolute volume if turnover is missing
-        avg_volume_20 = hist['volume'].tail(20).mean()
-        if pd.notna(avg_volume_20) and avg_volume_20 < cfg.min_avg_volume:
-            return False, rsi, stock_3d, False
+    # RSI filter
+    t = time.perf_counter()
+    delta = hist['close'].diff()
+    u = delta.where(delta > 0, 0)
+    d = -delta.where(delta < 0, 0)
+    rs = u.rolling(14).mean() / d.rolling(14).mean()
+    rsi = 100 - (100 / (1 + rs)).iloc[-1]
+    if stats.check('rsi', not pd.isna(rsi) and rsi > cfg.max_rsi, t): return False, rsi, stock_3d, False
 
     # VCP detection
     ma5_vol = hist['volume'].tail(5).mean()
@@ -1218,23 +1178,7 @@ def calc_ma_alignment_score(stock_hist):
     """
     if stock_hist is None or len(stock_hist) < 60:
         return 0.0, 'insufficient_data'
-
-    close = stock_hist['close']
-    ma5 = close.rolling(5).mean().iloc[-1]
-    ma20 = close.rolling(20).mean().iloc[-1]
-    ma60 = close.rolling(60).mean().iloc[-1]
-
-    if pd.isna(ma5) or pd.isna(ma20) or pd.isna(ma60):
-        return 0.0, 'na'
-
-    if ma5 > ma20 > ma60:
-        return 10.0, '多头排列'
-    elif ma5 > ma20:
-        return 5.0, '短多'
-    elif ma5 < ma20 < ma60:
-        return -5.0, '空头排列'
-    else:
-        return 0.0, '震荡'
+    return scoring_engine.calc_ma_alignment(stock_hist['close'].to_numpy(dtype=float))
 
 
 def _save_and_report(results, csv_path, last_trading_date):
@@ -1273,6 +1217,116 @@ def _save_and_report(results, csv_path, last_trading_date):
     except Exception as e:
         print(f"⚠️ Boomerang tracking skipped: {e}")
 
+
+def _score_candidate(row, hist, change_pct, index_df, is_hot_sector, regime, sentiment_mult,
+                     last_trading_date, cfg=CONFIG, stats=None, rs_pct=None, spot_checked=False):
+    """Apply technical filters + v11.0 scoring to one candidate. Returns result dict or None.
+    rs_pct: full-market RS percentiles by symbol (RSRank.pct), reported as RS_Pct.
+    spot_checked: _filter_spot already ran for this row (the run loop gates before the fetch)."""
+    stats = stats if stats is not None else FilterStats()
+    symbol = str(row['Symbol']).zfill(6)
+    name = row['Name']
+    industry = row['Industry']
+
+    realtime_change_pct = change_pct
+    # Use real-time spot price from pool when available (more accurate during market hours)
+    spot_price = pd.to_numeric(row.get('Price', 0), errors='coerce')
+    turnover_rate = pd.to_numeric(row.get('Turnover_Rate', 0), errors='coerce')
+    hist_close = hist.iloc[-1]['close']
+    current_price = spot_price if (pd.notna(spot_price) and spot_price > 0) else hist_close
+    change_pct = hist.iloc[-1]['change_pct']
+
+    # Technical filtering
+    tech_ok, rsi, stock_3d, vcp_signal = _filter_technicals(hist, change_pct, realtime_change_pct, turnover_rate,
+                                                            cfg, stats, spot_checked)
+    if not tech_ok: return None
+
+    # v11.1: Pair the stock with the index calendar once for all relative factors
+    t = time.perf_counter()
+    aligned = index_calendar(index_df).align(hist)
+
+    # v10.0 Enhanced Scoring
+    ag_score, ag_details = calculate_antigravity_score(aligned, index_df)
+    if stats.check('antigravity', ag_score < cfg.min_ag_score, t):
+        return None
+
+    t = time.perf_counter()
+
+    # v10.0: Micro Momentum
+    micro_mom_score, is_accelerating = calc_micro_momentum(aligned, index_df)
+
+    # v10.0: Institutional Burst
+    inst_score, vol_ratio, is_closing_high = calc_institutional_burst(hist, is_hot_sector)
+
+    # v10.0: VCP Breakout
+    vcp_score, is_vcp_breakout = calc_vcp_breakout(hist)
+
+    # v11.0: Limit-Up Gene (连板基因) — bonus factor
+    lu_gene_score, had_limit_up = calc_limit_up_gene(hist)
+
+    # v11.0: MA Alignment (周期过滤器) — bonus/penalty
+    ma_align_score, ma_align_label = calc_ma_alignment_score(hist)
+
+    # v11.0: Composite Score (0-100) with market-adaptive weights
+    composite = calc_composite_score(ag_score, micro_mom_score, inst_score, vcp_score, regime=regime)
+
+    # v11.0: Add bonus factors (limit-up gene + MA alignment)
+    composite = round(min(max(composite + lu_gene_score + ma_align_score, 0), 100.0), 1)
+
+    # v11.0: Apply sentiment multiplier to composite score
+    composite = round(min(composite * sentiment_mult, 100.0), 1)
+
+    if stats.check('composite', composite < cfg.min_composite_score, t):
+        return None
+
+    # Build signal tags
+    signal_tags = []
+    if inst_score >= 25: signal_tags.append(f"爆量突袭{vol_ratio:.1f}x")
+    if micro_mom_score >= 15: signal_tags.append("强势连击🚀")
+    if is_closing_high: signal_tags.append("光头阳")
+    if is_vcp_breakout: signal_tags.append("老鸭头突破")
+    if ag_score >= 4: signal_tags.append("金身免伤防御盾")
+    if is_hot_sector: signal_tags.append("主线共振")
+    if had_limit_up: signal_tags.append("连板基因🧬")
+    if ma_align_label == '多头排列': signal_tags.append("多头排列📈")
+    signal_str = " ".join(signal_tags) if signal_tags else "Momentum"
+
+    vol_note = f"VolR:{vol_ratio:.1f}x Burst:{inst_score:.0f}"
+
+    # v11.0: Confidence grading
+    if composite >= 80:
+        grade, grade_label = 'S', '强烈推荐'
+    elif composite >= 60:
+        grade, grade_label = 'A', '推荐'
+    elif composite >= 40:
+        grade, grade_label = 'B', '观察'
+    else:
+        grade, grade_label = 'C', '弱'
+
+    print(f"MATCH {name}: [{grade}] C={composite} Mom={micro_mom_score:.1f} Burst={inst_score:.0f} VCP={vcp_score:.0f} MA={ma_align_label}")
+    return {
+        'Symbol': symbol,
+        'Name': name,
+        'Date': last_trading_date,
+        'Industry': industry,
+        'Price': float(current_price),
+        'Change_Pct': change_pct,
+        'AG_Score': composite,
+        'Strategy': signal_str, # v10.1: Align with tracker
+        'Logic': signal_str,    # v10.1: Align with tracker
+        'Volume_Note': vol_note,
+        'RS_Score': micro_mom_score,
+        'Vol_Explosion': vol_ratio,
+        'Momentum_Accel': vcp_score,
+        'Sector_Leader': is_hot_sector,
+        'Flow_Ratio': inst_score,
+        'Composite': composite,
+        'Grade': grade,
+        'Grade_Label': grade_label,
+        'MA_Alignment': ma_align_label,
+        'RS_Pct': float(rs_pct.get(symbol, np.nan)) if rs_pct is not None else np.nan,
+    }
+
 # --- Runner ---
 
 def run_siphoner_strategy(market='CN', cfg=CONFIG):
@@ -1318,148 +1372,115 @@ def run_siphoner_strategy(market='CN', cfg=CONFIG):
         print(f"   涨停数: {sentiment_details['limit_up_count']}")
 
     # v6.0: Sector momentum pre-filter with per-stock rankings
-    hot_sectors, sector_stats, sector_rankings = calc_sector_momentum(pool)
+    hot_sectors, sector_stats, sector_rankings = calc_sector_momentum(pool, market=market)
     if hot_sectors:
         print(f"🔥 Hot Sectors ({len(hot_sectors)}): {', '.join(hot_sectors[:8])}")
     else:
         print("⚠️ No hot sectors found, skipping sector filter")
         
-    results = []
-    processed_count = 0
-    
-    pool = pool.sample(frac=1).reset_index(drop=True)
-    
-    for idx, row in pool.iterrows():
-        if processed_count >= cfg.max_process: break
-        processed_count += 1
-        
-        symbol = str(row['Symbol']).zfill(6)
-        name = row['Name']
-        industry = row['Industry']
-        
-        # Step 1: Fundamental filtering
+    # v11.1: Full-market relative strength, ranked once for the whole universe
+    rs = compute_rs_rank(cfg.rs_days) if cfg.rs_rank else None
+    rs_pct = rs.pct if rs is not None else None
+    if rs is not None:
+        print(f"📶 RS rank: {len(rs)} symbols on {cfg.rs_days}-day returns ({rs.source})")
+    elif cfg.rs_rank:
+        print("⚠️ RS rank unavailable (no market-wide returns cached), RS_Pct left empty")
+
+    # v11.1: Seeded under a cassette so a replay scores the slice that was recorded
+    pool = pool.sample(frac=1, random_state=cassette.shuffle_seed()).reset_index(drop=True)
+
+    # Step 1: Spot-only filtering (fundamentals, limit-up, turnover band; no network)
+    stats = FilterStats()
+    candidates = []
+    for _, row in pool.head(cfg.max_process).iterrows():
+        t = time.perf_counter()
         fund_ok, change_pct = _filter_fundamentals(row, market, cfg)
-        if not fund_ok: continue
-
-        # v5.0: Sector momentum filter (soft — skip only if sectors available)
-        is_hot_sector = True
-        if hot_sectors:
-            is_hot_sector = industry in hot_sectors
-            # Allow through if AG score is very high (handled later)
-            
-        time.sleep(0.5)
-        
-        try:
-            if market == 'CN':
-                hist = fetch_stock_history_cn(symbol)
-            else:
-                hist = fetch_stock_history_hk(symbol)
-        except Exception as e:
-            print(f"Skip {name}: History fetch error: {e}")
+        if stats.check('fundamentals', not fund_ok, t):
             continue
-        if hist is None: continue
-        
-        realtime_change_pct = change_pct
-        # Use real-time spot price from pool when available (more accurate during market hours)
-        spot_price = pd.to_numeric(row.get('Price', 0), errors='coerce')
         turnover_rate = pd.to_numeric(row.get('Turnover_Rate', 0), errors='coerce')
-        hist_close = hist.iloc[-1]['close']
-        current_price = spot_price if (pd.notna(spot_price) and spot_price > 0) else hist_close
-        change_pct = hist.iloc[-1]['change_pct']
-        
-        # Step 2: Technical filtering
-        tech_ok, rsi, stock_3d, vcp_signal = _filter_technicals(hist, change_pct, realtime_change_pct, turnover_rate, cfg)
-        if not tech_ok: continue
-
-        # Limit-up check
-        if realtime_change_pct > cfg.limit_up_threshold:
-            print(f"Skip {name}: Daily Limit Up/Surge (+{realtime_change_pct:.2f}%)")
-            continue
-
-        # Step 3: v10.0 Enhanced Scoring
-        ag_score, ag_details = calculate_antigravity_score(hist, index_df)
-        if ag_score < cfg.min_ag_score:
-            continue
-
-        # v10.0: Micro Momentum
-        micro_mom_score, is_accelerating = calc_micro_momentum(hist, index_df)
-
-        # v10.0: Institutional Burst
-        inst_score, vol_ratio, is_closing_high = calc_institutional_burst(hist, is_hot_sector)
+        if _filter_spot(change_pct, turnover_rate, cfg, stats):
+            candidates.append((row, change_pct))
 
-        # v10.0: VCP Breakout
-        vcp_score, is_vcp_breakout = calc_vcp_breakout(hist)
+    # Step 2: Concurrent history fetch, scored as each history arrives
+    fetch_history = fetch_stock_history_cn if market == 'CN' else fetch_stock_history_hk
+    print(f"📥 Fetching history for {len(candidates)} candidates ({cfg.fetch_workers} workers)...")
 
-        # v11.0: Limit-Up Gene (连板基因) — bonus factor
-        lu_gene_score, had_limit_up = calc_limit_up_gene(hist)
+    results = []
+    fetched = []
+    factor_store = get_factor_store() if cfg.factor_state else None
+    cache = get_factor_cache() if cfg.batch_scoring and cfg.factor_cache else None
+
+    def score_batch(batch):
+        # v11.1: Cross-sectional pass over one chunk (same results as _score_candidate)
+        return score_candidates(batch, index_df, hot_sectors, regime, sentiment_mult,
+                                last_trading_date, cfg, weights=regime_weights, cache=cache,
+                                stats=stats, rs_pct=rs_pct, state=factor_store, spot_checked=True)
+
+    fetch_stream = fetch_concurrently(
+        candidates,
+        lambda cand: fetch_history(str(cand[0]['Symbol']).zfill(6)),
+        source='sina' if market != 'CN' else None,  # CN: BarStore throttles its own downloads
+        max_workers=cfg.fetch_workers,
+    )
+    for (row, change_pct), hist, err in fetch_stream:
+        if err is not None:
+            print(f"Skip {row['Name']}: History fetch error: {err}")
+        stats.record('history', 1, err is not None or hist is None)
+        if err is not None or hist is None: continue
+
+        if factor_store is not None:
+            try:
+                factor_store.sync(row['Symbol'], hist)
+            except Exception as e:
+                logger.warning(f"FactorState sync failed for {row['Symbol']}: {e}")
 
-        # v11.0: MA Alignment (周期过滤器) — bonus/penalty
-        ma_align_score, ma_align_label = calc_ma_alignment_score(hist)
+        if cfg.batch_scoring:
+            fetched.append((row, change_pct, hist))
+            if len(fetched) >= BATCH_SCORE_CHUNK:
+                results.extend(score_batch(fetched))
+                fetched = []
+            continue
 
-        # v11.0: Composite Score (0-100) with market-adaptive weights
-        composite = calc_composite_score(ag_score, micro_mom_score, inst_score, vcp_score, regime=regime)
+        # v5.0: Sector momentum filter (soft — skip only if sectors available)
+        is_hot_sector = True
+        if hot_sectors:
+            is_hot_sector = row['Industry'] in hot_sectors
+
+        result = _score_candidate(row, hist, change_pct, index_df, is_hot_sector,
+                                  regime, sentiment_mult, last_trading_date, cfg, stats, rs_pct,
+                                  spot_checked=True)
+        if result is not None:
+            results.append(result)
+
+    if cfg.batch_scoring:
+        if fetched:
+            results.extend(score_batch(fetched))
+        if cache is not None:
+            try:
+                cache.save()
+                print(f"🗃️ Factor cache: {cache.stats['hits']} reused, {cache.stats['misses']} rescored")
+            except Exception as e:
+                logger.warning(f"FactorCache save failed: {e}")
 
-        # v11.0: Add bonus factors (limit-up gene + MA alignment)
-        composite = round(min(max(composite + lu_gene_score + ma_align_score, 0), 100.0), 1)
+    if market == 'CN':
+        try:
+            get_bar_store().flush()
+        except Exception as e:
+            logger.warning(f"BarStore manifest flush failed: {e}")
 
-        # v11.0: Apply sentiment multiplier to composite score
-        composite_raw = composite
-        composite = round(min(composite * sentiment_mult, 100.0), 1)
+    if factor_store is not None:
+        try:
+            factor_store.save()
+            print(f"🧮 Factor state: {factor_store.stats}")
+        except Exception as e:
+            logger.warning(f"FactorState save failed: {e}")
 
-        if composite < cfg.min_composite_score:
-            continue
+    stats.report()
+    requests_patch.print_host_stats()
 
-        # Build signal tags
-        signal_tags = []
-        if inst_score >= 25: signal_tags.append(f"爆量突袭{vol_ratio:.1f}x")
-        if micro_mom_score >= 15: signal_tags.append("强势连击🚀")
-        if is_closing_high: signal_tags.append("光头阳")
-        if is_vcp_breakout: signal_tags.append("老鸭头突破")
-        if ag_score >= 4: signal_tags.append("金身免伤防御盾")
-        if is_hot_sector: signal_tags.append("主线共振")
-        if had_limit_up: signal_tags.append("连板基因🧬")
-        if ma_align_label == '多头排列': signal_tags.append("多头排列📈")
-        signal_str = " ".join(signal_tags) if signal_tags else "Momentum"
-
-        vol_note = f"VolR:{vol_ratio:.1f}x Burst:{inst_score:.0f}"
-
-        symbol_str = str(symbol).zfill(6)
-
-        # v11.0: Confidence grading
-        if composite >= 80:
-            grade, grade_label = 'S', '强烈推荐'
-        elif composite >= 60:
-            grade, grade_label = 'A', '推荐'
-        elif composite >= 40:
-            grade, grade_label = 'B', '观察'
-        else:
-            grade, grade_label = 'C', '弱'
-
-        results.append({
-            'Symbol': symbol_str,
-            'Name': name,
-            'Date': last_trading_date,
-            'Industry': industry,
-            'Price': float(current_price),
-            'Change_Pct': change_pct,
-            'AG_Score': composite,
-            'Strategy': signal_str, # v10.1: Align with tracker
-            'Logic': signal_str,    # v10.1: Align with tracker
-            'Volume_Note': vol_note,
-            'RS_Score': micro_mom_score,
-            'Vol_Explosion': vol_ratio,
-            'Momentum_Accel': vcp_score,
-            'Sector_Leader': is_hot_sector,
-            'Flow_Ratio': inst_score,
-            'Composite': composite,
-            'Grade': grade,
-            'Grade_Label': grade_label,
-            'MA_Alignment': ma_align_label,
-        })
-        print(f"MATCH {name}: [{grade}] C={composite} Mom={micro_mom_score:.1f} Burst={inst_score:.0f} VCP={vcp_score:.0f} MA={ma_align_label}")
-    
-    # Step 4: Save and report
+    # Step 3: Save and report
     _save_and_report(results, "siphon_strategy_results.csv", last_trading_date)
 
 if __name__ == "__main__":
+    run_metrics.write_summary_at_exit()
     run_siphoner_strategy()
@@ -0,0 +1,160 @@
+"""
+SpotCache — Shared full-market spot snapshot cache (memory + optional disk).
+Snapshots are stamped with the trading minute they describe, so the pool
+builder, the email step and the scripts reuse one ~5,000-row download instead
+of each pulling their own.
+"""
+
+import datetime
+import logging
+import os
+import pickle
+import threading
+import time
+
+import pandas as pd
+
+from trade_calendar import get_trade_calendar
+
+logger = logging.getLogger("SiphonSystem")
+
+SPOT_CACHE_DIR = os.path.join("data_cache", "spot")
+# Seconds a snapshot stays fresh while the market is open (env SIPHON_SPOT_TTL)
+SPOT_TTL = float(os.environ.get("SIPHON_SPOT_TTL", 300))
+# Set SIPHON_SPOT_DISK=0 to keep snapshots in memory only
+SPOT_DISK = os.environ.get("SIPHON_SPOT_DISK", "1") == "1"
+
+SESSIONS = ((datetime.time(9, 30), datetime.time(11, 30)),
+            (datetime.time(13, 0), datetime.time(15, 0)))
+
+
+def trading_minute(now=None):
+    """The market minute a snapshot taken at `now` reflects, as 'YYYY-MM-DD HH:MM'.
+
+    Outside the sessions the clock stops: the lunch break maps to 11:30, after
+    the close to 15:00, and pre-market / holidays to the previous session's close.
+    """
+    now = now or datetime.datetime.now()
+    cal = get_trade_calendar()
+    day, t = now.date(), now.time()
+    if not cal.is_trading_day(day) or t < SESSIONS[0][0]:
+        day = cal.prev_trading_day(day)
+        return f"{day} {SESSIONS[1][1].strftime('%H:%M')}"
+    if SESSIONS[0][1] <= t < SESSIONS[1][0]:
+        return f"{day} {SESSIONS[0][1].strftime('%H:%M')}"
+    if t >= SESSIONS[1][1]:
+        return f"{day} {SESSIONS[1][1].strftime('%H:%M')}"
+    return f"{day} {t.strftime('%H:%M')}"
+
+
+class SpotCache:
+    """Latest snapshot per source. A snapshot is fresh if it was taken within `ttl`
+    seconds or describes the current trading minute (always true once the market
+    has closed, so post-close stages never re-download)."""
+
+    def __init__(self, root=SPOT_CACHE_DIR, ttl=SPOT_TTL, disk=SPOT_DISK):
+        self.root = root
+        self.ttl = ttl
+        self.disk = disk
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'downloads': 0}
+
+    def _path(self, source):
+        return os.path.join(self.root, f"{source}.pkl")
+
+    def _is_fresh(self, entry, ttl):
+        if entry is None:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        return entry['minute'] == trading_minute() or time.time() - entry['fetched_at'] <= ttl
+
+    def _load_disk(self, source):
+        path = self._path(source)
+        if not self.disk or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"SpotCache: unreadable {path}: {e}")
+            return None
+
+    def _save_disk(self, source, entry):
+        if not self.disk:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(source) + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, self._path(source))
+
+    def peek(self, source, ttl=None):
+        """Fresh cached snapshot for `source` (memory, then disk), or None. Never downloads."""
+        entry = self._entries.get(source)
+        if self._is_fresh(entry, ttl):
+            self.stats['hits'] += 1
+            return entry['df'].copy()
+        entry = self._load_disk(source)
+        if self._is_fresh(entry, ttl):
+            self._entries[source] = entry
+            self.stats['disk_hits'] += 1
+            return entry['df'].copy()
+        return None
+
+    def get(self, source, fetch_fn, ttl=None):
+        """Fresh snapshot for `source`, downloading via fetch_fn() if needed.
+        Concurrent callers for the same source share a single download."""
+        with self._lock:
+            lock = self._locks.setdefault(source, threading.Lock())
+        with lock:
+            df = self.peek(source, ttl)
+            if df is not None:
+                return df
+            minute = trading_minute()
+            df = fetch_fn()
+            if df is None or df.empty:
+                return df
+            self.stats['downloads'] += 1
+            entry = {'minute': minute, 'fetched_at': time.time(), 'df': df}
+            self._entries[source] = entry
+            try:
+                self._save_disk(source, entry)
+            except Exception as e:
+                logger.warning(f"SpotCache: could not persist {source}: {e}")
+            return df.copy()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_spot_cache():
+    """Process-wide SpotCache instance."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SpotCache()
+        return _cache
+
+
+def get_spot_snapshot(source, fetch_fn, ttl=None):
+    return get_spot_cache().get(source, fetch_fn, ttl)
+
+
+def cached_price_map(sources=("eastmoney", "tencent"), ttl=None):
+    """{6-digit code: last price} from the freshest cached snapshot, without downloading.
+    A zero price (suspended / call auction) falls back to the previous close."""
+    cache = get_spot_cache()
+    for source in sources:
+        df = cache.peek(source, ttl)
+        if df is None or '代码' not in df.columns or '最新价' not in df.columns:
+            continue
+        codes = df['代码'].astype(str).str.replace(r'^(sh|sz|bj)', '', regex=True).str.zfill(6)
+        price = pd.to_numeric(df['最新价'], errors='coerce')
+        if '昨收' in df.columns:
+            price = price.where(price > 0, pd.to_numeric(df['昨收'], errors='coerce'))
+        price_map = dict(zip(codes, price))
+        return {c: p for c, p in price_map.items() if p == p and p > 0}
+    return {}
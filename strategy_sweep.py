@@ -0,0 +1,234 @@
+"""
+StrategySweep — Score many StrategyConfig variants over one data pass.
+The pool, index, sentiment and candidate histories are fetched once and the
+history-only factors computed once (per distinct ma_period); every variant's
+thresholds and regime weights are then broadcast as (configs x candidates)
+arrays, giving one ranked candidate list per config — the same picks a full
+run_siphoner_strategy with that config would make on the same data.
+
+Variants are dicts of StrategyConfig overrides plus an optional 'weights'
+dict merged onto the regime weights. vcp_vol_ratio / vcp_steady_ratio only
+feed _filter_technicals' VCP flag, which no score uses, so they never change
+a pick; max_process (the pool slice) and the RS settings are fixed per sweep.
+
+Usage: python strategy_sweep.py --grid min_composite_score=30,40,50 --grid max_rsi=70,80
+                                [--grid weights.vcp=10,15,20] [--top 10] [--out sweep.csv]
+"""
+
+import argparse
+import dataclasses
+import itertools
+import logging
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import run_metrics
+import siphon_strategy as ss
+from batch_scorer import (_grade, final_composites, pool_factors, spot_columns, technical_mask_from,
+                          with_sector_bonus)
+from fetch_pool import fetch_concurrently
+from scoring_engine import DEFAULT_WEIGHTS, get_regime_weights
+
+logger = logging.getLogger("SiphonSystem")
+
+# Broadcast per config as (configs x 1) arrays
+THRESHOLD_FIELDS = ('max_gain_5d', 'max_rsi', 'limit_up_threshold', 'min_avg_volume',
+                    'min_ag_score', 'min_composite_score')
+# Spot-row filters: evaluated once per distinct combination
+FUNDAMENTAL_FIELDS = ('max_drop_pct', 'min_growth', 'high_growth', 'max_peg')
+# Change a history factor (the MA trend line): factors computed once per distinct value
+FACTOR_FIELDS = ('ma_period',)
+FIXED_FIELDS = ('max_process', 'rs_rank', 'rs_days')
+
+
+def expand_variants(base_cfg, variants):
+    """[(StrategyConfig, weight overrides), ...] for each variant dict."""
+    fields = {f.name for f in dataclasses.fields(base_cfg)}
+    expanded = []
+    for overrides in variants:
+        overrides = dict(overrides)
+        weights = overrides.pop('weights', None) or {}
+        unknown = set(overrides) - fields
+        if unknown:
+            raise ValueError(f"Unknown StrategyConfig fields: {sorted(unknown)}")
+        unknown = set(weights) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown weight names: {sorted(unknown)}")
+        fixed = [k for k in FIXED_FIELDS if k in overrides and overrides[k] != getattr(base_cfg, k)]
+        if fixed:
+            raise ValueError(f"Cannot vary {fixed} within a sweep")
+        expanded.append((dataclasses.replace(base_cfg, **overrides), weights))
+    return expanded
+
+
+def grid(**axes):
+    """Cartesian product of field -> values; 'weights.<name>' axes go into the weights dict."""
+    names = list(axes)
+    variants = []
+    for values in itertools.product(*(axes[n] for n in names)):
+        variant = {}
+        for name, value in zip(names, values):
+            if name.startswith('weights.'):
+                variant.setdefault('weights', {})[name.split('.', 1)[1]] = value
+            else:
+                variant[name] = value
+        variants.append(variant)
+    return variants
+
+
+def load_pool(market='CN', cfg=ss.CONFIG, variants=({},), seed=None):
+    """Everything a sweep scores, fetched once.
+
+    Histories are fetched for every row that passes the fundamentals of at least
+    one variant (and the fixed turnover band); the limit-up gate is swept, so it is
+    not applied before the fetch.
+    """
+    configs = [c for c, _ in expand_variants(cfg, variants)]
+    if market == 'CN':
+        pool, index_df = ss.fetch_basic_pool(), ss.fetch_index_data()
+    else:
+        pool, index_df = ss.fetch_hk_pool(), ss.fetch_hk_index_data()
+    if pool.empty or index_df.empty:
+        raise RuntimeError("No stock pool / index data")
+
+    regime, _ = ss.detect_market_regime(index_df)
+    sentiment_mult, _ = ss.fetch_market_sentiment()
+    hot_sectors, _, _ = ss.calc_sector_momentum(pool, market=market)
+    pool = pool.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    fundamentals = _distinct(configs, FUNDAMENTAL_FIELDS)
+    no_limit_up = dataclasses.replace(cfg, limit_up_threshold=np.inf)
+    rows = []
+    for _, row in pool.head(cfg.max_process).iterrows():
+        passes = [ss._filter_fundamentals(row, market, c) for c in fundamentals]
+        if not any(ok for ok, _ in passes):
+            continue
+        change_pct = passes[0][1]
+        turnover_rate = pd.to_numeric(row.get('Turnover_Rate', 0), errors='coerce')
+        if ss._filter_spot(change_pct, turnover_rate, no_limit_up):
+            rows.append((row, change_pct))
+
+    fetch_history = ss.fetch_stock_history_cn if market == 'CN' else ss.fetch_stock_history_hk
+    print(f"📥 Sweep: fetching history for {len(rows)} candidates once...")
+    candidates = []
+    for (row, change_pct), hist, err in fetch_concurrently(
+            rows, lambda cand: fetch_history(str(cand[0]['Symbol']).zfill(6)),
+            source='sina' if market != 'CN' else None, max_workers=cfg.fetch_workers):
+        if err is None and hist is not None:
+            candidates.append((row, change_pct, hist))
+    rs = ss.compute_rs_rank(cfg.rs_days) if cfg.rs_rank else None
+    return {'market': market, 'candidates': candidates, 'index_df': index_df, 'hot_sectors': hot_sectors,
+            'regime': regime, 'sentiment_mult': sentiment_mult, 'rs_pct': rs.pct if rs is not None else None}
+
+
+def _distinct(configs, fields):
+    """One representative config per distinct combination of `fields`."""
+    seen = {}
+    for c in configs:
+        seen.setdefault(tuple(getattr(c, f) for f in fields), c)
+    return list(seen.values())
+
+
+def sweep(data, base_cfg, variants, cache=None):
+    """Ranked candidates per variant: [(variant, DataFrame sorted by Composite), ...].
+
+    `data` is load_pool()'s dict (or the same keys built from recorded data).
+    """
+    expanded = expand_variants(base_cfg, variants)
+    candidates = data['candidates']
+    if not candidates:
+        return [(v, pd.DataFrame()) for v in variants]
+    configs = [c for c, _ in expanded]
+    rows = [c[0] for c in candidates]
+    histories = [c[2] for c in candidates]
+    symbols = [str(r['Symbol']).zfill(6) for r in rows]
+    t0 = time.perf_counter()
+
+    # Fundamentals per distinct spot-filter combination
+    fund_ok = {}
+    for c in _distinct(configs, FUNDAMENTAL_FIELDS):
+        key = tuple(getattr(c, f) for f in FUNDAMENTAL_FIELDS)
+        fund_ok[key] = np.array([ss._filter_fundamentals(r, data['market'], c)[0] for r in rows])
+    keep = np.stack([fund_ok[tuple(getattr(c, f) for f in FUNDAMENTAL_FIELDS)] for c in configs])
+
+    # History factors once per distinct ma_period (only the MA line differs)
+    factors = {c.ma_period: pool_factors(histories, data['index_df'], c, symbols, cache)
+               for c in _distinct(configs, FACTOR_FIELDS)}
+    f = dict(factors[configs[0].ma_period])
+    f['ma'] = np.stack([factors[c.ma_period]['ma'] for c in configs])
+
+    realtime_chg, turnover, spot_price, is_hot = spot_columns(candidates, data['hot_sectors'])
+    limits = SimpleNamespace(**{name: np.array([getattr(c, name) for c in configs], dtype=float)[:, None]
+                                for name in THRESHOLD_FIELDS})
+    keep = keep & technical_mask_from(f, realtime_chg, turnover, limits)
+    keep &= ~(f['ag'] < limits.min_ag_score)
+
+    regime_weights = get_regime_weights(data['regime'])
+    weights = [dict(regime_weights, **w) for _, w in expanded]
+    weights = {k: np.array([w[k] for w in weights], dtype=float)[:, None] for k in regime_weights}
+    inst = with_sector_bonus(f['inst_base'], is_hot)
+    composite = final_composites(f, inst, weights, data['sentiment_mult'])
+    keep &= ~(composite < limits.min_composite_score)
+
+    table = pd.DataFrame({
+        'Symbol': symbols,
+        'Name': [r['Name'] for r in rows],
+        'Industry': [r['Industry'] for r in rows],
+        'Price': np.where(~np.isnan(spot_price) & (spot_price > 0), spot_price, f['price']),
+        'RS_Score': f['mom'],
+        'Flow_Ratio': inst,
+        'Momentum_Accel': f['vcp'],
+        'MA_Alignment': f['ma_label'],
+    })
+    if data.get('rs_pct') is not None:
+        table['RS_Pct'] = data['rs_pct'].reindex(symbols).to_numpy(dtype=float)
+    results = []
+    for i, variant in enumerate(variants):
+        picked = np.flatnonzero(keep[i])
+        ranked = table.iloc[picked].assign(Composite=composite[i, picked])
+        ranked['Grade'] = [_grade(c)[0] for c in ranked['Composite']]
+        ranked = ranked.sort_values('Composite', ascending=False, kind='mergesort').reset_index(drop=True)
+        ranked.insert(0, 'Rank', np.arange(1, len(ranked) + 1))
+        results.append((variant, ranked))
+    logger.info(f"StrategySweep: {len(variants)} configs x {len(candidates)} candidates "
+                f"in {time.perf_counter() - t0:.2f}s")
+    return results
+
+
+def _parse_axis(text):
+    name, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected field=v1,v2,...: {text}")
+    return name.strip(), [float(v) if '.' in v or 'e' in v.lower() else int(v) for v in values.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a grid of StrategyConfig variants on one data pass")
+    parser.add_argument("--grid", type=_parse_axis, action='append', default=[],
+                        help="field=v1,v2,... (repeatable; weights.<name>=... for regime weights)")
+    parser.add_argument("--market", default="CN")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0, help="pool shuffle seed")
+    parser.add_argument("--out", default=None, help="write every config's ranked list to this CSV")
+    args = parser.parse_args()
+    run_metrics.write_summary_at_exit()
+
+    variants = grid(**dict(args.grid)) if args.grid else [{}]
+    data = load_pool(args.market, ss.CONFIG, variants, seed=args.seed)
+    t0 = time.perf_counter()
+    results = sweep(data, ss.CONFIG, variants)
+    print(f"🧪 {len(variants)} configs x {len(data['candidates'])} candidates scored in "
+          f"{time.perf_counter() - t0:.2f}s (regime={data['regime']}, sentiment={data['sentiment_mult']}x)")
+    for variant, ranked in results:
+        top = " ".join(f"{s}({c})" for s, c in zip(ranked['Symbol'][:args.top], ranked['Composite'][:args.top]))
+        print(f"   {variant}: {len(ranked)} picks | {top}")
+    if args.out:
+        pd.concat([ranked.assign(Config=str(variant)) for variant, ranked in results]).to_csv(args.out, index=False)
+        print(f"Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Frozen copy of the DataFrame-based live scoring factors (siphon_strategy before
+they moved onto scoring_engine kernels). Reference for the scoring parity checks;
+do not edit.
+"""
+
+import pandas as pd
+
+DEFAULT_WEIGHTS = {
+    'inst_burst': 40,
+    'micro_mom': 25,
+    'antigravity': 20,
+    'vcp': 15,
+}
+
+# Market-regime-adaptive weight adjustments
+REGIME_WEIGHT_ADJUSTMENTS = {
+    'bull':    {'inst_burst': 0, 'micro_mom': +10, 'antigravity': -10, 'vcp': 0},
+    'bear':    {'inst_burst': -10, 'micro_mom': 0, 'antigravity': +10, 'vcp': 0},
+    'neutral': {'inst_burst': 0, 'micro_mom': 0, 'antigravity': 0, 'vcp': 0},
+}
+
+
+def get_regime_weights(regime='neutral'):
+    """v11.0: Return adjusted weight caps based on market regime."""
+    adj = REGIME_WEIGHT_ADJUSTMENTS.get(regime, REGIME_WEIGHT_ADJUSTMENTS['neutral'])
+    return {k: DEFAULT_WEIGHTS[k] + adj[k] for k in DEFAULT_WEIGHTS}
+
+
+def calc_composite_score(ag_score, micro_mom_score, inst_score, vcp_score, regime='neutral'):
+    """v11.0: Ultra-Short-Term Extreme Burst (0-100) with market-adaptive weights.
+
+    Default weight allocation:
+    1. Institutional Burst (Volume/Price/Sector) — 40pts
+    2. Micro-Momentum (3D/5D Alpha)              — 25pts
+    3. Antigravity (Resilience)                  — 20pts
+    4. VCP / Squeeze Breakout                    — 15pts
+
+    Bull regime: Momentum +10, AG -10
+    Bear regime: AG +10, Burst -10
+    """
+    w = get_regime_weights(regime)
+
+    score = 0.0
+    score += min(inst_score, w['inst_burst'])                           # capped by regime weight
+    score += min(micro_mom_score, w['micro_mom'])                       # capped by regime weight
+    score += min(ag_score * 2.0, float(w['antigravity']))               # ag_score natively 0-10
+    score += min(vcp_score, w['vcp'])                                   # capped by regime weight
+
+    return round(min(score, 100.0), 1)
+
+
+def calculate_antigravity_score(stock_hist, index_hist):
+    """v3.5: Enhanced scoring with consecutive resilience bonus"""
+    merged = pd.merge(stock_hist, index_hist, on='date', how='inner')
+    if merged.empty: return 0.0, []
+    
+    recent_days = merged.tail(10)
+    down_days = recent_days[recent_days['Index_Change'] < -0.3]  # v3.5: Relaxed from -0.5
+    
+    score = 0.0
+    details = []
+    consecutive_resilience = 0
+    
+    for _, row in down_days.iterrows():
+        idx_chg = row['Index_Change']
+        stk_chg = row['change_pct']
+        
+        if stk_chg > 0:
+            score += 2.0
+            consecutive_resilience += 1
+            details.append(f"{row['date']}:逆势(Idx{idx_chg:.2f}%)")
+        elif stk_chg > (idx_chg + 1.5):  # v3.5: Relaxed from +2.0
+            score += 1.0
+            consecutive_resilience += 1
+            details.append(f"{row['date']}:抗跌(Idx{idx_chg:.2f}%)")
+        else:
+            consecutive_resilience = 0  # Reset if not resilient
+    
+    # v3.5: Consecutive Resilience Bonus
+    if consecutive_resilience >= 2:
+        score += 1.0
+        details.append("连续抗跌")
+            
+    return score, details
+
+
+def calc_micro_momentum(stock_hist, index_hist):
+    """v10.0: Micro Momentum (0-25).
+    Replaces older 20-day / 10-day Alpha tracking.
+    15 points for 3-day Alpha. 10 points for 5-day Alpha.
+    """
+    merged = pd.merge(stock_hist, index_hist, on='date', how='inner', suffixes=('', '_idx'))
+    if len(merged) < 6:
+        return 0.0, False
+
+    closes = merged['close']
+    idx_closes = merged['close_idx']
+
+    stock_3d = (closes.iloc[-1] / closes.iloc[-4] - 1) * 100 if len(closes) > 3 else 0
+    stock_5d = (closes.iloc[-1] / closes.iloc[-6] - 1) * 100 if len(closes) > 5 else 0
+
+    idx_3d = (idx_closes.iloc[-1] / idx_closes.iloc[-4] - 1) * 100 if len(idx_closes) > 3 else 0
+    idx_5d = (idx_closes.iloc[-1] / idx_closes.iloc[-6] - 1) * 100 if len(idx_closes) > 5 else 0
+
+    alpha_3d = stock_3d - idx_3d
+    alpha_5d = stock_5d - idx_5d
+
+    # Scoring: Up to 15 pts if 3-day alpha > 7.5%, Up to 10 pts if 5-day alpha > 6.6%
+    score_3d = min(max(alpha_3d * 2.0, 0), 15.0)
+    score_5d = min(max(alpha_5d * 1.5, 0), 10.0)
+
+    score = score_3d + score_5d
+    is_accelerating = alpha_3d > alpha_5d > 0
+    return round(score, 1), is_accelerating
+
+
+def calc_institutional_burst(stock_hist, is_hot_sector):
+    """v10.0: Institutional Burst (0-40).
+    Captures extreme volume anomalies + price action + pocket pivots.
+    """
+    if len(stock_hist) < 11:
+        return 0.0, 1.0, False
+
+    today = stock_hist.iloc[-1]
+    ma5_vol = stock_hist['volume'].iloc[-6:-1].mean()
+    today_vol = today['volume']
+    
+    vol_ratio = today_vol / ma5_vol if ma5_vol > 0 else 1.0
+    
+    score = 0.0
+    
+    # 1. Price Momentum: Close near high (0-15)
+    high_low_range = today['high'] - today['low']
+    if high_low_range > 0:
+        close_position = (today['close'] - today['low']) / high_low_range
+    else:
+        close_position = 1.0
+        
+    if close_position > 0.85 and vol_ratio >= 2.0:
+        score += 15.0  # Exploding volume closing near high
+    elif close_position > 0.70 and vol_ratio >= 1.5:
+        score += 8.0
+        
+    # 2. Pocket Pivot (0-15)
+    # Today's volume > max down volume of last 10 days
+    recent_10 = stock_hist.iloc[-11:-1]
+    down_vols = recent_10[recent_10['change_pct'] < 0]['volume']
+    max_down_vol = down_vols.max() if not down_vols.empty else 0
+    
+    if today_vol > max_down_vol and today['change_pct'] > 0:
+        score += 15.0
+    elif today_vol > ma5_vol * 1.5 and today['change_pct'] > 0:
+        score += 5.0
+        
+    # 3. Sector Synergy & Active Turnover (0-10)
+    if is_hot_sector:
+        score += 10.0
+
+    return min(score, 40.0), round(vol_ratio, 2), close_position > 0.85
+
+
+def calc_vcp_breakout(stock_hist):
+    """v10.0: VCP & Squeeze Breakout (0-15).
+    Yesterday volume extremely low, today exploding upwards.
+    """
+    if len(stock_hist) < 6: return 0.0, False
+    
+    ma5_vol_prev = stock_hist['volume'].iloc[-7:-2].mean()
+    yesterday_vol = stock_hist.iloc[-2]['volume']
+    today_vol = stock_hist.iloc[-1]['volume']
+    
+    score = 0.0
+    is_vcp = False
+    
+    if yesterday_vol < ma5_vol_prev * 0.6:  # Extreme volume contraction yesterday
+        if today_vol > yesterday_vol * 2.0 and stock_hist.iloc[-1]['change_pct'] > 2.0:
+            score += 15.0  # Perfect slingshot
+            is_vcp = True
+        elif today_vol > yesterday_vol * 1.5 and stock_hist.iloc[-1]['change_pct'] > 0:
+            score += 8.0
+            
+    return score, is_vcp
+
+
+def calc_limit_up_gene(stock_hist, lookback=20):
+    """v11.0: Limit-Up Gene Factor (连板基因) — bonus scoring (0-15).
+
+    Evaluates:
+    1. Has the stock hit limit-up in the past N days? (+5 base)
+    2. How early in the day did the limit-up occur? (proxy: high == close) (+3)
+    3. Day-after premium rate for the most recent limit-up day (+7 max)
+    """
+    if stock_hist is None or len(stock_hist) < lookback:
+        return 0.0, False
+
+    recent = stock_hist.tail(lookback)
+    score = 0.0
+    had_limit_up = False
+
+    # Detect limit-up days (change_pct >= 9.5% for main board, >= 19.5% for STAR/ChiNext)
+    limit_up_days = recent[recent['change_pct'] >= 9.5]
+
+    if len(limit_up_days) == 0:
+        return 0.0, False
+
+    had_limit_up = True
+    score += 5.0  # Base: had a limit-up in the lookback period
+
+    # Check most recent limit-up quality
+    last_lu = limit_up_days.iloc[-1]
+
+    # Proxy for early seal: close == high (strong buying pressure, sealed at limit)
+    if last_lu['close'] >= last_lu['high'] * 0.999:
+        score += 3.0  # Tight seal — likely early limit-up
+
+    # Day-after premium: find the bar right after the limit-up
+    lu_idx = stock_hist.index.get_loc(last_lu.name)
+    if lu_idx + 1 < len(stock_hist):
+        next_day = stock_hist.iloc[lu_idx + 1]
+        premium = next_day['change_pct']
+        # Positive premium after limit-up = strong continuation gene
+        if premium > 3.0:
+            score += 7.0
+        elif premium > 0:
+            score += 4.0
+
+    return round(min(score, 15.0), 1), had_limit_up
+
+
+def calc_ma_alignment_score(stock_hist):
+    """v11.0: MA Alignment Cycle Filter (周期过滤器).
+
+    Scores based on MA5/MA20/MA60 alignment:
+    - Full bull alignment (MA5 > MA20 > MA60): +10 bonus
+    - Partial alignment (MA5 > MA20 only):     +5 bonus
+    - Bear alignment (MA5 < MA20 < MA60):      -5 penalty
+    - Neutral/mixed:                            0
+
+    Returns: (score_adjustment, alignment_label)
+    """
+    if stock_hist is None or len(stock_hist) < 60:
+        return 0.0, 'insufficient_data'
+
+    close = stock_hist['close']
+    ma5 = close.rolling(5).mean().iloc[-1]
+    ma20 = close.rolling(20).mean().iloc[-1]
+    ma60 = close.rolling(60).mean().iloc[-1]
+
+    if pd.isna(ma5) or pd.isna(ma20) or pd.isna(ma60):
+        return 0.0, 'na'
+
+    if ma5 > ma20 > ma60:
+        return 10.0, '多头排列'
+    elif ma5 > ma20:
+        return 5.0, '短多'
+    elif ma5 < ma20 < ma60:
+        return -5.0, '空头排列'
+    else:
+        return 0.0, '震荡'
+
+
+# ─── Sector momentum (before the groupby-rank rewrite) ───
+
+def calc_sector_momentum(pool_df, industry_col='Industry', board_map=None):
+    """v6.0: Sector momentum with per-stock ranking within sector.
+    Returns hot_sectors list AND a dict mapping industry -> stock rankings.
+    v11.1: Missing/Unknown industries are filled from the cached board index.
+    """
+    try:
+        known = pool_df[industry_col].notna() & ~pool_df[industry_col].isin(['Unknown', '-', ''])
+        if not known.all():
+            symbols = pool_df['Symbol'].astype(str).str.zfill(6)
+            pool_df = pool_df.copy()
+            pool_df[industry_col] = pool_df[industry_col].where(known, symbols.map(board_map))
+
+        sector_stats = pool_df.groupby(industry_col).agg(
+            avg_change=('Change_Pct', lambda x: pd.to_numeric(x, errors='coerce').mean()),
+            count=('Symbol', 'count')
+        ).reset_index()
+
+        sector_stats = sector_stats[sector_stats['count'] >= 3]
+        if sector_stats.empty:
+            return [], sector_stats, {}
+
+        sector_stats['momentum_rank'] = sector_stats['avg_change'].rank(pct=True)
+        hot_sectors = sector_stats[sector_stats['momentum_rank'] > 0.4][industry_col].tolist()
+
+        # v6.0: Build per-sector stock ranking
+        sector_rankings = {}
+        for industry in hot_sectors:
+            sector_stocks = pool_df[pool_df[industry_col] == industry].copy()
+            sector_stocks['Change_Pct_num'] = pd.to_numeric(sector_stocks['Change_Pct'], errors='coerce')
+            sector_stocks['rank_in_sector'] = sector_stocks['Change_Pct_num'].rank(pct=True)
+            for _, srow in sector_stocks.iterrows():
+                sector_rankings[str(srow['Symbol']).zfill(6)] = srow['rank_in_sector']
+
+        return hot_sectors, sector_stats, sector_rankings
+    except Exception as e:
+        print(f"⚠️ Sector momentum calc error: {e}")
+        return [], pd.DataFrame(), {}
+
+def calc_sector_leader_score(symbol, is_hot_sector, sector_rankings):
+    """v6.0: Sector leader scoring (0-10).
+    Rewards stocks that lead their hot sector.
+    """
+    if not is_hot_sector:
+        return 0.0
+
+    rank_pct = sector_rankings.get(symbol, 0.5)
+
+    if rank_pct >= 0.9:
+        return 10.0  # Top 10% in hot sector
+    elif rank_pct >= 0.7:
+        return 7.0   # Top 30%
+    elif rank_pct >= 0.5:
+        return 4.0   # Above median
+    else:
+        return 2.0   # In hot sector but not leading
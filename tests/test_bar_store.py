@@ -0,0 +1,163 @@
+"""
+BarStore update paths: first download, trailing append, leading back-fill,
+rebuild after an adjust-factor change, provisional intraday bar replacement,
+and the batched manifest flush. Offline (fake upstream, frozen clock, weekday
+calendar, temp store).
+
+Run: python -m pytest tests/test_bar_store.py -q
+"""
+
+import datetime
+import json
+import os
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bar_store
+from bar_store import BarStore
+from trade_calendar import TradeCalendar
+
+
+class _Upstream:
+    """Daily bars for one symbol; fetcher() serves [start, end] and logs each call."""
+
+    def __init__(self, start='2025-01-02', end='2025-06-30'):
+        dates = pd.bdate_range(start, end).strftime('%Y-%m-%d')
+        close = [10.0 + 0.01 * i for i in range(len(dates))]
+        self.bars = pd.DataFrame({'date': dates, 'open': close, 'high': close, 'low': close,
+                                  'close': close, 'volume': 1000.0})
+        self.calls = []
+
+    def fetcher(self, code, start, end, adjust):
+        self.calls.append((start, end))
+        df = self.bars
+        return df[(df['date'] >= start) & (df['date'] <= end)].reset_index(drop=True)
+
+    def window(self, start, end):
+        df = self.bars
+        return df[(df['date'] >= start) & (df['date'] <= end)].reset_index(drop=True)
+
+
+def _freeze(monkeypatch, now):
+    class FrozenDate(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(now.year, now.month, now.day)
+
+    class FrozenDateTime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(now.year, now.month, now.day, now.hour, now.minute)
+
+    monkeypatch.setattr(bar_store, 'datetime', types.SimpleNamespace(
+        date=FrozenDate, datetime=FrozenDateTime, time=datetime.time, timedelta=datetime.timedelta))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(bar_store, 'prev_trading_day', TradeCalendar([]).prev_trading_day)
+    _freeze(monkeypatch, datetime.datetime(2025, 7, 1, 10, 0))
+    return _Upstream()
+
+
+def _next_day(store):
+    """Forget the refresh TTL and recent single-flight results, as a later run would."""
+    store._checked.clear()
+    store.flight.forget()
+
+
+def test_first_download_then_disk_hit(tmp_path, upstream):
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    df = store.get_bars('600000', '20250301', '20250430')
+    pd.testing.assert_frame_equal(df, upstream.window('2025-03-01', '2025-04-30'))
+
+    _next_day(store)
+    again = store.get_bars('600000', '2025-03-10', '2025-04-30')
+    pd.testing.assert_frame_equal(again, upstream.window('2025-03-10', '2025-04-30'))
+    assert upstream.calls == [('2025-03-01', '2025-04-30')]
+    assert store.stats['hits'] == 1
+
+
+def test_append_downloads_only_the_missing_tail(tmp_path, upstream):
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    store.get_bars('600000', '2025-03-01', '2025-04-30')
+    _next_day(store)
+    df = store.get_bars('600000', '2025-03-01', '2025-05-30')
+
+    assert upstream.calls[-1] == ('2025-04-30', '2025-05-30')
+    pd.testing.assert_frame_equal(df, upstream.window('2025-03-01', '2025-05-30'))
+    stored = store.peek('600000')
+    assert stored['date'].is_unique and stored['date'].iloc[-1] == '2025-05-30'
+
+
+def test_backfill_extends_history_once(tmp_path, upstream):
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    store.get_bars('600000', '2025-03-01', '2025-04-30')
+    df = store.get_bars('600000', '2025-01-15', '2025-04-30')
+
+    assert upstream.calls[-1] == ('2025-01-15', '2025-03-03')
+    pd.testing.assert_frame_equal(df, upstream.window('2025-01-15', '2025-04-30'))
+    assert store.manifest['qfq']['600000']['covered_from'] == '2025-01-15'
+
+    store.get_bars('600000', '2025-02-01', '2025-04-30')
+    assert len(upstream.calls) == 2
+
+
+def test_adjust_factor_change_rebuilds(tmp_path, upstream):
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    store.get_bars('600000', '2025-03-01', '2025-04-30')
+
+    # Ex-dividend on 2025-05-02: every earlier qfq price is re-adjusted
+    earlier = upstream.bars['date'] < '2025-05-02'
+    upstream.bars.loc[earlier, ['open', 'high', 'low', 'close']] *= 0.95
+    _next_day(store)
+    df = store.get_bars('600000', '2025-03-01', '2025-05-30')
+
+    assert store.stats['rebuilds'] == 1
+    assert upstream.calls[-1] == ('2025-03-01', '2025-05-30')
+    pd.testing.assert_frame_equal(df, upstream.window('2025-03-01', '2025-05-30'))
+
+
+def test_provisional_bar_is_replaced_after_close(tmp_path, upstream, monkeypatch):
+    _freeze(monkeypatch, datetime.datetime(2025, 5, 2, 11, 0))
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    intraday = upstream.bars['date'] == '2025-05-02'
+    final_close = float(upstream.bars.loc[intraday, 'close'].iloc[0])
+    upstream.bars.loc[intraday, 'close'] = final_close * 1.03
+    store.get_bars('600000', '2025-03-01', '2025-05-02')
+
+    _freeze(monkeypatch, datetime.datetime(2025, 5, 2, 16, 0))
+    upstream.bars.loc[intraday, 'close'] = final_close
+    _next_day(store)
+    df = store.get_bars('600000', '2025-03-01', '2025-05-02')
+
+    assert upstream.calls[-1] == ('2025-05-02', '2025-05-02')
+    assert store.stats['rebuilds'] == 0
+    assert df['close'].iloc[-1] == final_close
+    pd.testing.assert_frame_equal(df, upstream.window('2025-03-01', '2025-05-02'))
+
+    # Written after the close: no longer provisional
+    _next_day(store)
+    store.get_bars('600000', '2025-03-01', '2025-05-02')
+    assert len(upstream.calls) == 2
+
+
+def test_manifest_is_flushed_once_per_batch(tmp_path, upstream):
+    store = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    for code in ('600000', '600001', '000001'):
+        store.get_bars(code, '2025-03-01', '2025-04-30')
+    assert store.stats['manifest_writes'] == 0
+    assert not os.path.exists(store.manifest_path)
+
+    store.flush()
+    store.flush()
+    assert store.stats['manifest_writes'] == 1
+    with open(store.manifest_path) as f:
+        assert set(json.load(f)['qfq']) == {'600000', '600001', '000001'}
+
+    reopened = BarStore(root=str(tmp_path), fetcher=upstream.fetcher)
+    assert reopened.stored_symbols() == {'600000', '600001', '000001'}
@@ -0,0 +1,48 @@
+"""
+BarStore single-flight: identical concurrent get_bars calls share one in-flight
+read/refresh and one upstream download. Offline (fake fetcher, temp store).
+
+Run: python -m pytest tests/test_bar_store_singleflight.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bar_store import BarStore
+
+
+def test_concurrent_identical_requests_coalesce(tmp_path):
+    calls = []
+
+    def fetcher(code, start, end, adjust):
+        calls.append(code)
+        time.sleep(0.2)
+        dates = pd.bdate_range(start, end).strftime('%Y-%m-%d')
+        return pd.DataFrame({'date': dates, 'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0, 'volume': 1.0})
+
+    store = BarStore(root=str(tmp_path), fetcher=fetcher)
+    results = [None] * 6
+    barrier = threading.Barrier(len(results))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = store.get_bars('600000', '2025-01-02', '2025-03-31', adjust="")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(results))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ['600000']
+    assert store.flight.stats['calls'] == 1
+    assert store.flight.stats['coalesced'] + store.flight.stats['hits'] == len(results) - 1
+    assert store.flight.stats['coalesced'] >= 1
+    # Every caller gets its own frame
+    assert all(r is not None and len(r) == len(results[0]) for r in results)
+    assert len({id(r) for r in results}) == len(results)
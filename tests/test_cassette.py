@@ -0,0 +1,84 @@
+"""
+Cassette: record -> replay round trips through the akshare hook, including two
+windows of the same symbol replayed on a later day via the loose key.
+Offline, synthetic frames.
+
+Run: python -m pytest tests/test_cassette.py -q
+"""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cassette
+
+RECORD_DAY = datetime.date(2026, 10, 16)
+
+
+@pytest.fixture
+def tape(tmp_path, monkeypatch):
+    monkeypatch.setattr(cassette, '_cassette', cassette.Cassette(str(tmp_path)))
+    monkeypatch.setattr(cassette, '_today', lambda: RECORD_DAY)
+    return cassette.get_cassette()
+
+
+def _window(start, end):
+    dates = pd.bdate_range(start, end).strftime('%Y-%m-%d')
+    return pd.DataFrame({'date': dates, 'close': range(len(dates))})
+
+
+def _daily(start, end, adjust='qfq'):
+    kwargs = {'symbol': 'sh600000', 'start_date': start.strftime('%Y%m%d'),
+              'end_date': end.strftime('%Y%m%d'), 'adjust': adjust}
+    return cassette._akshare_hook('stock_zh_a_daily', lambda: _window(start, end), (), kwargs)
+
+
+def _replay(start, end, adjust='qfq'):
+    def offline():
+        raise AssertionError("replay touched the network")
+    kwargs = {'symbol': 'sh600000', 'start_date': start.strftime('%Y%m%d'),
+              'end_date': end.strftime('%Y%m%d'), 'adjust': adjust}
+    return cassette._akshare_hook('stock_zh_a_daily', offline, (), kwargs)
+
+
+def test_round_trip_keeps_each_window(tape, monkeypatch):
+    day = datetime.timedelta(days=1)
+    long_start, short_start = RECORD_DAY - 120 * day, RECORD_DAY - 5 * day
+    monkeypatch.setattr(cassette, 'CASSETTE_MODE', 'record')
+    long_rec = _daily(long_start, RECORD_DAY)
+    short_rec = _daily(short_start, RECORD_DAY)
+    assert tape.stats['recorded'] == 2
+
+    monkeypatch.setattr(cassette, 'CASSETTE_MODE', 'replay')
+    pd.testing.assert_frame_equal(_replay(long_start, RECORD_DAY), long_rec)
+    pd.testing.assert_frame_equal(_replay(short_start, RECORD_DAY), short_rec)
+    assert tape.stats['replayed'] == 2
+
+    # Next day: exact keys miss, the loose key still tells the two windows apart
+    monkeypatch.setattr(cassette, '_today', lambda: RECORD_DAY + day)
+    pd.testing.assert_frame_equal(_replay(long_start + day, RECORD_DAY + day), long_rec)
+    pd.testing.assert_frame_equal(_replay(short_start + day, RECORD_DAY + day), short_rec)
+    assert tape.stats['loose_replayed'] == 2
+
+
+def test_unrecorded_window_is_a_miss(tape, monkeypatch):
+    day = datetime.timedelta(days=1)
+    monkeypatch.setattr(cassette, 'CASSETTE_MODE', 'record')
+    _daily(RECORD_DAY - 120 * day, RECORD_DAY)
+
+    monkeypatch.setattr(cassette, 'CASSETTE_MODE', 'replay')
+    with pytest.raises(cassette.CassetteMiss):
+        _replay(RECORD_DAY - 30 * day, RECORD_DAY)
+    with pytest.raises(cassette.CassetteMiss):
+        _replay(RECORD_DAY - 120 * day, RECORD_DAY, adjust='hfq')
+    assert tape.stats['misses'] == 2
+
+
+def test_loose_key_drops_timestamps():
+    a = cassette.Cassette._keys("GET https://hq.example/list?_=1760000000000 x")
+    b = cassette.Cassette._keys("GET https://hq.example/list?_=1760000099999 x")
+    assert a[0] != b[0] and a[1] == b[1]
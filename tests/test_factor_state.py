@@ -0,0 +1,197 @@
+"""
+Factor state: O(1) per-bar updates checked against a full rolling recomputation
+(to float tolerance), provisional-bar revisions, rebuilds after re-adjusted
+prices, persistence, and the batch scorer reading its gates from the state.
+Offline, synthetic data.
+
+Run: python -m pytest tests/test_factor_state.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import siphon_strategy as live
+from batch_scorer import PricePanel, score_candidates, technical_factors, with_state_technicals
+from factor_state import FactorStateStore, KEEP_BARS, MA_WINDOWS, RESYNC_EVERY
+from test_live_scoring_parity import _bars, _index
+
+TOL = dict(rtol=1e-9, atol=1e-9)
+APPROX = dict(rel=1e-9, abs=1e-9)
+
+
+def _history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.cumprod(1 + rng.normal(0.001, 0.02, n))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'date': pd.bdate_range('2020-01-02', periods=n).strftime('%Y-%m-%d'),
+        'open': close, 'high': high, 'low': low, 'close': close,
+        'volume': rng.lognormal(14, 0.5, n),
+    })
+
+
+def _reference(hist):
+    """Every factor recomputed from the full history with pandas."""
+    close, volume = hist['close'], hist['volume']
+    delta = close.diff()
+    up, down = delta.where(delta > 0, 0), -delta.where(delta < 0, 0)
+    ref = {'close': close.iloc[-1], 'gain_5d': (close.iloc[-1] / close.iloc[-6] - 1) * 100,
+           'rsi14': (100 - 100 / (1 + up.rolling(14).mean() / down.rolling(14).mean())).iloc[-1],
+           'avg_vol5': volume.tail(5).mean(), 'avg_vol20': volume.tail(20).mean()}
+    for w in MA_WINDOWS:
+        ref[f'ma{w}'] = close.rolling(w).mean().iloc[-1]
+
+    ema_fast = close.ewm(span=12, adjust=False).mean()
+    ema_slow = close.ewm(span=26, adjust=False).mean()
+    dif = ema_fast - ema_slow
+    dea = dif.ewm(span=9, adjust=False).mean()
+    ref.update(macd_dif=dif.iloc[-1], macd_dea=dea.iloc[-1], macd_hist=2 * (dif - dea).iloc[-1])
+
+    k = d = 50.0
+    hhv = hist['high'].rolling(9, min_periods=1).max()
+    llv = hist['low'].rolling(9, min_periods=1).min()
+    for c, h, l in zip(close, hhv, llv):
+        rsv = (c - l) / (h - l) * 100 if h > l else 50.0
+        k = k * 2 / 3 + rsv / 3
+        d = d * 2 / 3 + k / 3
+    ref.update(kdj_k=k, kdj_d=d, kdj_j=3 * k - 2 * d)
+
+    gains, losses = up.iloc[1:15].sum() / 14, down.iloc[1:15].sum() / 14
+    for g, l in zip(up.iloc[15:], down.iloc[15:]):
+        gains, losses = (gains * 13 + g) / 14, (losses * 13 + l) / 14
+    ref['rsi14_wilder'] = 100 - 100 / (1 + gains / losses)
+    return ref
+
+
+def _assert_matches(state, hist):
+    got = state.factors()
+    assert got['date'] == hist['date'].iloc[-1]
+    for key, expected in _reference(hist).items():
+        value = np.nan if got[key] is None else got[key]
+        assert value == pytest.approx(expected, nan_ok=True, **APPROX), key
+
+
+def test_one_bar_update_matches_rolling(tmp_path):
+    hist = _history(120)
+    store = FactorStateStore(str(tmp_path / "state.pkl"))
+    store.sync('1', hist.iloc[:119])
+    applied = store.stats['applied']
+    state = store.sync('1', hist)
+    assert store.stats['applied'] == applied + 1
+    assert len(state.bars) == KEEP_BARS
+    _assert_matches(state, hist)
+
+
+def test_bar_by_bar_stays_within_tolerance_across_resyncs():
+    hist = _history(RESYNC_EVERY * 2 + 40, seed=3)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    for end in range(1, len(hist) + 1):
+        state = store.sync('000001', hist.iloc[:end])
+    assert store.stats['rebuilt'] == 1
+    _assert_matches(state, hist)
+
+
+def test_repeat_sync_is_unchanged():
+    hist = _history(80)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    store.sync('1', hist)
+    store.sync('1', hist)
+    assert store.stats['unchanged'] == 1
+    assert store.stats['applied'] == 80
+
+
+def test_provisional_last_bar_is_replaced():
+    hist = _history(90, seed=1)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    provisional = hist.copy()
+    provisional.loc[provisional.index[-1], ['close', 'high', 'volume']] *= [1.05, 1.06, 0.4]
+    store.sync('1', provisional)
+
+    state = store.sync('1', hist)
+    assert len(state.bars) == KEEP_BARS
+    assert state.bars[-1][4] == hist['close'].iloc[-1]
+    assert store.stats['rebuilt'] == 1
+    _assert_matches(state, hist)
+
+    # A later bar on top of the revised one
+    more = _history(91, seed=1)
+    more.iloc[:90] = hist
+    _assert_matches(store.sync('1', more), more)
+
+
+def test_rebuild_after_qfq_factor_change():
+    hist = _history(100, seed=2)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    store.sync('1', hist.iloc[:99])
+
+    # A dividend re-adjusts every earlier qfq price; the new bar arrives with it
+    adjusted = hist.copy()
+    adjusted[['open', 'high', 'low', 'close']] *= 0.93
+    adjusted.loc[adjusted.index[-1], ['open', 'high', 'low', 'close']] = hist.iloc[-1][['open', 'high', 'low', 'close']].to_numpy()
+    state = store.sync('1', adjusted)
+    assert store.stats['rebuilt'] == 2
+    _assert_matches(state, adjusted)
+
+
+def test_rebuild_when_history_no_longer_reaches_state():
+    hist = _history(100, seed=4)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    store.sync('1', hist.iloc[:40])
+    # Gap: the new window starts after the state's last bar
+    state = store.sync('1', hist.iloc[60:])
+    assert store.stats['rebuilt'] == 2
+    _assert_matches(state, hist.iloc[60:].reset_index(drop=True))
+
+
+def test_state_persists(tmp_path):
+    path = str(tmp_path / "state.pkl")
+    hist = _history(70)
+    store = FactorStateStore(path)
+    store.sync('1', hist.iloc[:69])
+    store.save()
+
+    reloaded = FactorStateStore(path)
+    state = reloaded.sync('1', hist)
+    assert reloaded.stats['rebuilt'] == 0
+    _assert_matches(state, hist)
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_batch_gates_from_state_match_panel(seed):
+    histories = [_bars([25, 61, 90][k % 3], seed * 10 + k) for k in range(6)]
+    symbols = [str(k).zfill(6) for k in range(6)]
+    store = FactorStateStore("/nonexistent/state.pkl")
+    for sym, hist in zip(symbols, histories[:-1]):
+        store.sync(sym, hist)
+
+    from_panel = technical_factors(PricePanel(histories, _index(seed)), live.CONFIG)
+    from_state = with_state_technicals(from_panel, store, symbols, histories, live.CONFIG)
+    for name in ('price', 'gain_5d', 'rsi', 'ma', 'avg_volume_20'):
+        np.testing.assert_allclose(from_state[name], from_panel[name], equal_nan=True, **TOL)
+    # The unsynced symbol keeps the panel values
+    assert from_state['rsi'][-1] == from_panel['rsi'][-1] or np.isnan(from_panel['rsi'][-1])
+
+
+def test_score_candidates_with_state_picks_the_same():
+    cfg = live.StrategyConfig(min_composite_score=0, min_ag_score=0, max_rsi=95)
+    store = FactorStateStore("/nonexistent/state.pkl")
+    candidates = []
+    for seed in range(40):
+        hist = _bars(90, seed)
+        row = pd.Series({'Symbol': str(seed).zfill(6), 'Name': f'S{seed}', 'Industry': 'X',
+                         'Turnover_Rate': 8.0, 'Price': 0})
+        candidates.append((row, 1.0, hist))
+        store.sync(row['Symbol'], hist)
+    index_df = _index(1)
+    args = (candidates, index_df, set(), 'neutral', 1.0, '2025-05-01', cfg)
+    plain = score_candidates(*args, verbose=False)
+    stated = score_candidates(*args, verbose=False, state=store)
+    assert [r['Symbol'] for r in stated] == [r['Symbol'] for r in plain]
+    assert plain
@@ -0,0 +1,81 @@
+"""
+FilterStats: seen / rejected / seconds accounting for scalar and vectorized
+stages, and the spot gates counted once when the run loop already applied
+them before the fetch. Offline.
+
+Run: python -m pytest tests/test_filter_stats.py -q
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import siphon_strategy as live
+from batch_scorer import score_candidates
+from filter_stats import FilterStats
+from test_live_scoring_parity import _bars, _index
+
+
+def test_check_counts_and_times():
+    stats = FilterStats()
+    t = time.perf_counter() - 0.05
+    assert stats.check('rsi', True, t) is True
+    assert stats.check('rsi', False, time.perf_counter()) is False
+    assert stats.check('rsi', np.bool_(True), time.perf_counter())
+    s = stats.summary()['rsi']
+    assert (s['seen'], s['rejected']) == (3, 2)
+    assert s['seconds'] >= 0.05
+
+
+def test_mask_counts_only_alive_rows():
+    stats = FilterStats()
+    alive = np.array([True, True, False, True])
+    failed = np.array([True, False, True, False])
+    t = time.perf_counter() - 0.01
+    out = stats.mask('gain_5d', alive, failed, t)
+    np.testing.assert_array_equal(out, [False, True, False, True])
+    out = stats.mask('gain_5d', out, np.array([False, False, False, True]))
+    np.testing.assert_array_equal(out, [False, True, False, False])
+    s = stats.summary()['gain_5d']
+    assert (s['seen'], s['rejected']) == (5, 2)
+    assert s['seconds'] >= 0.01
+
+
+def test_stage_order_and_summary_is_a_copy():
+    stats = FilterStats()
+    for stage in ('limit_up', 'turnover', 'history', 'limit_up'):
+        stats.record(stage)
+    assert list(stats.summary()) == ['limit_up', 'turnover', 'history']
+    stats.summary()['limit_up']['seen'] = 99
+    assert stats.summary()['limit_up']['seen'] == 2
+
+
+def test_spot_gates_skipped_when_already_checked():
+    index_df = _index(1)
+    cfg = live.StrategyConfig()
+    candidates = []
+    for seed in range(24):
+        row = pd.Series({'Symbol': str(seed), 'Name': f'S{seed}', 'Industry': 'A', 'Price': 0,
+                         'Turnover_Rate': [0, 8.0, 50.0][seed % 3]})
+        candidates.append((row, [0.5, 9.0, -1.0][seed % 3], _bars(61, seed)))
+
+    # As the run loop does: spot gates before the fetch, then scoring with spot_checked
+    per_symbol, batch = FilterStats(), FilterStats()
+    gated = [c for c in candidates if live._filter_spot(c[1], c[0]['Turnover_Rate'], cfg, per_symbol)]
+    live_results = [live._score_candidate(row, hist, rt, index_df, True, 'neutral', 1.0, '2025-06-01', cfg,
+                                          per_symbol, spot_checked=True) for row, rt, hist in gated]
+    for stage in ('limit_up', 'turnover'):
+        batch.record(stage, *(per_symbol.summary()[stage][k] for k in ('seen', 'rejected')))
+    batch_results = score_candidates(gated, index_df, [], 'neutral', 1.0, '2025-06-01', cfg,
+                                     verbose=False, stats=batch, spot_checked=True)
+
+    counts = lambda stats: {k: (v['seen'], v['rejected']) for k, v in stats.summary().items() if k != 'factors'}
+    assert counts(per_symbol) == counts(batch)
+    assert counts(per_symbol)['limit_up'][0] == len(candidates)
+    assert counts(per_symbol)['gain_5d'][0] == len(gated)
+    assert [r['Symbol'] for r in live_results if r] == [r['Symbol'] for r in batch_results]
@@ -0,0 +1,196 @@
+"""
+requests_patch: per-host breaker and adaptive rate through a fake transport
+(open after BREAKER_THRESHOLD failures, a single half-open probe, close on
+success, non-network errors are no verdict), plus the auto-patch-on-import
+default. Offline.
+
+Run: python -m pytest tests/test_host_guard.py -q
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import requests_patch
+from rate_limiter import TokenBucket
+from requests_patch import BREAKER_COOLDOWN, BREAKER_THRESHOLD, CircuitOpenError
+
+requests_patch.apply_patch()
+
+
+class _FakeTransport(HTTPAdapter):
+    """Answers from a script: an int is a status code, an exception is raised.
+    An optional gate (threading.Event) holds every send until it is set."""
+
+    def __init__(self, script, gate=None):
+        super().__init__()
+        self.script = list(script)
+        self.gate = gate
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        action = self.script.pop(0)
+        if isinstance(action, BaseException):
+            raise action
+        response = requests.Response()
+        response.status_code = action
+        response._content = b"{}"
+        response.url = request.url
+        response.request = request
+        return response
+
+
+@pytest.fixture
+def host(request):
+    """A fresh host name with a guard whose bucket never makes the test wait."""
+    name = f"{request.node.name.replace('_', '-')}.fake.test"
+    guard = requests_patch.get_host_guard(f"http://{name}/")
+    guard.base_rate = 1000.0
+    guard.bucket = TokenBucket(1000.0, 1000)
+    yield name
+    with requests_patch._host_guards_lock:
+        requests_patch._host_guards.pop(name, None)
+
+
+def _session(host, script, gate=None):
+    session = requests.Session()
+    transport = _FakeTransport(script, gate)
+    session.mount(f"http://{host}/", transport)
+    return session, transport
+
+
+def _guard(host):
+    return requests_patch.get_host_guard(f"http://{host}/")
+
+
+def _elapse_cooldown(guard):
+    guard.open_until = time.monotonic() - 1
+
+
+def test_opens_after_threshold_failures_and_fails_fast(host):
+    session, transport = _session(host, [503] * (BREAKER_THRESHOLD - 1) + [requests.exceptions.ConnectTimeout()])
+    for _ in range(BREAKER_THRESHOLD - 1):
+        assert session.get(f"http://{host}/q").status_code == 503
+    assert _guard(host).state == 'closed'
+    with pytest.raises(requests.exceptions.Timeout):
+        session.get(f"http://{host}/q")
+
+    guard = _guard(host)
+    assert guard.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        session.get(f"http://{host}/q")
+    assert transport.sent == BREAKER_THRESHOLD
+    st = guard.snapshot()
+    assert (st['failures'], st['server_errors'], st['timeouts'], st['fast_fails'], st['breaker_opens']) == \
+        (BREAKER_THRESHOLD, BREAKER_THRESHOLD - 1, 1, 1, 1)
+
+
+def test_rate_halves_on_throttle_and_recovers(host):
+    session, _ = _session(host, [429, 429, 200])
+    guard = _guard(host)
+    session.get(f"http://{host}/q")
+    session.get(f"http://{host}/q")
+    assert guard.bucket.rate == pytest.approx(250.0)
+    session.get(f"http://{host}/q")
+    assert guard.bucket.rate == pytest.approx(350.0)
+    assert guard.consecutive_failures == 0 and guard.stats['throttled'] == 2
+
+
+def test_half_open_admits_exactly_one_probe_then_closes(host):
+    gate = threading.Event()
+    session, transport = _session(host, [200, 200], gate)
+    guard = _guard(host)
+    guard.consecutive_failures = BREAKER_THRESHOLD
+    guard.open_until = time.monotonic() + 60
+    _elapse_cooldown(guard)
+
+    probe_result = {}
+    probe = threading.Thread(target=lambda: probe_result.update(r=session.get(f"http://{host}/q")))
+    probe.start()
+    while transport.sent == 0:
+        time.sleep(0.01)
+    assert guard.state == 'half-open' and guard.probing
+    with pytest.raises(CircuitOpenError, match="probe in flight"):
+        session.get(f"http://{host}/q")
+    gate.set()
+    probe.join(5)
+
+    assert probe_result['r'].status_code == 200
+    assert guard.state == 'closed' and not guard.probing and guard.consecutive_failures == 0
+    assert session.get(f"http://{host}/q").status_code == 200
+    assert transport.sent == 2
+
+
+def test_failed_probe_reopens_with_longer_cooldown(host):
+    session, _ = _session(host, [502])
+    guard = _guard(host)
+    guard.open_until = time.monotonic() + 60
+    _elapse_cooldown(guard)
+    session.get(f"http://{host}/q")
+    assert guard.state == 'open' and not guard.probing
+    assert guard.cooldown == 2 * BREAKER_COOLDOWN
+
+
+def test_non_network_errors_are_not_failures(host):
+    session, _ = _session(host, [ValueError("bad payload")] * (BREAKER_THRESHOLD + 1))
+    guard = _guard(host)
+    for _ in range(BREAKER_THRESHOLD + 1):
+        with pytest.raises(ValueError):
+            session.get(f"http://{host}/q")
+    assert guard.state == 'closed'
+    assert guard.consecutive_failures == 0
+    assert guard.stats['errors'] == BREAKER_THRESHOLD + 1
+    assert guard.stats['failures'] == 0 and guard.stats['ok'] == 0
+
+
+def test_non_network_error_on_probe_is_no_verdict(host):
+    session, _ = _session(host, [ValueError("bad payload"), 200])
+    guard = _guard(host)
+    guard.open_until = time.monotonic() + 60
+    _elapse_cooldown(guard)
+    with pytest.raises(ValueError):
+        session.get(f"http://{host}/q")
+    # Still half-open, probe released: the next caller probes and closes it
+    assert guard.state == 'half-open' and not guard.probing
+    assert session.get(f"http://{host}/q").status_code == 200
+    assert guard.state == 'closed'
+
+
+def test_functional_api_uses_the_shared_session(host):
+    transport = _FakeTransport([200])
+    shared = requests_patch.get_shared_session()
+    shared.mount(f"http://{host}/", transport)
+    try:
+        response = requests.get(f"http://{host}/q", params={'a': 1})
+    finally:
+        shared.adapters.pop(f"http://{host}/")
+    assert response.status_code == 200 and transport.sent == 1
+    assert requests_patch.get_shared_session() is shared
+    # Routed through the patched Session.request: the host guard saw it
+    assert _guard(host).stats['ok'] == 1
+
+
+@pytest.mark.parametrize("env, patched", [(None, True), ("1", True), ("0", False)])
+def test_auto_patch_on_import(env, patched):
+    code = ("import requests, requests_patch; "
+            "print(requests.Session.request is requests_patch.spoofed_session_request, "
+            "requests.get is requests_patch.pooled_get)")
+    environ = {k: v for k, v in os.environ.items() if k != "SIPHON_AUTO_PATCH"}
+    if env is not None:
+        environ["SIPHON_AUTO_PATCH"] = env
+    environ["SIPHON_METRICS"] = "0"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environ,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip().splitlines()[-1] == f"{patched} {patched}"
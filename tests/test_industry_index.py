@@ -0,0 +1,49 @@
+"""
+cached_industry: board membership first, the per-stock industry table second,
+and either table alone (older or partially built databases). Offline, temp DB.
+
+Run: python -m pytest tests/test_industry_index.py -q
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from industry_index import UNKNOWN, cached_industry
+
+
+def _db(path, industry=None, boards=None):
+    conn = sqlite3.connect(path)
+    if industry is not None:
+        conn.execute("CREATE TABLE industry (symbol TEXT PRIMARY KEY, industry TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        conn.executemany("INSERT INTO industry VALUES (?, ?, 0)", industry.items())
+    if boards is not None:
+        conn.execute("CREATE TABLE board_members (board TEXT NOT NULL, symbol TEXT NOT NULL, name TEXT, "
+                     "fetched_on TEXT NOT NULL, PRIMARY KEY (board, symbol))")
+        conn.executemany("INSERT INTO board_members VALUES (?, ?, '', ?)", boards)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_board_membership_wins(tmp_path):
+    path = _db(str(tmp_path / "i.db"), industry={'600000': '银行'},
+               boards=[('银行Ⅱ', '600000', '2026-10-01'), ('证券', '600000', '2026-10-16')])
+    assert cached_industry('600000', path) == '证券'
+
+
+def test_industry_table_without_board_table(tmp_path):
+    path = _db(str(tmp_path / "i.db"), industry={'600000': '银行', '000001': UNKNOWN})
+    assert cached_industry(600000, path) == '银行'
+    assert cached_industry('000001', path) is None
+
+
+def test_board_table_without_industry_table(tmp_path):
+    path = _db(str(tmp_path / "i.db"), boards=[('证券', '600030', '2026-10-16')])
+    assert cached_industry('600030', path) == '证券'
+    assert cached_industry('600000', path) is None
+
+
+def test_missing_database(tmp_path):
+    assert cached_industry('600000', str(tmp_path / "none.db")) is None
@@ -0,0 +1,157 @@
+"""
+Parity check: live scoring factors on scoring_engine kernels vs. the frozen
+DataFrame implementations (tests/legacy_live_scoring.py). Offline, synthetic bars.
+
+Run: python -m pytest tests/test_live_scoring_parity.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import legacy_live_scoring as legacy
+import siphon_strategy as live
+
+
+def _bars(n, seed, calendar_days=90):
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range('2025-01-02', periods=calendar_days).strftime('%Y-%m-%d')
+    days = np.sort(rng.choice(calendar_days, size=min(n, calendar_days), replace=False))  # suspensions
+    n = len(days)
+    ret = rng.normal(0.002, 0.035, n)
+    ret[rng.integers(0, n, size=max(1, n // 15))] = 0.1      # limit-up days
+    close = 10 * np.cumprod(1 + ret)
+    high = close * (1 + np.abs(rng.normal(0, 0.01, n)))
+    high[::4] = close[::4]                                   # sealed at the high
+    low = close * (1 - np.abs(rng.normal(0, 0.01, n)))
+    low[::9] = high[::9]                                     # zero-range bars
+    volume = rng.lognormal(14, 0.7, n)
+    volume[rng.integers(0, n, size=max(1, n // 8))] *= 0.2  # dry-ups
+    volume[-1] *= rng.choice([1.0, 3.0])
+    df = pd.DataFrame({'date': calendar[days], 'open': close, 'high': high, 'low': low,
+                       'close': close, 'volume': volume})
+    df['change_pct'] = df['close'].pct_change().fillna(0) * 100
+    if seed % 6 == 0:
+        df.loc[df.index[-3], 'change_pct'] = np.nan
+    if seed % 5 == 0:
+        df['volume'] = df['volume'].round().astype(np.int64)
+    return df
+
+
+def _index(seed, calendar_days=90):
+    rng = np.random.default_rng(seed + 1000)
+    df = pd.DataFrame({
+        'date': pd.bdate_range('2025-01-02', periods=calendar_days).strftime('%Y-%m-%d'),
+        'close': 3500 * np.cumprod(1 + rng.normal(-0.002, 0.012, calendar_days)),
+    })
+    df['Index_Change'] = df['close'].pct_change() * 100
+    return df.iloc[int(rng.integers(0, 30)):].reset_index(drop=True) if seed % 4 == 0 else df
+
+
+SEEDS = range(60)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_factors_match_legacy(seed):
+    n = [5, 10, 12, 25, 61, 90][seed % 6]
+    hist, index_df = _bars(n, seed), _index(seed)
+    hot = bool(seed % 2)
+
+    assert live.calculate_antigravity_score(hist, index_df) == legacy.calculate_antigravity_score(hist, index_df)
+    assert live.calc_micro_momentum(hist, index_df) == legacy.calc_micro_momentum(hist, index_df)
+    assert live.calc_institutional_burst(hist, hot) == legacy.calc_institutional_burst(hist, hot)
+    assert live.calc_vcp_breakout(hist) == legacy.calc_vcp_breakout(hist)
+    assert live.calc_limit_up_gene(hist) == legacy.calc_limit_up_gene(hist)
+    assert live.calc_ma_alignment_score(hist) == legacy.calc_ma_alignment_score(hist)
+
+
+@pytest.mark.parametrize("regime", ['bull', 'bear', 'neutral', 'unknown'])
+def test_composite_matches_legacy(regime):
+    for seed in SEEDS:
+        hist, index_df = _bars(90, seed), _index(seed)
+        args = (legacy.calculate_antigravity_score(hist, index_df)[0],
+                legacy.calc_micro_momentum(hist, index_df)[0],
+                legacy.calc_institutional_burst(hist, True)[0],
+                legacy.calc_vcp_breakout(hist)[0])
+        assert live.calc_composite_score(*args, regime=regime) == legacy.calc_composite_score(*args, regime=regime)
+        assert live.get_regime_weights(regime) == legacy.get_regime_weights(regime)
+
+
+def test_batch_chunks_match_whole_pool():
+    """The run loop scores fetched histories in chunks; chunking must not change any result."""
+    from batch_scorer import score_candidates
+
+    index_df = _index(2)
+    candidates = [(pd.Series({'Symbol': str(seed), 'Name': f'S{seed}', 'Industry': 'AB'[seed % 2], 'Price': 0,
+                              'Turnover_Rate': 8.0}), 1.0, _bars([25, 61, 90][seed % 3], seed)) for seed in SEEDS]
+    cfg = live.StrategyConfig(min_composite_score=0)
+    args = (index_df, ['A'], 'bull', 1.1, '2025-06-01', cfg)
+    whole = score_candidates(candidates, *args, verbose=False)
+    chunked = [r for i in range(0, len(candidates), 7)
+               for r in score_candidates(candidates[i:i + 7], *args, verbose=False)]
+    assert whole
+    pd.testing.assert_frame_equal(pd.DataFrame(chunked), pd.DataFrame(whole))
+
+
+def test_filter_stages_match_batch():
+    """Per-symbol and batch paths reject the same candidates at the same stage."""
+    from batch_scorer import score_candidates
+    from filter_stats import FilterStats
+
+    index_df = _index(1)
+    candidates = []
+    for seed in SEEDS:
+        row = pd.Series({'Symbol': str(seed), 'Name': f'S{seed}', 'Industry': 'A', 'Price': 0,
+                         'Turnover_Rate': [0, 8.0, np.nan][seed % 3]})
+        candidates.append((row, [0.5, 9.0, -1.0][seed % 3], _bars([12, 25, 61, 90][seed % 4], seed)))
+    cfg = live.StrategyConfig()
+    per_symbol, batch = FilterStats(), FilterStats()
+    for row, rt, hist in candidates:
+        live._score_candidate(row, hist, rt, index_df, True, 'neutral', 1.0, '2025-06-01', cfg, per_symbol)
+    score_candidates(candidates, index_df, [], 'neutral', 1.0, '2025-06-01', cfg, verbose=False, stats=batch)
+
+    counts = lambda stats: {k: (v['seen'], v['rejected']) for k, v in stats.summary().items() if k != 'factors'}
+    assert counts(per_symbol) == counts(batch)
+    assert list(counts(batch)) == ['limit_up', 'turnover', 'gain_5d', 'liquidity', 'ma_trend', 'rsi',
+                                   'antigravity', 'composite']
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sector_momentum_matches_legacy(seed):
+    rng = np.random.default_rng(seed)
+    n = 3000
+    change = rng.normal(0, 3, n).round(2).astype(object)
+    change[rng.random(n) < 0.03] = '-'
+    change[rng.random(n) < 0.2] = rng.choice(['1.5', '2.0'])
+    pool = pd.DataFrame({'Symbol': rng.integers(1, 700000, n), 'Name': 'x', 'Change_Pct': change,
+                         'Industry': rng.choice([f'I{k}' for k in range(60)] + ['Unknown'], n)})
+    board_map = {str(s).zfill(6): f'I{s % 65}' for s in pool['Symbol']}
+
+    hot, stats, rankings = live.calc_sector_momentum(pool, board_map=board_map)
+    ref_hot, ref_stats, ref_rankings = legacy.calc_sector_momentum(pool, board_map=board_map)
+    assert hot == ref_hot
+    pd.testing.assert_frame_equal(stats, ref_stats, check_exact=True)
+    pd.testing.assert_series_equal(rankings.sort_index(), pd.Series(ref_rankings).sort_index(),
+                                   check_names=False, check_exact=True)
+
+    symbols = pool['Symbol'].astype(str).str.zfill(6).tolist() + ['999999']
+    is_hot = rng.random(len(symbols)) < 0.7
+    assert list(live.calc_sector_leader_score(symbols, is_hot, rankings)) == \
+        [legacy.calc_sector_leader_score(s, h, ref_rankings) for s, h in zip(symbols, is_hot)]
+
+
+def test_sector_momentum_hk_keeps_own_labels():
+    """HK pools carry Industry '-' for every row: one group, never A-share boards."""
+    pool = pd.DataFrame({'Symbol': ['00700', '09988', '03690', '01810'], 'Name': 'x',
+                         'Industry': '-', 'Change_Pct': [1.0, 2.0, -1.0, 3.0]})
+    hot, stats, rankings = live.calc_sector_momentum(pool, board_map={'000700': 'A股板块'}, market='HK')
+    assert hot == ['-']
+    assert list(stats['Industry']) == ['-']
+    assert rankings.to_dict() == {'000700': 0.5, '009988': 0.75, '003690': 0.25, '001810': 1.0}
+    assert list(live.calc_sector_leader_score(pool['Symbol'].str.zfill(6), [True] * 4, rankings)) == \
+        [4.0, 7.0, 2.0, 10.0]
@@ -0,0 +1,116 @@
+"""
+fetch_market_sentiment: factors run in parallel under one deadline, a late or
+failed factor falls back to the trading day's cached reading (or neutral), the
+daily northbound reading is reused without a call, and the multiplier is
+clamped to [0.7, 1.3]. Offline (fake readers, temp cache).
+
+Run: python -m pytest tests/test_market_sentiment.py -q
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import siphon_strategy as live
+
+DAY = datetime.date(2026, 10, 16)
+
+
+class _Reader:
+    """A sentiment factor: returns ({key: value}, score), optionally late or failing."""
+
+    def __init__(self, key, value, score, delay=0.0, error=None):
+        self.key, self.value, self.score = key, value, score
+        self.delay, self.error = delay, error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return {self.key: self.value}, self.score
+
+
+@pytest.fixture
+def factors(tmp_path, monkeypatch):
+    readers = {
+        'northbound': _Reader('northbound_flow', 35.0, 1),
+        'limit_up': _Reader('limit_up_count', 80, 1),
+        'limit_down': _Reader('limit_down_count', 5, 1),
+        'main_flow': _Reader('main_fund_flow', 12.0, 1),
+    }
+    keys = {name: (r.key,) for name, r in readers.items()}
+    monkeypatch.setattr(live, 'SENTIMENT_FACTORS', {
+        name: (readers[name], keys[name], name == 'northbound') for name in readers})
+    monkeypatch.setattr(live, 'SENTIMENT_CACHE_TEMPLATE', str(tmp_path / "sentiment_{}.json"))
+    monkeypatch.setattr(live, 'prev_trading_day', lambda day=None, n=1: DAY)
+    yield readers
+    for r in readers.values():
+        r.release.set()
+
+
+def _cache_file(tmp_path):
+    return tmp_path / f"sentiment_{DAY.strftime('%Y%m%d')}.json"
+
+
+def test_all_factors_and_per_day_cache(factors, tmp_path):
+    multiplier, details = live.fetch_market_sentiment(deadline=5)
+    assert multiplier == 1.3 and details['raw_score'] == 4
+    assert details['northbound_flow'] == 35.0 and details['limit_up_count'] == 80
+    with open(_cache_file(tmp_path)) as f:
+        assert set(json.load(f)) == set(factors)
+
+
+def test_deadline_bounds_the_wait_and_late_factor_is_neutral(factors):
+    factors['main_flow'].delay = 10
+    started = time.monotonic()
+    multiplier, details = live.fetch_market_sentiment(deadline=0.3)
+    assert time.monotonic() - started < 2
+    assert details['main_fund_flow'] is None
+    assert details['raw_score'] == 3 and multiplier == 1.3
+
+
+def test_missed_factor_uses_the_days_cached_reading(factors):
+    live.fetch_market_sentiment(deadline=5)
+    factors['limit_up'].error = ConnectionError("eastmoney down")
+    factors['main_flow'].delay = 10
+    _, details = live.fetch_market_sentiment(deadline=0.3)
+    assert details['limit_up_count'] == 80 and details['main_fund_flow'] == 12.0
+    assert details['raw_score'] == 4
+
+
+def test_northbound_reused_from_cache_without_a_call(factors):
+    live.fetch_market_sentiment(deadline=5)
+    factors['limit_up'].value = 120
+    _, details = live.fetch_market_sentiment(deadline=5)
+    assert factors['northbound'].calls == 1
+    assert factors['limit_up'].calls == 2 and details['limit_up_count'] == 120
+
+
+def test_next_trading_day_starts_a_new_cache(factors, monkeypatch):
+    live.fetch_market_sentiment(deadline=5)
+    monkeypatch.setattr(live, 'prev_trading_day', lambda day=None, n=1: DAY + datetime.timedelta(days=3))
+    live.fetch_market_sentiment(deadline=5)
+    assert factors['northbound'].calls == 2
+
+
+def test_multiplier_is_clamped(factors):
+    for r in factors.values():
+        r.score = -2
+    multiplier, details = live.fetch_market_sentiment(deadline=5)
+    assert details['raw_score'] == -8 and multiplier == 0.7
+    for r in factors.values():
+        r.score = 0
+    factors['limit_down'].score = 1
+    # Northbound's -2 comes from today's cache: -2 + 1 -> 0.9
+    multiplier, details = live.fetch_market_sentiment(deadline=5)
+    assert details['raw_score'] == -1 and multiplier == 0.9
@@ -0,0 +1,101 @@
+"""
+RS rank: full-market N-day return percentiles from bar-store frames and spot
+snapshots, and the RS_Pct column in both scoring paths. Offline, synthetic data.
+
+Run: python -m pytest tests/test_rs_rank.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rs_rank
+import siphon_strategy as live
+from batch_scorer import score_candidates
+from test_live_scoring_parity import SEEDS, _bars, _index
+
+
+class _Store:
+    """Stands in for BarStore: frames on 'disk', no downloads."""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def stored_symbols(self, adjust="qfq"):
+        return set(self.frames)
+
+    def peek(self, symbol, adjust="qfq"):
+        return self.frames.get(symbol)
+
+
+def _universe(n=300, days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    calendar = pd.bdate_range('2025-01-02', periods=days).strftime('%Y-%m-%d')
+    frames = {}
+    for k in range(n):
+        keep = np.ones(days, dtype=bool)
+        if k % 7 == 0:
+            keep[rng.choice(days - 1, size=5, replace=False)] = False  # suspensions
+        if k % 11 == 0:
+            keep[-1] = False                                           # no bar on the latest day
+        first = [0, 0, 0, 50][k % 4]                                   # short listing history
+        keep[:first] = False
+        close = 10 * np.cumprod(1 + rng.normal(0.001, 0.02, days))
+        frames[str(k).zfill(6)] = pd.DataFrame({'date': calendar[keep], 'close': close[keep]})
+    return frames, calendar
+
+
+def _naive_return(df, calendar, days):
+    closes = df.set_index('date')['close']
+    if calendar[-1] not in closes.index:
+        return None
+    before = closes[closes.index <= calendar[-1 - days]]
+    if before.empty:
+        return None
+    return (closes[calendar[-1]] / before.iloc[-1] - 1) * 100
+
+
+def test_bar_returns_match_per_symbol():
+    frames, calendar = _universe()
+    for days in (5, 20, 60):
+        got = rs_rank.returns_from_bars(days, store=_Store(frames))
+        expected = {code: r for code, df in frames.items()
+                    if (r := _naive_return(df, calendar, days)) is not None}
+        assert set(got.index) == set(expected)
+        for code, value in expected.items():
+            assert np.isclose(got[code], value, rtol=0, atol=1e-9)
+
+
+def test_snapshot_returns_and_percentiles():
+    snapshot = pd.DataFrame({'代码': ['sh600000', '000001', 'sz000002', '300750'],
+                             '60日涨跌幅': [10.0, -5.0, '-', 30.0], '涨跌幅': [1.0, 2.0, 3.0, 4.0]})
+    assert rs_rank.returns_from_snapshot(20, snapshot) is None
+    returns = rs_rank.returns_from_snapshot(60, snapshot)
+    assert returns.to_dict() == {'600000': 10.0, '000001': -5.0, '300750': 30.0}
+    rs = rs_rank.compute_rs_rank(60, snapshot=snapshot, min_universe=3)
+    assert rs.source == 'snapshot'
+    assert list(rs.lookup(['300750', '1', '999999'])[:2]) == [100.0, 33.3]
+    assert np.isnan(rs.lookup(['999999'])[0])
+    assert rs_rank.compute_rs_rank(60, store=_Store({}), snapshot=snapshot, min_universe=10) is None
+
+
+def test_rs_pct_column_matches_between_scoring_paths():
+    index_df = _index(1)
+    candidates = [(pd.Series({'Symbol': str(seed), 'Name': f'S{seed}', 'Industry': 'A', 'Price': 0,
+                              'Turnover_Rate': 8.0}), 0.5, _bars(90, seed)) for seed in SEEDS]
+    rs_pct = pd.Series(np.linspace(0, 100, 40), index=[str(s).zfill(6) for s in range(40)])
+    cfg = live.StrategyConfig()
+    cfg.min_ag_score = 0.0
+    cfg.min_composite_score = 0.0
+    per_symbol = [r for row, rt, hist in candidates
+                  if (r := live._score_candidate(row, hist, rt, index_df, True, 'neutral', 1.0, '2025-06-01',
+                                                 cfg, rs_pct=rs_pct))]
+    batch = score_candidates(candidates, index_df, [], 'neutral', 1.0, '2025-06-01', cfg,
+                             verbose=False, rs_pct=rs_pct)
+    assert per_symbol
+    pd.testing.assert_frame_equal(pd.DataFrame(per_symbol), pd.DataFrame(batch), check_dtype=False)
+    assert pd.DataFrame(batch)['RS_Pct'].isna().any() and pd.DataFrame(batch)['RS_Pct'].notna().any()
@@ -0,0 +1,75 @@
+"""
+RunMetrics: nearest-rank p50/p95/p99, per-series counters, the akshare hook,
+and the JSON run summary (nothing written when nothing was recorded). Offline,
+temp directory.
+
+Run: python -m pytest tests/test_run_metrics.py -q
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import run_metrics
+from run_metrics import RunMetrics, _percentile
+
+
+def test_nearest_rank_percentiles():
+    values = list(range(1, 101))
+    assert (_percentile(values, 50), _percentile(values, 95), _percentile(values, 99)) == (50, 95, 99)
+    assert (_percentile([3, 7, 9], 50), _percentile([3, 7, 9], 95)) == (7, 9)
+    assert _percentile([4], 99) == 4 and _percentile([], 50) is None
+
+
+def test_series_summary():
+    metrics = RunMetrics()
+    for ms in range(1, 101):
+        metrics.record_call('host', 'push2.eastmoney.com', ms / 1000.0, nbytes=10, failed=ms % 25 == 0)
+    metrics.record_wait('host', 'push2.eastmoney.com', 0.5)
+    metrics.record_retry('fetch_pool', sleep_s=2.0)
+    metrics.record_retry('fetch_pool', sleep_s=1.0)
+
+    summary = metrics.summary()
+    host = summary['host']['push2.eastmoney.com']
+    assert (host['count'], host['failures'], host['bytes']) == (100, 4, 1000)
+    assert (host['p50_ms'], host['p95_ms'], host['p99_ms'], host['max_ms']) == (50.0, 95.0, 99.0, 100.0)
+    assert host['total_s'] == 5.05 and host['throttle_wait_s'] == 0.5
+    function = summary['function']['fetch_pool']
+    assert (function['count'], function['retries'], function['retry_sleep_s']) == (0, 2, 3.0)
+    assert function['p50_ms'] is None and summary['akshare'] == {} and summary['source'] == {}
+
+
+def test_akshare_hook_records_failures(monkeypatch):
+    metrics = RunMetrics()
+    monkeypatch.setattr(run_metrics, '_metrics', metrics)
+    assert run_metrics.akshare_hook('stock_zh_a_spot_em', lambda: 'ok', (), {}) == 'ok'
+
+    def boom():
+        run_metrics.add_akshare_bytes(2048)
+        raise ValueError("bad payload")
+
+    with pytest.raises(ValueError):
+        run_metrics.akshare_hook('stock_zh_a_spot_em', boom, (), {})
+    s = metrics.summary()['akshare']['stock_zh_a_spot_em']
+    assert (s['count'], s['failures'], s['bytes']) == (2, 1, 2048)
+
+
+def test_write_summary_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['/opt/siphon/siphon_strategy.py'])
+    metrics = RunMetrics()
+    assert metrics.write_summary(directory=str(tmp_path)) is None
+    assert os.listdir(tmp_path) == []
+
+    metrics.record_call('akshare', 'stock_zh_a_daily', 0.2)
+    path = metrics.write_summary({'breakers': {'open': 0}}, directory=str(tmp_path / "logs"))
+    name = os.path.basename(path)
+    assert name.startswith("run_metrics_siphon_strategy_") and name.endswith(".json")
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    assert payload['script'] == 'siphon_strategy'
+    assert payload['wall_s'] >= 0 and payload['started_at'] <= payload['finished_at']
+    assert payload['akshare']['stock_zh_a_daily']['p99_ms'] == 200.0
+    assert payload['breakers'] == {'open': 0}
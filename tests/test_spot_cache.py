@@ -0,0 +1,127 @@
+"""
+SpotCache: trading-minute stamps, same-minute and within-TTL hits, expiry once
+both the minute and the TTL have moved on, post-close reuse, the disk copy,
+and one shared download for concurrent callers. Offline (frozen clock,
+weekday calendar, temp cache).
+
+Run: python -m pytest tests/test_spot_cache.py -q
+"""
+
+import datetime
+import os
+import sys
+import threading
+import time
+import types
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import spot_cache
+from spot_cache import SpotCache, trading_minute
+from trade_calendar import TradeCalendar
+
+
+class _Clock:
+    """Wall clock for spot_cache: datetime.now() and time.time() move together."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def advance(self, seconds):
+        self.now += datetime.timedelta(seconds=seconds)
+
+    def time(self):
+        return self.now.timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(spot_cache, 'get_trade_calendar', lambda: TradeCalendar([]))
+    clk = _Clock(datetime.datetime(2026, 10, 16, 10, 0, 5))
+
+    class FrozenDateTime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clk.now
+
+    monkeypatch.setattr(spot_cache, 'datetime', types.SimpleNamespace(
+        datetime=FrozenDateTime, time=datetime.time, timedelta=datetime.timedelta))
+    monkeypatch.setattr(spot_cache, 'time', types.SimpleNamespace(time=clk.time))
+    return clk
+
+
+class _Source:
+    """A spot endpoint that returns a new frame on every call."""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return pd.DataFrame({'代码': ['600000'], '最新价': [10.0 + self.calls]})
+
+
+@pytest.mark.parametrize("now, minute", [
+    ((2026, 10, 16, 10, 7, 59), "2026-10-16 10:07"),
+    ((2026, 10, 16, 12, 15), "2026-10-16 11:30"),
+    ((2026, 10, 16, 16, 40), "2026-10-16 15:00"),
+    ((2026, 10, 16, 9, 0), "2026-10-15 15:00"),
+    ((2026, 10, 17, 10, 0), "2026-10-16 15:00"),
+])
+def test_trading_minute(now, minute, monkeypatch):
+    monkeypatch.setattr(spot_cache, 'get_trade_calendar', lambda: TradeCalendar([]))
+    assert trading_minute(datetime.datetime(*now)) == minute
+
+
+def test_same_minute_and_ttl_hits_then_expiry(tmp_path, clock):
+    cache, source = SpotCache(root=str(tmp_path), ttl=120), _Source()
+    first = cache.get('eastmoney', source)
+    clock.advance(30)
+    pd.testing.assert_frame_equal(cache.get('eastmoney', source), first)  # same minute
+    clock.advance(60)
+    pd.testing.assert_frame_equal(cache.get('eastmoney', source), first)  # new minute, within TTL
+    assert source.calls == 1 and cache.stats['hits'] == 2
+
+    clock.advance(60)
+    assert cache.peek('eastmoney') is None
+    assert cache.get('eastmoney', source)['最新价'].iloc[0] == 12.0
+    assert source.calls == 2 and cache.stats['downloads'] == 2
+
+
+def test_after_close_never_redownloads(tmp_path, clock):
+    clock.now = datetime.datetime(2026, 10, 16, 15, 20)
+    cache, source = SpotCache(root=str(tmp_path), ttl=60), _Source()
+    cache.get('eastmoney', source)
+    clock.advance(3 * 3600)
+    cache.get('eastmoney', source)
+    assert source.calls == 1
+
+
+def test_disk_copy_serves_a_new_process(tmp_path, clock):
+    source = _Source()
+    SpotCache(root=str(tmp_path), ttl=60).get('tencent', source)
+    reopened = SpotCache(root=str(tmp_path), ttl=60)
+    assert reopened.peek('tencent')['最新价'].iloc[0] == 11.0
+    assert reopened.stats['disk_hits'] == 1
+
+    memory_only = SpotCache(root=str(tmp_path / "mem"), ttl=60, disk=False)
+    memory_only.get('tencent', source)
+    assert not os.path.exists(tmp_path / "mem")
+    assert SpotCache(root=str(tmp_path / "mem"), ttl=60, disk=False).peek('tencent') is None
+
+
+def test_concurrent_callers_share_one_download(tmp_path, clock):
+    cache, source = SpotCache(root=str(tmp_path), ttl=60), _Source(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('eastmoney', source)))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert source.calls == 1 and len(results) == 6
+    assert all(r['最新价'].iloc[0] == 11.0 for r in results)
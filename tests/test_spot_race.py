@@ -0,0 +1,70 @@
+"""
+fetch_spot_hedged: the first complete spot snapshot wins without waiting for
+the slower source, a failed source falls through to the other, and the
+EastMoney future is handed back either way. Offline (fake sources).
+
+Run: python -m pytest tests/test_spot_race.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import siphon_strategy as live
+
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def _snapshot(source):
+    return pd.DataFrame({'代码': ['600000'], 'source': [source]})
+
+
+def _slow(gate, source):
+    def fetch():
+        gate.wait(10)
+        return _snapshot(source)
+    return fetch
+
+
+def _fail(source):
+    def fetch():
+        raise ConnectionError(f"{source} down")
+    return fetch
+
+
+def test_first_snapshot_wins_without_waiting(monkeypatch, gate):
+    monkeypatch.setattr(live, '_fetch_tencent_spot', lambda: _snapshot('tencent'))
+    monkeypatch.setattr(live, '_fetch_em_spot', _slow(gate, 'eastmoney'))
+    started = time.monotonic()
+    spot_df, source, em_future = live.fetch_spot_hedged()
+    assert time.monotonic() - started < 2
+    assert source == 'tencent' and spot_df['source'].iloc[0] == 'tencent'
+    assert not em_future.done()
+    gate.set()
+    assert em_future.result(5)['source'].iloc[0] == 'eastmoney'
+
+
+def test_failed_source_falls_through(monkeypatch):
+    monkeypatch.setattr(live, '_fetch_tencent_spot', _fail('tencent'))
+    monkeypatch.setattr(live, '_fetch_em_spot', lambda: _snapshot('eastmoney'))
+    spot_df, source, em_future = live.fetch_spot_hedged()
+    assert source == 'eastmoney' and em_future.result() is spot_df
+
+
+def test_both_sources_fail(monkeypatch):
+    monkeypatch.setattr(live, '_fetch_tencent_spot', _fail('tencent'))
+    monkeypatch.setattr(live, '_fetch_em_spot', _fail('eastmoney'))
+    spot_df, source, em_future = live.fetch_spot_hedged()
+    assert spot_df is None and source is None
+    with pytest.raises(ConnectionError):
+        em_future.result()
@@ -0,0 +1,76 @@
+"""
+Parity check: vectorized precompute_static_factors_unified vs. the original
+day-by-day loop (_precompute_static_factors_loop). Offline, synthetic bars.
+
+Run: python -m pytest tests/test_static_factors_parity.py -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scoring_engine import _precompute_static_factors_loop, precompute_static_factors_unified
+
+
+def _bars(n, seed, flat=False):
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0.001, 0.03, n)
+    ret[rng.integers(0, n, size=max(1, n // 50))] = 0.1     # limit-up days
+    close = 10 * np.cumprod(1 + ret)
+    if flat:
+        close[n // 3: n // 3 + 15] = close[n // 3]
+    high = close * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, n)))
+    high[::7] = low[::7]                                     # zero-range bars
+    volume = rng.lognormal(14, 0.7, n)
+    volume[rng.integers(0, n, size=max(1, n // 20))] *= 0.2  # volume dry-ups (VCP)
+    df = pd.DataFrame({
+        'date': pd.bdate_range('2021-01-04', periods=n).strftime('%Y-%m-%d'),
+        'close': close, 'high': high, 'low': low, 'volume': volume,
+    })
+    df['change_pct'] = df['close'].pct_change().fillna(0) * 100
+    return df
+
+
+def _index(n, seed):
+    rng = np.random.default_rng(seed + 1000)
+    close = 3500 * np.cumprod(1 + rng.normal(0, 0.012, n))
+    df = pd.DataFrame({'date': pd.bdate_range('2021-01-04', periods=n).strftime('%Y-%m-%d'), 'close': close})
+    df['Index_Change'] = df['close'].pct_change() * 100
+    return df
+
+
+@pytest.mark.parametrize("n,seed", [(10, 0), (11, 1), (12, 2), (40, 3), (250, 4), (1250, 5)])
+@pytest.mark.parametrize("index_mode", ["none", "full", "short", "no_change"])
+def test_matches_loop(n, seed, index_mode):
+    df = _bars(n, seed, flat=n > 40)
+    index_daily = None
+    if index_mode == "full":
+        index_daily = _index(n, seed)
+    elif index_mode == "short":
+        index_daily = _index(max(1, n // 2), seed)
+    elif index_mode == "no_change":
+        index_daily = _index(n, seed)[['date', 'close']]
+
+    expected = _precompute_static_factors_loop(df, index_daily)
+    actual = precompute_static_factors_unified(df, index_daily)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def test_short_history_returns_none():
+    df = _bars(9, 0)
+    assert precompute_static_factors_unified(df) is None
+    assert _precompute_static_factors_loop(df) is None
+
+
+def test_integer_volume_and_zero_close():
+    df = _bars(120, 7)
+    df['volume'] = df['volume'].round().astype(np.int64)
+    df.loc[50, 'close'] = 0.0      # pct_3d / VCP change fall back to 0 after a zero close
+    expected = _precompute_static_factors_loop(df)
+    actual = precompute_static_factors_unified(df)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
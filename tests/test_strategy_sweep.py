@@ -0,0 +1,67 @@
+"""
+Strategy sweep: every variant's ranked list must hold exactly the candidates and
+composites score_candidates gives for that config alone. Offline, synthetic bars.
+
+Run: python -m pytest tests/test_strategy_sweep.py -q
+"""
+
+import dataclasses
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import siphon_strategy as live
+import strategy_sweep
+from batch_scorer import score_candidates
+from scoring_engine import get_regime_weights
+from test_live_scoring_parity import SEEDS, _bars, _index
+
+
+def _data(sentiment_mult, regime='neutral'):
+    rng = np.random.default_rng(7)
+    candidates = []
+    for seed in SEEDS:
+        row = pd.Series({'Symbol': str(seed), 'Name': f'S{seed}', 'Industry': ['A', 'B'][seed % 2],
+                         'Price': [0, 11.0][seed % 2], 'Turnover_Rate': [0, 8.0, np.nan][seed % 3],
+                         'Change_Pct': rng.normal(1, 4), 'PE_TTM': rng.uniform(5, 60),
+                         'Growth_Rate': rng.choice([0, 15.0, 40.0])})
+        candidates.append((row, float(row['Change_Pct']), _bars([12, 25, 61, 90][seed % 4], seed)))
+    return {'market': 'CN', 'candidates': candidates, 'index_df': _index(1), 'hot_sectors': ['A'],
+            'regime': regime, 'sentiment_mult': sentiment_mult}
+
+
+VARIANTS = strategy_sweep.grid(min_composite_score=[0, 20, 35], max_rsi=[60, 80], ma_period=[20, 50],
+                               **{'weights.vcp': [5, 15]}) + [{'min_ag_score': 0, 'max_drop_pct': -1.0}]
+
+
+@pytest.mark.parametrize("sentiment_mult", [1.0, np.float64(1.15)])
+def test_sweep_matches_single_config_runs(sentiment_mult):
+    data = _data(sentiment_mult)
+    base = live.StrategyConfig()
+    results = strategy_sweep.sweep(data, base, VARIANTS)
+    assert len(results) == len(VARIANTS)
+    for variant, ranked in results:
+        cfg, weights = strategy_sweep.expand_variants(base, [variant])[0]
+        passed = [c for c in data['candidates'] if live._filter_fundamentals(c[0], 'CN', cfg)[0]]
+        expected = score_candidates(passed, data['index_df'], data['hot_sectors'], data['regime'],
+                                    sentiment_mult, '2025-06-01', cfg, verbose=False,
+                                    weights=dict(get_regime_weights(data['regime']), **weights))
+        expected = sorted(expected, key=lambda r: -r['Composite'])
+        assert list(ranked['Symbol']) == [r['Symbol'] for r in expected]
+        assert list(ranked['Composite']) == [r['Composite'] for r in expected]
+
+
+def test_rejects_fixed_and_unknown_fields():
+    base = live.StrategyConfig()
+    with pytest.raises(ValueError):
+        strategy_sweep.expand_variants(base, [{'max_process': base.max_process + 1}])
+    with pytest.raises(ValueError):
+        strategy_sweep.expand_variants(base, [{'no_such_field': 1}])
+    with pytest.raises(ValueError):
+        strategy_sweep.expand_variants(base, [{'weights': {'no_such_weight': 1}}])
+    assert strategy_sweep.expand_variants(base, [{}])[0][0] == dataclasses.replace(base)
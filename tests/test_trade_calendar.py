@@ -0,0 +1,94 @@
+"""
+TradeCalendar: in-range lookups, the weekday fallback outside the range, and
+get_trade_calendar's cache handling (one download attempt per day, cached copy
+on a failed download, weekday fallback with no cache). Offline, temp cache.
+
+Run: python -m pytest tests/test_trade_calendar.py -q
+"""
+
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import trade_calendar
+from trade_calendar import TradeCalendar
+
+TODAY = datetime.date.today().strftime('%Y-%m-%d')
+# National Day week 2026: Oct 1-7 closed, Oct 8 (Thu) reopens
+OCTOBER = [datetime.date(2026, 9, d) for d in (28, 29, 30)] + \
+          [datetime.date(2026, 10, d) for d in (8, 9, 12, 13)]
+
+
+@pytest.fixture
+def fresh(tmp_path, monkeypatch):
+    """No process-wide calendar yet; a cache path in tmp_path; downloads logged."""
+    monkeypatch.setattr(trade_calendar, '_calendar', None)
+    monkeypatch.setattr(trade_calendar, '_attempted_on', None)
+    calls = []
+
+    def failing(path):
+        calls.append(path)
+        raise ConnectionError("sina unreachable")
+
+    monkeypatch.setattr(trade_calendar, '_download', failing)
+    return str(tmp_path / "trade_calendar.json"), calls
+
+
+def _write_cache(path, fetched_on, dates=OCTOBER):
+    with open(path, 'w') as f:
+        json.dump({'fetched_on': fetched_on, 'dates': [d.strftime('%Y-%m-%d') for d in dates]}, f)
+
+
+def test_lookups_inside_the_range():
+    cal = TradeCalendar(OCTOBER)
+    assert not cal.is_trading_day('2026-10-05')
+    assert cal.is_trading_day('20261008')
+    assert cal.prev_trading_day('2026-10-08') == datetime.date(2026, 9, 30)
+    assert cal.prev_trading_day('2026-10-05', n=0) == datetime.date(2026, 9, 30)
+    assert cal.next_trading_day('2026-09-30') == datetime.date(2026, 10, 8)
+    assert cal.trading_days_between('2026-09-30', '2026-10-12') == 3
+
+
+def test_weekdays_outside_the_range():
+    cal = TradeCalendar(OCTOBER)
+    assert cal.is_trading_day('2026-10-16') and not cal.is_trading_day('2026-10-17')
+    assert cal.next_trading_day('2026-10-13', n=2) == datetime.date(2026, 10, 15)
+    empty = TradeCalendar([])
+    assert empty.fallback
+    assert empty.prev_trading_day('2026-10-19') == datetime.date(2026, 10, 16)
+
+
+def test_failed_download_uses_the_cached_copy(fresh):
+    path, calls = fresh
+    _write_cache(path, '2026-10-01')
+    cal = trade_calendar.get_trade_calendar(path)
+    assert calls == [path]
+    assert cal.fetched_on == '2026-10-01' and not cal.fallback
+    assert not cal.is_trading_day('2026-10-05')
+
+
+def test_no_cache_falls_back_to_weekdays(fresh, monkeypatch):
+    path, calls = fresh
+    cal = trade_calendar.get_trade_calendar(path)
+    assert calls == [path] and cal.fallback
+    # A data outage never skips a run
+    monkeypatch.setattr(trade_calendar, 'get_trade_calendar', lambda path=None: cal)
+    assert trade_calendar.is_trading_day('2026-10-17')
+
+
+def test_one_download_attempt_per_day(fresh):
+    path, calls = fresh
+    first = trade_calendar.get_trade_calendar(path)
+    assert trade_calendar.get_trade_calendar(path) is first
+    assert len(calls) == 1
+
+
+def test_cache_fetched_today_skips_the_download(fresh):
+    path, calls = fresh
+    _write_cache(path, TODAY)
+    cal = trade_calendar.get_trade_calendar(path)
+    assert calls == [] and cal.fetched_on == TODAY
@@ -0,0 +1,174 @@
+"""
+TradeCalendar — Cached A-share trading calendar.
+Sina's calendar is downloaded at most once a day into data_cache/; every
+is-trading-day / previous / next / distance lookup afterwards is local.
+"""
+
+import bisect
+import datetime
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger("SiphonSystem")
+
+CALENDAR_PATH = os.path.join("data_cache", "trade_calendar.json")
+
+
+def _to_date(value):
+    if value is None:
+        return datetime.date.today()
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value)
+    if len(value) == 8 and value.isdigit():
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+class TradeCalendar:
+    """Sorted trading dates with a date -> position index.
+
+    Outside the downloaded range (or when no calendar could be loaded at all)
+    lookups fall back to Monday-Friday.
+    """
+
+    def __init__(self, dates, fetched_on=None):
+        self.dates = sorted(set(dates))
+        self.fetched_on = fetched_on
+        self._pos = {d: i for i, d in enumerate(self.dates)}
+        self.fallback = not self.dates
+
+    def _in_range(self, day):
+        return bool(self.dates) and self.dates[0] <= day <= self.dates[-1]
+
+    def is_trading_day(self, day=None):
+        day = _to_date(day)
+        if self._in_range(day):
+            return day in self._pos
+        return day.weekday() < 5
+
+    def prev_trading_day(self, day=None, n=1):
+        """n-th trading day strictly before `day` (n=0 -> `day` itself if trading, else the one before)."""
+        day = _to_date(day)
+        if self._in_range(day):
+            i = bisect.bisect_left(self.dates, day)
+            if n == 0 and day in self._pos:
+                return day
+            j = i - max(n, 1)
+            if j >= 0:
+                return self.dates[j]
+        steps = n
+        if n == 0:
+            if day.weekday() < 5:
+                return day
+            steps = 1
+        while steps > 0:
+            day -= datetime.timedelta(days=1)
+            if day.weekday() < 5:
+                steps -= 1
+        return day
+
+    def next_trading_day(self, day=None, n=1):
+        """n-th trading day strictly after `day`."""
+        day = _to_date(day)
+        if self._in_range(day):
+            j = bisect.bisect_right(self.dates, day) + n - 1
+            if j < len(self.dates):
+                return self.dates[j]
+        while n > 0:
+            day += datetime.timedelta(days=1)
+            if day.weekday() < 5:
+                n -= 1
+        return day
+
+    def trading_days_between(self, start, end=None):
+        """Trading days in (start, end] — i.e. N in T+N for a pick made on `start`."""
+        start, end = _to_date(start), _to_date(end)
+        if end < start:
+            return -self.trading_days_between(end, start)
+        if self._in_range(start) and self._in_range(end):
+            return bisect.bisect_right(self.dates, end) - bisect.bisect_right(self.dates, start)
+        count, day = 0, start
+        while day < end:
+            day += datetime.timedelta(days=1)
+            if self.is_trading_day(day):
+                count += 1
+        return count
+
+
+_calendar = None
+_attempted_on = None
+_calendar_lock = threading.Lock()
+
+
+def _load_cached(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return TradeCalendar([_to_date(d) for d in data['dates']], data.get('fetched_on'))
+    except Exception as e:
+        logger.warning(f"Trade calendar cache unreadable: {e}")
+        return None
+
+
+def _download(path):
+    import akshare as ak
+    df = ak.tool_trade_date_hist_sina()
+    if df is None or df.empty:
+        return None
+    cal = TradeCalendar([_to_date(d) for d in df['trade_date']],
+                        datetime.date.today().strftime('%Y-%m-%d'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'fetched_on': cal.fetched_on,
+                   'dates': [d.strftime('%Y-%m-%d') for d in cal.dates]}, f)
+    os.replace(tmp, path)
+    return cal
+
+
+def get_trade_calendar(path=CALENDAR_PATH):
+    """Process-wide calendar; re-downloaded only when the cache wasn't fetched today."""
+    global _calendar, _attempted_on
+    with _calendar_lock:
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        # One download attempt per day, even if it failed
+        if _calendar is not None and today in (_calendar.fetched_on, _attempted_on):
+            return _calendar
+        _attempted_on = today
+        cal = _load_cached(path)
+        if cal is None or cal.fetched_on != today:
+            try:
+                cal = _download(path) or cal
+            except Exception as e:
+                print(f"⚠️ Trade calendar download failed: {e}. Using "
+                      f"{'cached copy from ' + cal.fetched_on if cal else 'weekday fallback'}.")
+        _calendar = cal or TradeCalendar([])
+        return _calendar
+
+
+def is_trading_day(day=None):
+    """Check if `day` (default today) is an A-share trading day.
+    Defaults to True if no calendar could be loaded, so a data outage never skips a run."""
+    cal = get_trade_calendar()
+    if cal.fallback:
+        return True
+    return cal.is_trading_day(day)
+
+
+def prev_trading_day(day=None, n=1):
+    return get_trade_calendar().prev_trading_day(day, n)
+
+
+def next_trading_day(day=None, n=1):
+    return get_trade_calendar().next_trading_day(day, n)
+
+
+def trading_days_between(start, end=None):
+    return get_trade_calendar().trading_days_between(start, end)
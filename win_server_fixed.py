@@ -17,6 +17,9 @@ try:
 except ImportError:
     USE_UNIFIED_SCORING = False
 
+# v11.1: Intraday TP/SL walk (Numba-compiled when available)
+from jit_kernels import TPSL_STOP_LOSS, TPSL_TAKE_PROFIT, tpsl_walk
+
 app = FastAPI(title="Siphon Backtest Server")
 _cache = {'bars_5min': {}, 'daily_klines': {}, 'stock_names': {}}
 _last_result = {}
@@ -196,31 +199,18 @@ async def run_backtest(req: BacktestRequest):
                 
                 ep = pos['ep']
                 exit_reason = None
-                
-                # Walk through intraday bars to find exact trigger point
-                for _, bar in today_bars.iterrows():
-                    bar_high = float(bar['high'])
-                    bar_low = float(bar['low'])
-                    bar_close = float(bar['close'])
-                    
-                    # Check stop loss first (more urgent)
-                    if req.stop_loss_pct > 0:
-                        sl_price = ep * (1 - req.stop_loss_pct / 100)
-                        if bar_low <= sl_price:
-                            exit_reason = "stop_loss"
-                            # Sell at the SL trigger price (or bar close if gap down)
-                            sell_price = min(sl_price, float(bar['open']))
-                            break
-                    
-                    # Check take profit
-                    if req.take_profit_pct > 0:
-                        tp_price = ep * (1 + req.take_profit_pct / 100)
-                        if bar_high >= tp_price:
-                            exit_reason = "take_profit"
-                            # Sell at TP trigger price (or bar close if gap up)
-                            sell_price = max(tp_price, float(bar['open']))
-                            break
-                
+
+                # Walk through intraday bars to find exact trigger point (SL checked first;
+                # sells at the trigger price, or the bar open on a gap through it)
+                _, sell_price, reason = tpsl_walk(
+                    today_bars['open'].to_numpy(dtype=float), today_bars['high'].to_numpy(dtype=float),
+                    today_bars['low'].to_numpy(dtype=float), ep,
+                    tp_pct=req.take_profit_pct, sl_pct=req.stop_loss_pct)
+                if reason == TPSL_STOP_LOSS:
+                    exit_reason = "stop_loss"
+                elif reason == TPSL_TAKE_PROFIT:
+                    exit_reason = "take_profit"
+
                 if exit_reason:
                     # Update peak for stats
                     intraday_high = float(today_bars['high'].max())